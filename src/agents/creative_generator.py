@@ -3,8 +3,12 @@ Creative Generator - Produces new creative recommendations for low-CTR campaigns
 """
 
 import json
-from pathlib import Path
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.helpers import normalize_name
+from utils.json_parser import ResponseParseError
+from utils.llm import complete_json, get_client
+from utils.prompt_registry import get_prompt
 
 
 class CreativeGenerator:
@@ -13,14 +17,10 @@ class CreativeGenerator:
     def __init__(self, config: dict, logger):
         self.config = config
         self.logger = logger
-        self.client = OpenAI()
-        self.prompt_template = self._load_prompt()
-    
-    def _load_prompt(self) -> str:
-        """Load prompt template from file"""
-        prompt_path = Path(__file__).parent.parent.parent / "prompts" / "creative_generator_prompt.md"
-        with open(prompt_path, 'r') as f:
-            return f.read()
+        self.client = get_client()
+        self.prompt_template = get_prompt('creative_generator_prompt')
+        self.campaign_template = get_prompt('campaign_creative_prompt')
+        self.creative_index = None  # CreativeIndex of historical copy, set by the orchestrator
     
     def generate(self, insights: list, data_summary: dict) -> list:
         """
@@ -34,7 +34,8 @@ class CreativeGenerator:
                 "issue": "...",
                 "recommended_messages": [...],
                 "rationale": "...",
-                "inspired_by": "..."
+                "inspired_by": "...",
+                "insight_ids": [0, 2]
             }
         ]
         """
@@ -43,94 +44,235 @@ class CreativeGenerator:
         
         # Extract low performers from data
         low_performers = data_summary.get('low_performers', [])
-        top_messages = data_summary.get('creative_performance', {}).get('top_messages', [])
+        top_messages = _exemplars(data_summary)
         
         if not low_performers:
             self.logger.info("No low performers found, skipping creative generation")
             return []
         
         # Prepare prompt
-        insights_str = json.dumps(insights, indent=2, default=str)
+        insights_str = json.dumps(
+            [{"insight_id": i, **insight} for i, insight in enumerate(insights)],
+            indent=2,
+            default=str
+        )
         low_performers_str = json.dumps(low_performers, indent=2, default=str)
         top_messages_str = json.dumps(top_messages, indent=2, default=str)
         
-        prompt = self.prompt_template.replace("{INSIGHTS}", insights_str)
-        prompt = prompt.replace("{LOW_PERFORMERS}", low_performers_str)
-        prompt = prompt.replace("{TOP_MESSAGES}", top_messages_str)
-        prompt = prompt.replace("{LOW_CTR_THRESHOLD}", str(self.config['low_ctr_threshold']))
-        
-        response = self.client.chat.completions.create(
-            model=self.config['openai_model'],
-            messages=[
-                {"role": "system", "content": "You are a creative strategist specializing in direct-response ad copy for e-commerce brands."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,  # Higher temperature for creative diversity
-            max_tokens=2000
+        prompt = self.prompt_template.render(
+            INSIGHTS=insights_str,
+            LOW_PERFORMERS=low_performers_str,
+            TOP_MESSAGES=top_messages_str,
+            LOW_CTR_THRESHOLD=self.config['low_ctr_threshold']
         )
         
-        content = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
+        # Request and parse JSON response
         try:
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            result = json.loads(content)
-            creatives = result.get('recommendations', result) if isinstance(result, dict) else result
+            result = complete_json(
+                self.client,
+                self.config,
+                messages=[
+                    {"role": "system", "content": "You are a creative strategist specializing in direct-response ad copy for e-commerce brands."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.8,  # Higher temperature for creative diversity
+                max_tokens=2000,
+                schema='creatives',
+                agent='creative_generator'
+            )
+            creatives = [self._score_messages(creative) for creative in result['recommendations']]
             
             self.logger.info("Creative recommendations generated", count=len(creatives))
             return creatives
             
-        except json.JSONDecodeError as e:
+        except ResponseParseError as e:
             self.logger.error("Failed to parse creative recommendations", error=str(e))
             return []
     
-    def generate_for_campaign(self, campaign: str, current_message: str, 
-                             issue: str, top_patterns: list) -> list:
-        """Generate specific messages for a single campaign"""
+    def generate_fanout(self, insights: list, data_summary: dict) -> list:
+        """
+        Generate creatives with one concurrent request per low performer
         
-        prompt = f"""
-Generate 5 new creative messages for this underperforming campaign:
-
-CAMPAIGN: {campaign}
-CURRENT MESSAGE: {current_message}
-ISSUE: {issue}
-
-HIGH-PERFORMING PATTERNS:
-{json.dumps(top_patterns, indent=2)}
-
-Requirements:
-- Messages should be concise (under 100 characters)
-- Focus on benefits, urgency, or social proof
-- Maintain brand voice
-- Test different angles (features, benefits, scarcity, social proof)
-
-Return JSON array of 5 message strings.
-"""
+        The top-messages context is serialized once and shared by every
+        request (it leads the prompt, so it is also a cacheable prefix).
+        Requests run with bounded parallelism, near-identical messages are
+        dropped across campaigns, and results are merged into the same
+        shape ``generate`` returns.
+        """
+        
+        low_performers = data_summary.get('low_performers', [])
+        top_messages = _exemplars(data_summary)
+        
+        if not low_performers:
+            self.logger.info("No low performers found, skipping creative generation")
+            return []
+        
+        self.logger.info("Generating creative recommendations per campaign", campaigns=len(low_performers))
+        
+        top_patterns = json.dumps(top_messages, indent=2, default=str)
+        threshold = self.config['low_ctr_threshold']
+        jobs = []
+        for performer in low_performers:
+            campaign = performer.get('campaign_name', '')
+            insight_ids = _related_insights(campaign, insights)
+            issue = f"CTR {performer.get('ctr', 0):.2%} is below the {threshold:.2%} threshold on ${performer.get('spend', 0):,.0f} spend"
+            if insight_ids:
+                issue += ". Related findings: " + "; ".join(insights[i].get('hypothesis', '') for i in insight_ids)
+            jobs.append((performer, issue, insight_ids))
+        
+        max_workers = max(1, min(self.config.get('creative_fanout_concurrency', 4), len(jobs)))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(
+                    self._complete_campaign,
+                    campaign=performer.get('campaign_name', ''),
+                    current_message=performer.get('creative_message', ''),
+                    issue=issue,
+                    top_patterns=top_patterns
+                )
+                for performer, issue, _ in jobs
+            ]
+            completions = []
+            for future, (performer, _, _) in zip(futures, jobs):
+                try:
+                    completions.append(future.result())
+                except Exception as e:
+                    self.logger.error("Campaign creative generation failed", campaign=performer.get('campaign_name'), error=str(e))
+                    completions.append({})
+        
+        results = [_messages(completion) for completion in completions]
+        unique = _dedupe_messages(results, self.config.get('creative_dedupe_threshold', 0.8))
+        
+        creatives = []
+        for (performer, issue, insight_ids), completion, messages in zip(jobs, completions, unique):
+            if not messages:
+                continue
+            creative = {
+                "campaign": performer.get('campaign_name', ''),
+                "current_ctr": performer.get('ctr'),
+                "issue": issue,
+                "recommended_messages": messages,
+                "insight_ids": insight_ids
+            }
+            # Only what the model actually stated; nothing is filled in
+            for key in ('rationale', 'inspired_by'):
+                if isinstance(completion.get(key), str) and completion[key]:
+                    creative[key] = completion[key]
+            creatives.append(self._score_messages(creative))
         
-        response = self.client.chat.completions.create(
-            model=self.config['openai_model'],
-            messages=[
-                {"role": "system", "content": "You are a direct-response copywriter."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.9,
-            max_tokens=500
+        self.logger.info(
+            "Creative recommendations generated",
+            count=len(creatives),
+            duplicates_dropped=sum(map(len, results)) - sum(map(len, unique))
         )
+        return creatives
+    
+    def _score_messages(self, creative: dict) -> dict:
+        """
+        Score recommended messages against historical copy
+        
+        Messages that are near-copies of existing creatives (novelty below
+        ``creative_min_novelty``) are dropped; the rest are ordered by kNN
+        predicted CTR and their scores attached as ``message_scores``.
+        """
+        if self.creative_index is None:
+            return creative
+        
+        messages = [m for m in creative.get('recommended_messages', []) if isinstance(m, str)]
+        min_novelty = self.config.get('creative_min_novelty', 0.15)
+        scores = [s for s in self.creative_index.score(messages) if s['novelty'] >= min_novelty]
+        scores.sort(key=lambda s: -(s['predicted_ctr'] if s['predicted_ctr'] is not None else float('-inf')))
+        
+        if len(scores) < len(messages):
+            self.logger.info("Dropped near-copies of existing creatives", campaign=creative.get('campaign'), dropped=len(messages) - len(scores))
+        return {
+            **creative,
+            'recommended_messages': [s['message'] for s in scores],
+            'message_scores': scores
+        }
+    
+    def generate_for_campaign(self, campaign: str, current_message: str, 
+                             issue: str, top_patterns) -> list:
+        """
+        Generate specific messages for a single campaign
+        
+        ``top_patterns`` is a list of top messages or its pre-serialized JSON.
+        """
+        return _messages(self._complete_campaign(campaign, current_message, issue, top_patterns))
+    
+    def _complete_campaign(self, campaign: str, current_message: str, issue: str, top_patterns) -> dict:
+        """Campaign prompt result: messages plus the model's rationale and inspiration, or {}"""
         
-        content = response.choices[0].message.content.strip()
+        if not isinstance(top_patterns, str):
+            top_patterns = json.dumps(top_patterns, indent=2, default=str)
+        
+        prompt = self.campaign_template.render(
+            CAMPAIGN=campaign,
+            CURRENT_MESSAGE=current_message,
+            ISSUE=issue,
+            TOP_PATTERNS=top_patterns
+        )
         
         try:
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            messages = json.loads(content)
-            return messages if isinstance(messages, list) else []
+            result = complete_json(
+                self.client,
+                self.config,
+                messages=[
+                    {"role": "system", "content": "You are a direct-response copywriter."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.9,
+                max_tokens=500,
+                schema='messages',
+                agent='creative_generator'
+            )
+            return result
             
-        except json.JSONDecodeError:
-            return []
\ No newline at end of file
+        except ResponseParseError:
+            return {}
+
+
+def _related_insights(campaign: str, insights: list) -> list:
+    """Indices of insights that mention the campaign by name"""
+    name = normalize_name(campaign)
+    if not name:
+        return []
+    related = []
+    for i, insight in enumerate(insights):
+        text = ' '.join(str(insight.get(key, '')) for key in ('hypothesis', 'evidence', 'affected_campaigns'))
+        if name in normalize_name(text):
+            related.append(i)
+    return related
+
+
+def _dedupe_messages(groups: list, threshold: float) -> list:
+    """
+    Drop messages that near-duplicate an earlier one, across all groups
+    
+    Two messages are near-duplicates when the Jaccard similarity of their
+    normalized word sets reaches ``threshold``. Earlier groups win.
+    """
+    kept_tokens = []
+    deduped = []
+    for messages in groups:
+        unique = []
+        for message in messages:
+            tokens = set(normalize_name(message).split())
+            if not tokens:
+                continue
+            if any(len(tokens & other) / len(tokens | other) >= threshold for other in kept_tokens):
+                continue
+            kept_tokens.append(tokens)
+            unique.append(message)
+        deduped.append(unique)
+    return deduped
+
+
+def _messages(completion: dict) -> list:
+    return [m for m in completion.get('messages', []) if isinstance(m, str)]
+
+
+def _exemplars(data_summary: dict) -> list:
+    """Prompt exemplars: the similarity-index picks when available, else top messages"""
+    creative = data_summary.get('creative_performance', {})
+    return creative.get('exemplars') or creative.get('top_messages', [])
\ No newline at end of file
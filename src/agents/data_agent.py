@@ -7,6 +7,46 @@ import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from analytics.anomalies import detect_anomalies
+from analytics.creative_index import INDEX_COLUMNS, CreativeIndex, source_fingerprint
+from analytics.cube import DataCube
+from utils.helpers import normalize_name
+
+
+NUMERIC_COLUMNS = ['spend', 'impressions', 'clicks', 'ctr', 'purchases', 'revenue', 'roas']
+
+# Columns every summary section relies on, including all cube dimensions
+# so breakdowns and drill-downs survive metric-based column pruning
+CORE_COLUMNS = ['campaign_name', 'adset_name', 'date', 'spend', 'revenue', 'ctr', 'roas',
+                'creative_type', 'creative_message', 'audience_type', 'platform', 'country']
+
+# Source columns needed to report each plan metric
+METRIC_COLUMNS = {
+    'spend': ['spend'],
+    'revenue': ['revenue'],
+    'roas': ['revenue', 'spend', 'roas'],
+    'ctr': ['ctr', 'clicks', 'impressions'],
+    'clicks': ['clicks'],
+    'impressions': ['impressions'],
+    'purchases': ['purchases'],
+    'cpc': ['spend', 'clicks'],
+    'cpa': ['spend', 'purchases'],
+    'cvr': ['purchases', 'clicks']
+}
+
+# Plan filter keys and the column each one restricts
+DIMENSION_FILTERS = {
+    'campaigns': 'campaign_name',
+    'adsets': 'adset_name',
+    'platforms': 'platform',
+    'countries': 'country',
+    'audience_types': 'audience_type',
+    'creative_types': 'creative_type'
+}
+
+# Dimensions broken down in the summary; finer drill-downs go through drill_down()
+BREAKDOWN_DIMENSIONS = ['audience_type', 'platform', 'country']
+
 
 class DataAgent:
     """Loads CSV data and generates statistical summaries"""
@@ -15,41 +55,319 @@ class DataAgent:
         self.config = config
         self.logger = logger
         self.df = None
+        self.cube = None
+        self.anomalies = []
+        self.creative_index = None
+        self.scope = {}
+        self.shared = []  # SharedFrames published by this agent
+        self.backend = None
+        if config.get('analytics_backend', 'pandas') == 'duckdb':
+            from analytics.duckdb_backend import DuckDBBackend
+            
+            self.backend = DuckDBBackend(config)
     
-    def load_and_summarize(self) -> dict:
-        """Load data and generate comprehensive summary"""
+    def load_and_summarize(self, filters: dict | None = None) -> dict:
+        """
+        Load data and generate comprehensive summary
+        
+        ``filters`` is the planner's structured scope (date window, dimension
+        values, metrics). It is pushed into the read: only needed columns are
+        parsed and rows outside the scope are dropped chunk by chunk.
+        """
         
         # Load data
         data_path = Path(self.config['data_path'])
-        self.logger.info("Loading data", path=str(data_path))
+        self.logger.info("Loading data", path=str(data_path), filters=filters)
         
-        self.df = pd.read_csv(data_path, sep='\t')
+        scope = self._resolve_scope(data_path, filters or {})
+        self.df = self._read(data_path, scope)
         
-        # Parse dates
-        self.df['date'] = pd.to_datetime(self.df['date'], format=self.config.get('date_format', '%d-%m-%Y'))
-        
-        # Handle missing values
-        numeric_cols = ['spend', 'impressions', 'clicks', 'ctr', 'purchases', 'revenue', 'roas']
-        for col in numeric_cols:
-            if col in self.df.columns:
-                self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
+        if scope and self.df.empty:
+            # The planner's scope matched nothing (e.g. unknown campaign name)
+            self.logger.info("Filters matched no rows, loading full dataset", filters=filters)
+            scope = {}
+            self.df = self._read(data_path, scope)
         
         self.logger.info("Data loaded", rows=len(self.df), columns=len(self.df.columns))
         
-        # Generate summary
-        summary = {
-            'overview': self._get_overview(),
-            'performance_by_campaign': self._get_campaign_performance(),
-            'performance_by_adset': self._get_adset_performance(),
-            'creative_performance': self._get_creative_performance(),
-            'time_series': self._get_time_series(),
-            'low_performers': self._get_low_performers(),
-            'top_performers': self._get_top_performers()
-        }
+        self.scope = scope
+        self.cube = DataCube(self.df, min_spend=self.config.get('min_spend_threshold', 50))
+        self.anomalies = detect_anomalies(self.df, self.config)
+        self._load_creative_index()
+        return self.summarize()
+    
+    def summarize(self) -> dict:
+        """
+        Summary views over the loaded (or attached) frame and cube
+        
+        With ``analytics_backend: duckdb`` the overview, performance and
+        time-series sections run as SQL; the pandas methods below are the
+        reference implementation both backends must agree with.
+        """
+        if self.backend is not None:
+            summary = self.backend.summary_sections(self.df)
+            summary['creative_performance'].update(self._creative_exemplars())
+        else:
+            summary = {
+                'overview': self._get_overview(),
+                'performance_by_campaign': self._get_campaign_performance(),
+                'performance_by_adset': self._get_adset_performance(),
+                'creative_performance': self._get_creative_performance(),
+                'time_series': self._get_time_series(),
+                'low_performers': self._get_low_performers(),
+                'top_performers': self._get_top_performers()
+            }
+        summary['dimension_breakdown'] = self._get_dimension_breakdown()
+        summary['anomalies'] = self.anomalies[:self.config.get('max_anomalies', 10)]
+        
+        if self.scope:
+            summary['overview']['scope'] = self.scope['description']
         
         self.logger.info("Summary generated", summary_sections=len(summary))
         return summary
     
+    def publish(self) -> dict:
+        """
+        Put the loaded frame and base cuboid in shared memory for worker processes
+        
+        Returns a small picklable handle; a worker passes it to ``attach``
+        and gets an agent over the same memory without re-reading the
+        source. Call ``release`` once the workers are done.
+        """
+        from analytics.shared_frame import SharedFrame
+        
+        if self.cube is None:
+            raise RuntimeError("publish called before load_and_summarize")
+        
+        frame, base = SharedFrame.publish(self.df), SharedFrame.publish(self.cube.base)
+        self.shared += [frame, base]
+        self.logger.info("Published data to shared memory", bytes=frame.nbytes + base.nbytes)
+        return {
+            'frame': frame.handle,
+            'cube': base.handle,
+            'dimensions': self.cube.dimensions,
+            'min_spend': self.cube.min_spend,
+            'anomalies': self.anomalies,
+            'scope': {'description': self.scope['description']} if self.scope else {},
+            'creative_index': self.creative_index.handle() if self.creative_index is not None else None
+        }
+    
+    @classmethod
+    def attach(cls, handle: dict, config: dict, logger) -> 'DataAgent':
+        """A DataAgent over data another process published, ready for ``summarize``/``drill_down``"""
+        from analytics.shared_frame import SharedFrame
+        
+        agent = cls(config, logger)
+        frame, base = SharedFrame.attach(handle['frame']), SharedFrame.attach(handle['cube'])
+        agent.shared = [frame, base]
+        agent.df = frame.to_frame()
+        agent.cube = DataCube.from_base(base.to_frame(), handle['dimensions'], handle['min_spend'])
+        agent.anomalies = handle['anomalies']
+        agent.scope = handle['scope']
+        if handle['creative_index'] is not None:
+            agent.creative_index = CreativeIndex.from_handle(handle['creative_index'])
+        return agent
+    
+    def release(self):
+        """Drop shared-memory views; blocks this agent published are freed"""
+        self.df = None
+        self.cube = None
+        for shared in self.shared:
+            shared.unlink()
+        self.shared = []
+    
+    def drill_down(self, dimensions: list, filters: dict | None = None, metrics: list | None = None,
+                   sort_by: str = 'spend', ascending: bool = False, top_k: int | None = 20) -> list:
+        """
+        Metrics grouped by ``dimensions`` on demand, optionally within a slice
+        
+        ``filters`` uses the planner's filter keys (campaigns, platforms, ...)
+        plus an optional ``date_window`` with ``start``/``end``. Requires
+        ``load_and_summarize`` to have run.
+        """
+        if self.cube is None:
+            raise RuntimeError("drill_down called before load_and_summarize")
+        
+        filters = dict(filters or {})
+        window = filters.pop('date_window', None) or {}
+        date_range = None
+        if window.get('start') or window.get('end'):
+            date_range = (window.get('start'), window.get('end'))
+        cube_filters = {DIMENSION_FILTERS.get(key, key): _as_list(values) for key, values in filters.items()}
+        
+        return self.cube.query(dimensions, filters=cube_filters, metrics=metrics,
+                               sort_by=sort_by, ascending=ascending, top_k=top_k,
+                               date_range=date_range)
+    
+    def _load_creative_index(self):
+        """
+        Similarity index over all historical copy, whatever the loaded scope
+        
+        Built from an unscoped read of the index columns only, and keyed on
+        the source file, so every scope reuses the one persisted index.
+        """
+        data_path = Path(self.config['data_path'])
+        columns = [c for c in INDEX_COLUMNS if c in self._source_columns(data_path)]
+        if 'creative_message' not in columns:
+            self.creative_index = None
+            return
+        
+        def read_history() -> pd.DataFrame:
+            if self.backend is not None:
+                return self.backend.read(data_path, {'columns': columns})
+            chunks = []
+            for chunk in self._iter_chunks(data_path, columns):
+                for col in NUMERIC_COLUMNS:
+                    if col in chunk.columns:
+                        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+                chunks.append(chunk)
+            return pd.concat(chunks, ignore_index=True)
+        
+        self.creative_index = CreativeIndex.build_or_load(
+            read_history,
+            self.config.get('creative_index_path'),
+            self.config.get('creative_index_features', 4096),
+            key=source_fingerprint(data_path)
+        )
+    
+    def _parse_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Parse dates and coerce numeric columns"""
+        chunk['date'] = pd.to_datetime(chunk['date'], format=self.config.get('date_format', '%d-%m-%Y'))
+        
+        # Handle missing values
+        for col in NUMERIC_COLUMNS:
+            if col in chunk.columns:
+                chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+        return chunk
+    
+    def _iter_chunks(self, data_path: Path, columns: list | None):
+        """Stream the source in chunks, reading only ``columns`` (CSV or Parquet)"""
+        chunksize = self.config.get('read_chunksize', 100000)
+        
+        if data_path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            
+            for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(data_path, sep='\t', usecols=columns, chunksize=chunksize)
+    
+    def _source_columns(self, data_path: Path) -> list:
+        """Column names available in the source"""
+        if data_path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            
+            return pq.ParquetFile(data_path).schema_arrow.names
+        return list(pd.read_csv(data_path, sep='\t', nrows=0).columns)
+    
+    def _resolve_scope(self, data_path: Path, filters: dict) -> dict:
+        """
+        Turn planner filters into columns to read and row predicates
+        
+        Returns an empty dict when the plan does not narrow the scan.
+        """
+        if not filters:
+            return {}
+        
+        available = self._source_columns(data_path)
+        scope = {'description': {}}
+        
+        # Row predicates on dimensions, matched on normalized names
+        dimensions = {}
+        for key, column in DIMENSION_FILTERS.items():
+            values = [v for v in _as_list(filters.get(key)) if v]
+            if values and column in available:
+                dimensions[column] = {normalize_name(v) for v in values}
+                scope['description'][key] = values
+        scope['dimensions'] = dimensions
+        
+        # Date window, widened by the comparison period the time series needs
+        date_range = self._resolve_date_window(data_path, filters.get('date_window') or {})
+        if date_range:
+            start, end = date_range
+            scope['description']['date_window'] = {
+                'start': start.strftime('%Y-%m-%d') if start is not None else None,
+                'end': end.strftime('%Y-%m-%d') if end is not None else None
+            }
+            if start is not None and end is not None:
+                comparison = max(end - start + timedelta(days=1), timedelta(days=self.config.get('lookback_days', 7)))
+                start = start - comparison
+                scope['description']['date_window']['comparison_start'] = start.strftime('%Y-%m-%d')
+            scope['date_range'] = (start, end)
+        
+        # Column pruning from the metrics the plan needs
+        metrics = [m for m in _as_list(filters.get('metrics')) if m in METRIC_COLUMNS]
+        if metrics:
+            needed = set(CORE_COLUMNS) | set(dimensions)
+            for metric in metrics:
+                needed.update(METRIC_COLUMNS[metric])
+            scope['columns'] = [c for c in available if c in needed]
+            scope['description']['metrics'] = metrics
+        
+        if not (dimensions or date_range or metrics):
+            return {}
+        return scope
+    
+    def _resolve_date_window(self, data_path: Path, window: dict):
+        """
+        Absolute (start, end) timestamps for a plan date window (either may be None), or None
+        
+        The window comes from model output: one that cannot be parsed is
+        logged and ignored, since it only narrows the scan.
+        """
+        try:
+            if not isinstance(window, dict):
+                raise TypeError(f"expected an object, got {type(window).__name__}")
+            if window.get('start') or window.get('end'):
+                start = pd.Timestamp(window['start']) if window.get('start') else None
+                end = pd.Timestamp(window['end']) if window.get('end') else None
+                return start, end
+            
+            last_n_days = window.get('last_n_days')
+            if not last_n_days:
+                return None
+            last_n_days = int(last_n_days)
+            if last_n_days < 1:
+                raise ValueError(f"last_n_days must be positive, got {last_n_days}")
+        except (TypeError, ValueError) as e:
+            self.logger.warning("Ignoring malformed date window", window=window, error=str(e))
+            return None
+        
+        # Relative windows are anchored on the latest date: scan the date column only
+        max_date = None
+        for chunk in self._iter_chunks(data_path, ['date']):
+            chunk_max = pd.to_datetime(chunk['date'], format=self.config.get('date_format', '%d-%m-%Y')).max()
+            max_date = chunk_max if max_date is None else max(max_date, chunk_max)
+        if max_date is None or pd.isna(max_date):
+            return None
+        return max_date - timedelta(days=last_n_days - 1), max_date
+    
+    def _read(self, data_path: Path, scope: dict) -> pd.DataFrame:
+        """Read the source, applying column pruning and row filters per chunk"""
+        if self.backend is not None:
+            return self.backend.read(data_path, scope)
+        
+        chunks = []
+        for chunk in self._iter_chunks(data_path, scope.get('columns')):
+            chunk = self._parse_chunk(chunk)
+            
+            if scope.get('date_range'):
+                start, end = scope['date_range']
+                if start is not None:
+                    chunk = chunk[chunk['date'] >= start]
+                if end is not None:
+                    chunk = chunk[chunk['date'] <= end]
+            for column, values in scope.get('dimensions', {}).items():
+                chunk = chunk[chunk[column].map(normalize_name).isin(values)]
+            
+            chunks.append(chunk)
+        
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    
+    def _agg_spec(self, spec: dict) -> dict:
+        """Restrict an aggregation spec to the columns that were loaded"""
+        return {column: how for column, how in spec.items() if column in self.df.columns}
+    
     def _get_overview(self) -> dict:
         """Overall dataset statistics"""
         return {
@@ -61,7 +379,7 @@ class DataAgent:
             },
             'total_spend': float(self.df['spend'].sum()),
             'total_revenue': float(self.df['revenue'].sum()),
-            'total_purchases': int(self.df['purchases'].sum()),
+            'total_purchases': int(self.df['purchases'].sum()) if 'purchases' in self.df.columns else None,
             'overall_roas': float(self.df['revenue'].sum() / self.df['spend'].sum()) if self.df['spend'].sum() > 0 else 0,
             'avg_ctr': float(self.df['ctr'].mean()),
             'unique_campaigns': int(self.df['campaign_name'].nunique()),
@@ -70,14 +388,14 @@ class DataAgent:
     
     def _get_campaign_performance(self) -> list:
         """Performance metrics by campaign"""
-        campaigns = self.df.groupby('campaign_name').agg({
+        campaigns = self.df.groupby('campaign_name').agg(self._agg_spec({
             'spend': 'sum',
             'revenue': 'sum',
             'purchases': 'sum',
             'impressions': 'sum',
             'clicks': 'sum',
             'ctr': 'mean'
-        }).reset_index()
+        })).reset_index()
         
         campaigns['roas'] = campaigns['revenue'] / campaigns['spend']
         campaigns = campaigns.sort_values('spend', ascending=False).head(10)
@@ -86,13 +404,13 @@ class DataAgent:
     
     def _get_adset_performance(self) -> list:
         """Performance metrics by adset"""
-        adsets = self.df.groupby('adset_name').agg({
+        adsets = self.df.groupby('adset_name').agg(self._agg_spec({
             'spend': 'sum',
             'revenue': 'sum',
             'purchases': 'sum',
             'ctr': 'mean',
             'roas': 'mean'
-        }).reset_index()
+        })).reset_index()
         
         adsets = adsets.sort_values('spend', ascending=False).head(15)
         return adsets.to_dict('records')
@@ -117,17 +435,29 @@ class DataAgent:
         
         return {
             'by_type': by_type,
-            'top_messages': top_messages.to_dict('records')
+            'top_messages': top_messages.to_dict('records'),
+            **self._creative_exemplars()
+        }
+    
+    def _creative_exemplars(self) -> dict:
+        """Diverse high performers, preferred over top_messages as prompt exemplars"""
+        if self.creative_index is None:
+            return {}
+        return {
+            'exemplars': self.creative_index.exemplars(
+                k=self.config.get('creative_exemplars', 5),
+                min_spend=100
+            )
         }
     
     def _get_time_series(self) -> dict:
         """Time-based performance trends"""
-        daily = self.df.groupby('date').agg({
+        daily = self.df.groupby('date').agg(self._agg_spec({
             'spend': 'sum',
             'revenue': 'sum',
             'ctr': 'mean',
             'purchases': 'sum'
-        }).reset_index()
+        })).reset_index()
         
         daily['roas'] = daily['revenue'] / daily['spend']
         daily['date'] = daily['date'].dt.strftime('%Y-%m-%d')
@@ -188,4 +518,22 @@ class DataAgent:
         top = top[top['spend'] > 200]  # Minimum spend filter
         top = top.sort_values(['ctr', 'roas'], ascending=False).head(10)
         
-        return top.to_dict('records')
\ No newline at end of file
+        return top.to_dict('records')
+    
+    def _get_dimension_breakdown(self) -> dict:
+        """Spend, ROAS and CTR by audience type, platform and country"""
+        metrics = ['spend', 'revenue', 'roas', 'ctr']
+        return {
+            dimension: self.cube.query([dimension], metrics=metrics, top_k=10)
+            for dimension in BREAKDOWN_DIMENSIONS
+            if dimension in self.cube.dimensions
+        }
+
+
+def _as_list(value) -> list:
+    """Planner filter values as a list; a bare string is one value, not characters"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
@@ -3,8 +3,12 @@ Evaluator Agent - Validates hypotheses with quantitative analysis
 """
 
 import json
-from pathlib import Path
-from openai import OpenAI
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.json_parser import ResponseParseError
+from utils.llm import complete_json, get_client
+from utils.prompt_registry import get_prompt
 
 
 class EvaluatorAgent:
@@ -13,14 +17,10 @@ class EvaluatorAgent:
     def __init__(self, config: dict, logger):
         self.config = config
         self.logger = logger
-        self.client = OpenAI()
-        self.prompt_template = self._load_prompt()
-    
-    def _load_prompt(self) -> str:
-        """Load prompt template from file"""
-        prompt_path = Path(__file__).parent.parent.parent / "prompts" / "evaluator_prompt.md"
-        with open(prompt_path, 'r') as f:
-            return f.read()
+        self.client = get_client()
+        self.prompt_template = get_prompt('evaluator_prompt')
+        self.batch_prompt_template = get_prompt('evaluator_batch_prompt')
+        self.data_tools = None  # DataTools for on-demand queries, set by the orchestrator
     
     def evaluate(self, hypothesis: dict, data_summary: dict) -> dict:
         """
@@ -43,55 +43,271 @@ class EvaluatorAgent:
         summary_str = json.dumps(data_summary, indent=2, default=str)
         hypothesis_str = json.dumps(hypothesis, indent=2)
         
-        prompt = self.prompt_template.replace("{HYPOTHESIS}", hypothesis_str)
-        prompt = prompt.replace("{DATA_SUMMARY}", summary_str)
-        prompt = prompt.replace("{CONFIDENCE_MIN}", str(self.config['confidence_min']))
-        
-        response = self.client.chat.completions.create(
-            model=self.config['openai_model'],
-            messages=[
-                {"role": "system", "content": "You are a quantitative analyst validating marketing hypotheses with rigorous statistical reasoning."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,  # Lower temperature for consistency
-            max_tokens=1500
+        prompt = self.prompt_template.render(
+            HYPOTHESIS=hypothesis_str,
+            DATA_SUMMARY=summary_str,
+            CONFIDENCE_MIN=self.config['confidence_min']
         )
         
-        content = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
+        # Request and parse JSON response
         try:
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            evaluation = json.loads(content)
+            samples = self._sample(
+                messages=[
+                    {"role": "system", "content": "You are a quantitative analyst validating marketing hypotheses with rigorous statistical reasoning."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=1500,
+                schema='evaluation',
+                escalate_if=lambda results: self._borderline(self._aggregate(results).get('confidence'))
+            )
+            evaluation = self._aggregate(samples)
             
             confidence = evaluation.get('confidence', 0.5)
             self.logger.info(
                 "Evaluation complete",
                 confidence=confidence,
-                passed=confidence >= self.config['confidence_min']
+                passed=confidence >= self.config['confidence_min'],
+                spread=evaluation.get('confidence_spread')
             )
             
             return evaluation
             
-        except json.JSONDecodeError as e:
+        except ResponseParseError as e:
             self.logger.error("Failed to parse evaluation", error=str(e))
             # Return low-confidence fallback
-            return {
-                "hypothesis": hypothesis.get('hypothesis', ''),
-                "confidence": 0.3,
-                "evidence": "Unable to validate",
-                "reasoning": "Evaluation parsing failed",
-                "recommendation": "Manual review required"
-            }
+            return self._fallback_evaluation(hypothesis)
+    
+    def _sample(self, messages: list, max_tokens: int, schema: str, escalate_if) -> list:
+        """
+        One or more parsed evaluations of the same prompt
+        
+        With ``evaluator_samples`` > 1 the evaluation is sampled several
+        times (self-consistency): as ``n`` choices of one request, or as
+        concurrent calls through the shared client when ``evaluator_sampling``
+        is "parallel" or data tools are in use. Samples that fail to parse
+        are dropped. ``escalate_if`` receives the list of samples.
+        """
+        count = max(1, int(self.config.get('evaluator_samples', 1)))
+        
+        def call(temperature: float, **kwargs):
+            return complete_json(
+                self.client,
+                self.config,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                schema=schema,
+                agent='evaluator',
+                tools=self.data_tools,
+                **kwargs
+            )
+        
+        if count == 1:
+            # Lower temperature for consistency
+            return [call(0.3, escalate_if=lambda result: escalate_if([result]))]
+        
+        temperature = self.config.get('evaluator_sample_temperature', 0.7)
+        if self.config.get('evaluator_sampling', 'n') == 'n' and self.data_tools is None:
+            return call(temperature, n=count, escalate_if=escalate_if)
+        
+        # Each call goes through the shared scheduler; escalating per sample
+        # would pay for a larger model on every borderline draw
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(call, temperature) for _ in range(count)]
+        samples = []
+        for future in futures:
+            try:
+                samples.append(future.result())
+            except ResponseParseError as e:
+                self.logger.warning("Discarding unparseable evaluation sample", error=str(e))
+        if not samples:
+            raise ResponseParseError(f"None of {count} sampled evaluations could be parsed")
+        return samples
+    
+    def _aggregate(self, samples: list) -> dict:
+        """
+        One evaluation from samples of the same hypothesis
+        
+        The confidence is the median (or mean, per ``evaluator_aggregate``)
+        of the samples' confidences, reported with their population variance
+        and spread (max - min); the text fields come from the sample closest
+        to it. A single sample is returned unchanged.
+        """
+        if len(samples) == 1:
+            return samples[0]
+        
+        confidences = [_confidence(sample) for sample in samples]
+        if self.config.get('evaluator_aggregate', 'median') == 'mean':
+            confidence = statistics.fmean(confidences)
+        else:
+            confidence = statistics.median(confidences)
+        
+        closest = min(range(len(samples)), key=lambda i: abs(confidences[i] - confidence))
+        return {
+            **samples[closest],
+            'confidence': confidence,
+            'confidence_samples': confidences,
+            'confidence_variance': statistics.pvariance(confidences),
+            'confidence_spread': max(confidences) - min(confidences)
+        }
+    
+    def _borderline(self, confidence) -> bool:
+        """Confidence too close to the pass mark to trust a small model's call"""
+        band = self.config.get('escalation_confidence_band', 0.05)
+        try:
+            return abs(float(confidence) - self.config['confidence_min']) <= band
+        except (TypeError, ValueError):
+            return False
+    
+    def _fallback_evaluation(self, hypothesis: dict) -> dict:
+        """Low-confidence result used when an evaluation cannot be parsed"""
+        return {
+            "hypothesis": hypothesis.get('hypothesis', ''),
+            "confidence": 0.3,
+            "evidence": "Unable to validate",
+            "reasoning": "Evaluation parsing failed",
+            "recommendation": "Manual review required"
+        }
     
     def batch_evaluate(self, hypotheses: list, data_summary: dict) -> list:
-        """Evaluate multiple hypotheses"""
+        """
+        Evaluate multiple hypotheses
+        
+        With ``batch_evaluation`` enabled, hypotheses are packed into as few
+        requests as the token budget allows so the data summary is sent once
+        per batch instead of once per hypothesis. Otherwise each hypothesis
+        is evaluated with its own call.
+        """
+        if not self.config.get('batch_evaluation', False):
+            return [self.evaluate(hypothesis, data_summary) for hypothesis in hypotheses]
+        
+        summary_str = json.dumps(data_summary, indent=2, default=str)
         results = []
+        for batch in self._split_batches(hypotheses, summary_str):
+            if len(batch) == 1:
+                results.append(self.evaluate(batch[0], data_summary))
+            else:
+                results.extend(self._evaluate_batch(batch, summary_str, data_summary))
+        return results
+    
+    def _split_batches(self, hypotheses: list, summary_str: str) -> list:
+        """Group hypotheses into batches that fit the prompt and output budgets"""
+        max_size = self.config.get('eval_batch_max_size', 5)
+        token_budget = self.config.get('eval_batch_token_budget', 12000)
+        output_budget = self.config.get('eval_batch_max_output_tokens', 4000)
+        output_per_item = self.config.get('eval_batch_output_tokens_per_item', 600)
+        
+        base_tokens = _estimate_tokens(''.join(self.batch_prompt_template.segments)) + _estimate_tokens(summary_str)
+        
+        batches = []
+        current, current_tokens = [], base_tokens
         for hypothesis in hypotheses:
-            evaluation = self.evaluate(hypothesis, data_summary)
-            results.append(evaluation)
-        return results
\ No newline at end of file
+            item_tokens = _estimate_tokens(json.dumps(hypothesis, indent=2, default=str))
+            fits = (
+                len(current) < max_size
+                and current_tokens + item_tokens <= token_budget
+                and (len(current) + 1) * output_per_item <= output_budget
+            )
+            if current and not fits:
+                batches.append(current)
+                current, current_tokens = [], base_tokens
+            current.append(hypothesis)
+            current_tokens += item_tokens
+        if current:
+            batches.append(current)
+        
+        self.logger.info(
+            "Evaluation batches planned",
+            hypotheses=len(hypotheses),
+            batches=len(batches)
+        )
+        return batches
+    
+    def _evaluate_batch(self, batch: list, summary_str: str, data_summary: dict) -> list:
+        """Evaluate several hypotheses in one request, falling back per hypothesis"""
+        
+        hypotheses_str = json.dumps(
+            [{"index": i, **hypothesis} for i, hypothesis in enumerate(batch)],
+            indent=2,
+            default=str
+        )
+        
+        prompt = self.batch_prompt_template.render(
+            DATA_SUMMARY=summary_str,
+            HYPOTHESIS_COUNT=len(batch),
+            CONFIDENCE_MIN=self.config['confidence_min'],
+            HYPOTHESES=hypotheses_str
+        )
+        
+        output_per_item = self.config.get('eval_batch_output_tokens_per_item', 600)
+        
+        evaluations = {}
+        try:
+            samples = self._sample(
+                messages=[
+                    {"role": "system", "content": "You are a quantitative analyst validating marketing hypotheses with rigorous statistical reasoning."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=output_per_item * len(batch),
+                schema='evaluations',
+                escalate_if=lambda results: any(
+                    self._borderline(evaluation.get('confidence'))
+                    for evaluation in self._merge_batch(results, len(batch)).values()
+                )
+            )
+            evaluations = self._merge_batch(samples, len(batch))
+            
+        except ResponseParseError as e:
+            self.logger.error("Failed to parse batch evaluation", error=str(e), batch_size=len(batch))
+        
+        for evaluation in evaluations.values():
+            confidence = evaluation.get('confidence', 0.5)
+            self.logger.info(
+                "Evaluation complete",
+                confidence=confidence,
+                passed=confidence >= self.config['confidence_min'],
+                spread=evaluation.get('confidence_spread')
+            )
+        
+        missing = [i for i in range(len(batch)) if i not in evaluations]
+        if missing:
+            self.logger.info("Falling back to per-hypothesis evaluation", missing=len(missing))
+            for i in missing:
+                evaluations[i] = self.evaluate(batch[i], data_summary)
+        
+        return [evaluations[i] for i in range(len(batch))]
+    
+    def _merge_batch(self, samples: list, size: int) -> dict:
+        """Index -> aggregated evaluation over every sampled batch response"""
+        grouped = {}
+        for result in samples:
+            seen = {}
+            for position, item in enumerate(result['evaluations']):
+                index = _batch_index(item.get('index', position))
+                if index is not None and 0 <= index < size:
+                    seen.setdefault(index, {key: value for key, value in item.items() if key != 'index'})
+            for index, evaluation in seen.items():
+                grouped.setdefault(index, []).append(evaluation)
+        return {index: self._aggregate(group) for index, group in grouped.items()}
+
+
+def _batch_index(value) -> int | None:
+    """Hypothesis index echoed by the model; accepts "0" as well as 0"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _confidence(evaluation: dict) -> float:
+    try:
+        return float(evaluation.get('confidence', 0.5))
+    except (TypeError, ValueError):
+        return 0.5
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
\ No newline at end of file
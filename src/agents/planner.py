@@ -2,9 +2,9 @@
 Planner Agent - Decomposes user queries into structured subtasks
 """
 
-import json
-from pathlib import Path
-from openai import OpenAI
+from utils.json_parser import ResponseParseError
+from utils.llm import complete_json, get_client
+from utils.prompt_registry import get_prompt
 
 
 class PlannerAgent:
@@ -13,14 +13,8 @@ class PlannerAgent:
     def __init__(self, config: dict, logger):
         self.config = config
         self.logger = logger
-        self.client = OpenAI()
-        self.prompt_template = self._load_prompt()
-    
-    def _load_prompt(self) -> str:
-        """Load prompt template from file"""
-        prompt_path = Path(__file__).parent.parent.parent / "prompts" / "planner_prompt.md"
-        with open(prompt_path, 'r') as f:
-            return f.read()
+        self.client = get_client()
+        self.prompt_template = get_prompt('planner_prompt')
     
     def plan(self, query: str) -> dict:
         """
@@ -30,39 +24,37 @@ class PlannerAgent:
             {
                 "subtasks": [...],
                 "analysis_type": "roas_analysis" | "ctr_analysis" | "creative_audit",
-                "requires_creative": bool
+                "requires_creative": bool,
+                "filters": {
+                    "date_window": {"last_n_days": 7} | {"start": ..., "end": ...} | None,
+                    "campaigns": [...], "adsets": [...], "platforms": [...],
+                    "countries": [...], "metrics": [...]
+                }
             }
         """
         
         self.logger.info("Planner analyzing query", query=query)
         
-        prompt = self.prompt_template.replace("{USER_QUERY}", query)
-        
-        response = self.client.chat.completions.create(
-            model=self.config['openai_model'],
-            messages=[
-                {"role": "system", "content": "You are an expert marketing analyst planning a Facebook Ads performance analysis."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1000
-        )
-        
-        content = response.choices[0].message.content.strip()
+        prompt = self.prompt_template.render(USER_QUERY=query)
         
         # Parse JSON response
         try:
-            # Extract JSON from markdown code blocks if present
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            plan = json.loads(content)
+            plan = complete_json(
+                self.client,
+                self.config,
+                messages=[
+                    {"role": "system", "content": "You are an expert marketing analyst planning a Facebook Ads performance analysis."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=1000,
+                schema='plan',
+                agent='planner'
+            )
             self.logger.info("Plan generated", subtask_count=len(plan.get('subtasks', [])))
             return plan
             
-        except json.JSONDecodeError as e:
+        except ResponseParseError as e:
             self.logger.error("Failed to parse planner response", error=str(e))
             # Fallback plan
             return {
@@ -73,5 +65,6 @@ class PlannerAgent:
                     "Provide recommendations"
                 ],
                 "analysis_type": "general",
-                "requires_creative": True
+                "requires_creative": True,
+                "filters": {}
             }
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Anomaly Detection - Vectorized fatigue, saturation and change-point signals
+"""
+
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+# Entity types scanned for decay, with the column identifying each entity
+ENTITIES = {
+    'creative': 'creative_message',
+    'adset': 'adset_name',
+    'campaign': 'campaign_name'
+}
+
+
+class SeriesMatrix:
+    """
+    Daily metrics for many entities as aligned (entity x day) arrays
+
+    Missing entity-days are NaN so every statistic below runs across all
+    entities at once without per-series Python loops.
+    """
+
+    def __init__(self, df: pd.DataFrame, column: str):
+        metrics = [m for m in ('spend', 'revenue', 'impressions', 'clicks', 'ctr') if m in df.columns]
+        daily = df.groupby([column, 'date'], observed=True)[metrics].sum(min_count=1)
+        if 'ctr' in metrics:
+            daily['ctr'] = df.groupby([column, 'date'], observed=True)['ctr'].mean()
+        wide = daily.unstack('date').sort_index(axis=1)
+
+        self.entities = wide.index.to_numpy()
+        self.dates = wide.columns.get_level_values('date').unique().sort_values()
+        self.values = {m: wide[m].reindex(columns=self.dates).to_numpy(dtype=float) for m in metrics}
+
+    def ratio(self, numerator: str, denominator: str) -> np.ndarray:
+        num, den = self.values[numerator], self.values[denominator]
+        with _quiet():
+            return np.where(den > 0, num / den, np.nan)
+
+    def metric(self, name: str) -> np.ndarray | None:
+        """CTR/ROAS recomputed from components where available"""
+        if name == 'ctr' and {'clicks', 'impressions'} <= self.values.keys():
+            return self.ratio('clicks', 'impressions')
+        if name == 'roas' and {'revenue', 'spend'} <= self.values.keys():
+            return self.ratio('revenue', 'spend')
+        return self.values.get(name)
+
+
+def slopes(matrix: np.ndarray) -> np.ndarray:
+    """Least-squares slope per row against the day index, ignoring NaN"""
+    x = np.arange(matrix.shape[1], dtype=float)
+    mask = ~np.isnan(matrix)
+    y = np.where(mask, matrix, 0.0)
+    xs = np.where(mask, x, 0.0)
+    n = mask.sum(axis=1)
+    sx, sy = xs.sum(axis=1), y.sum(axis=1)
+    sxy, sxx = (xs * y).sum(axis=1), (xs * xs).sum(axis=1)
+    with _quiet():
+        denominator = n * sxx - sx * sx
+        return np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+
+
+def recent_z_scores(matrix: np.ndarray, recent_days: int) -> tuple:
+    """
+    Z-score of each row's recent mean against its own history
+
+    Returns (z, recent mean, baseline mean); the standard error uses the
+    baseline's day-to-day deviation and the number of recent days.
+    """
+    recent, baseline = matrix[:, -recent_days:], matrix[:, :-recent_days]
+    with _quiet():
+        recent_mean = np.nanmean(recent, axis=1)
+        baseline_mean = np.nanmean(baseline, axis=1)
+        baseline_std = np.nanstd(baseline, axis=1, ddof=1)
+        count = (~np.isnan(recent)).sum(axis=1)
+        z = (recent_mean - baseline_mean) / (baseline_std / np.sqrt(count))
+    return np.where(np.isfinite(z), z, np.nan), recent_mean, baseline_mean
+
+
+def change_points(matrix: np.ndarray) -> tuple:
+    """
+    CUSUM change point per row
+
+    Standardizes each series, takes the cumulative sum of deviations and
+    returns the day index after which the level shifts most, with the
+    shift's strength (max |CUSUM| / sqrt(n)).
+    """
+    with _quiet():
+        mean = np.nanmean(matrix, axis=1, keepdims=True)
+        std = np.nanstd(matrix, axis=1, keepdims=True)
+        standardized = np.nan_to_num((matrix - mean) / np.where(std > 0, std, np.nan))
+    cusum = np.cumsum(standardized, axis=1)
+    n = np.maximum((~np.isnan(matrix)).sum(axis=1), 1)
+    index = np.abs(cusum).argmax(axis=1)
+    strength = np.abs(cusum[np.arange(len(index)), index]) / np.sqrt(n)
+    return index, strength
+
+
+def detect_anomalies(df: pd.DataFrame, config: dict) -> list:
+    """
+    Ranked fatigue/saturation/anomaly signals across creatives, adsets and campaigns
+
+    Each entity's daily CTR, ROAS and impressions are scanned together:
+    a falling CTR on a creative is ``creative_fatigue``; a falling CTR or
+    ROAS on an adset whose daily impressions hold or grow (a frequency
+    proxy) is ``audience_saturation``; any other significant recent shift
+    is a ``drop`` or ``spike``. Entities with too little spend or history
+    are skipped. Results are sorted by severity (shift strength weighted
+    by the entity's share of spend).
+    """
+    recent_days = config.get('lookback_days', 7)
+    min_spend = config.get('min_spend_threshold', 50.0)
+    min_days = config.get('anomaly_min_days', 2 * recent_days)
+    z_threshold = config.get('anomaly_z_threshold', 2.5)
+    decay_threshold = config.get('fatigue_slope_threshold', 0.01)  # relative decline per day
+
+    if 'date' not in df.columns or df['date'].nunique() < min_days:
+        return []
+
+    total_spend = float(df['spend'].sum()) or 1.0
+    results = []
+    for entity_type, column in ENTITIES.items():
+        if column not in df.columns:
+            continue
+        series = SeriesMatrix(df, column)
+        spend = np.nansum(series.values['spend'], axis=1)
+        observed = (~np.isnan(series.values['spend'])).sum(axis=1)
+        eligible = (spend >= min_spend) & (observed >= min_days)
+
+        impressions = series.metric('impressions')
+        impressions_trend = _relative(slopes(impressions), impressions) if impressions is not None else None
+
+        for metric in ('ctr', 'roas'):
+            values = series.metric(metric)
+            if values is None:
+                continue
+            trend = _relative(slopes(values), values)
+            z, recent, baseline = recent_z_scores(values, recent_days)
+            cp_index, cp_strength = change_points(values)
+
+            decaying = trend <= -decay_threshold
+            significant = np.abs(np.nan_to_num(z)) >= z_threshold
+            if entity_type == 'creative':
+                fatigue = decaying & (metric == 'ctr')
+            elif entity_type == 'adset' and impressions_trend is not None:
+                fatigue = decaying & (np.nan_to_num(impressions_trend) >= 0)
+            else:
+                fatigue = np.zeros(len(trend), dtype=bool)
+
+            flagged = eligible & (fatigue | significant)
+            for i in np.flatnonzero(flagged):
+                if fatigue[i]:
+                    signal = 'creative_fatigue' if entity_type == 'creative' else 'audience_saturation'
+                else:
+                    signal = 'drop' if z[i] < 0 else 'spike'
+                strength = max(abs(np.nan_to_num(z[i])), cp_strength[i], abs(trend[i]) * len(series.dates))
+                results.append({
+                    'entity_type': entity_type,
+                    'entity': series.entities[i],
+                    'signal': signal,
+                    'metric': metric,
+                    'recent': _float(recent[i]),
+                    'baseline': _float(baseline[i]),
+                    'trend_pct_per_day': _float(trend[i] * 100),
+                    'impressions_trend_pct_per_day': (
+                        _float(impressions_trend[i] * 100) if impressions_trend is not None else None
+                    ),
+                    'z_score': _float(z[i]),
+                    'change_date': series.dates[cp_index[i]].strftime('%Y-%m-%d'),
+                    'spend': float(spend[i]),
+                    'severity': float(strength * np.sqrt(spend[i] / total_spend))
+                })
+
+    results.sort(key=lambda r: -r['severity'])
+    return results
+
+
+def _relative(slope: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Slope as a fraction of the row's mean level"""
+    with _quiet():
+        level = np.nanmean(matrix, axis=1)
+        return np.where(level > 0, slope / level, np.nan)
+
+
+def _float(value) -> float | None:
+    return float(value) if np.isfinite(value) else None
+
+
+@contextmanager
+def _quiet():
+    """Silence numpy's division and all-NaN slice warnings for sparse rows"""
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        yield
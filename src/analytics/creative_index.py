@@ -0,0 +1,252 @@
+"""
+Creative Index - Similarity search over historical ad copy and its performance
+"""
+
+import hashlib
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers import normalize_name
+
+
+# Source columns the index is built from
+INDEX_COLUMNS = ['creative_message', 'spend', 'revenue', 'ctr', 'clicks', 'impressions']
+
+class CreativeIndex:
+    """
+    Hashed TF-IDF vectors of every historical creative message
+
+    Messages are tokenized into word uni/bigrams and character trigrams,
+    hashed into a fixed number of buckets, TF-IDF weighted and L2
+    normalized, so cosine similarity is a single matrix-vector product.
+    Each message keeps its spend-weighted CTR and ROAS, which drive
+    kNN performance predictions and exemplar selection.
+    """
+
+    def __init__(self, messages: list, vectors: np.ndarray, idf: np.ndarray, metrics: dict,
+                 fingerprint: str = '', n_features: int = 4096):
+        self.messages = list(messages)
+        self.vectors = vectors
+        self.idf = idf
+        self.metrics = metrics  # name -> array aligned with messages
+        self.fingerprint = fingerprint
+        self.n_features = n_features
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, n_features: int = 4096, key: str | None = None) -> 'CreativeIndex':
+        """
+        Index the distinct messages in a frame of ad rows
+
+        ``key`` identifies the data for cache reuse; it defaults to a
+        content hash of the frame.
+        """
+        totals = df.groupby('creative_message', observed=True).agg(
+            spend=('spend', 'sum'),
+            revenue=('revenue', 'sum'),
+            ctr=('ctr', 'mean')
+        )
+        if {'clicks', 'impressions'} <= set(df.columns):
+            sums = df.groupby('creative_message', observed=True)[['clicks', 'impressions']].sum()
+            totals['ctr'] = (sums['clicks'] / sums['impressions'].where(sums['impressions'] > 0)).fillna(totals['ctr'])
+        totals['roas'] = totals['revenue'] / totals['spend'].where(totals['spend'] > 0)
+
+        messages = [str(m) for m in totals.index]
+        counts = _term_counts(messages, n_features)
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = (np.log((1 + len(messages)) / (1 + document_frequency)) + 1).astype(np.float32)
+        vectors = _normalize(counts * idf)
+
+        metrics = {name: totals[name].to_numpy(dtype=float) for name in ('spend', 'ctr', 'roas')}
+        return cls(messages, vectors, idf, metrics, key or fingerprint(df), n_features)
+
+    @classmethod
+    def load(cls, path: Path) -> 'CreativeIndex':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                messages=data['messages'].tolist(),
+                vectors=data['vectors'],
+                idf=data['idf'],
+                metrics={name: data[f'metric_{name}'] for name in ('spend', 'ctr', 'roas')},
+                fingerprint=str(data['fingerprint']),
+                n_features=int(data['n_features'])
+            )
+
+    @classmethod
+    def build_or_load(cls, source, path: str | None, n_features: int = 4096,
+                      key: str | None = None) -> 'CreativeIndex':
+        """
+        Reuse the index persisted at ``path`` if it was built from the same data
+
+        ``source`` is a frame of ad rows or a callable returning one; with a
+        callable and a ``key`` (e.g. ``source_fingerprint`` of the file),
+        the rows are only read when the index has to be rebuilt.
+        """
+        if key is None:
+            if callable(source):
+                source = source()
+            key = fingerprint(source)
+        if path:
+            path = Path(path)
+            if path.exists():
+                try:
+                    index = cls.load(path)
+                    if index.fingerprint == key and index.n_features == n_features:
+                        return index
+                except (OSError, KeyError, ValueError):
+                    pass
+        index = cls.build(source() if callable(source) else source, n_features, key)
+        if path:
+            index.save(path)
+        return index
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            messages=np.array(self.messages, dtype=str),
+            vectors=self.vectors,
+            idf=self.idf,
+            fingerprint=np.array(self.fingerprint),
+            n_features=np.array(self.n_features),
+            **{f'metric_{name}': values for name, values in self.metrics.items()}
+        )
+
+    def handle(self) -> dict:
+        """
+        Small picklable form for worker processes
+
+        The vectors are left out; ``from_handle`` recomputes them from the
+        messages and IDF weights, which is cheaper than shipping them.
+        """
+        return {
+            'messages': self.messages,
+            'idf': self.idf,
+            'metrics': self.metrics,
+            'fingerprint': self.fingerprint,
+            'n_features': self.n_features
+        }
+
+    @classmethod
+    def from_handle(cls, handle: dict) -> 'CreativeIndex':
+        index = cls(handle['messages'], None, handle['idf'], handle['metrics'],
+                    handle['fingerprint'], handle['n_features'])
+        index.vectors = index.embed(index.messages)
+        return index
+
+    def embed(self, texts: list) -> np.ndarray:
+        """Vectors for new texts in the index's space"""
+        return _normalize(_term_counts(texts, self.n_features) * self.idf)
+
+    def similarities(self, texts: list) -> np.ndarray:
+        """Cosine similarity of each text to every indexed message (texts x messages)"""
+        if not self.messages or not texts:
+            return np.zeros((len(texts), len(self.messages)), dtype=np.float32)
+        return self.embed(texts) @ self.vectors.T
+
+    def score(self, texts: list, k: int = 5) -> list:
+        """
+        Novelty and kNN-predicted performance for candidate messages
+
+        Novelty is one minus the similarity to the closest historical
+        message; predicted CTR/ROAS average the ``k`` nearest neighbours
+        weighted by similarity (None when nothing is similar at all).
+        """
+        sims = self.similarities(texts)
+        scores = []
+        for text, row in zip(texts, sims):
+            if not len(row):
+                scores.append({'message': text, 'novelty': 1.0, 'nearest': None,
+                               'predicted_ctr': None, 'predicted_roas': None})
+                continue
+            neighbours = np.argsort(-row)[:k]
+            weights = np.clip(row[neighbours], 0, None)
+            scores.append({
+                'message': text,
+                'novelty': float(max(0.0, 1 - row[neighbours[0]])),
+                'nearest': self.messages[neighbours[0]],
+                'predicted_ctr': _weighted(self.metrics['ctr'][neighbours], weights),
+                'predicted_roas': _weighted(self.metrics['roas'][neighbours], weights)
+            })
+        return scores
+
+    def exemplars(self, k: int = 5, metric: str = 'ctr', min_spend: float = 100.0,
+                  max_similarity: float = 0.6) -> list:
+        """
+        Best-performing messages that are not near-copies of each other
+
+        Candidates with at least ``min_spend`` are taken in order of
+        ``metric`` and skipped when too similar to one already picked.
+        """
+        values = np.nan_to_num(self.metrics[metric], nan=-np.inf)
+        eligible = self.metrics['spend'] >= min_spend
+        order = [i for i in np.argsort(-values) if eligible[i] and np.isfinite(values[i])]
+
+        picked = []
+        for i in order:
+            if len(picked) == k:
+                break
+            if picked and float(np.max(self.vectors[picked] @ self.vectors[i])) > max_similarity:
+                continue
+            picked.append(i)
+        return [
+            {
+                'creative_message': self.messages[i],
+                'ctr': float(self.metrics['ctr'][i]),
+                'roas': _finite(self.metrics['roas'][i]),
+                'spend': float(self.metrics['spend'][i])
+            }
+            for i in picked
+        ]
+
+
+def source_fingerprint(path) -> str:
+    """Identity of a source file (resolved path, size, modification time), without reading it"""
+    path = Path(path)
+    stat = path.stat()
+    return hashlib.sha1(f'{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8')).hexdigest()
+
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of the columns the index is built from"""
+    columns = [c for c in INDEX_COLUMNS if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+
+def _features(text: str) -> list:
+    """Word unigrams and bigrams plus character trigrams of the normalized text"""
+    words = normalize_name(text).split()
+    features = [f'w:{w}' for w in words]
+    features += [f'b:{a} {b}' for a, b in zip(words, words[1:])]
+    joined = f" {' '.join(words)} "
+    features += [f'c:{joined[i:i + 3]}' for i in range(len(joined) - 2)]
+    return features
+
+
+def _term_counts(texts: list, n_features: int) -> np.ndarray:
+    counts = np.zeros((len(texts), n_features), dtype=np.float32)
+    for row, text in enumerate(texts):
+        buckets = [zlib.crc32(feature.encode('utf-8')) % n_features for feature in _features(text)]
+        np.add.at(counts[row], buckets, 1.0)
+    # Sublinear term frequency
+    return np.log1p(counts)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def _weighted(values: np.ndarray, weights: np.ndarray) -> float | None:
+    mask = np.isfinite(values) & (weights > 0)
+    if not mask.any():
+        return None
+    return float(np.average(values[mask], weights=weights[mask]))
+
+
+def _finite(value) -> float | None:
+    return float(value) if np.isfinite(value) else None
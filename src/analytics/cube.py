@@ -0,0 +1,187 @@
+"""
+Data Cube - Multi-dimensional rollups and drill-down queries over ad data
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from utils.helpers import normalize_name
+
+
+DIMENSIONS = ['campaign_name', 'adset_name', 'creative_type', 'audience_type', 'platform', 'country', 'date']
+
+# Metrics that can be summed from the base cuboid into any coarser rollup
+ADDITIVE_METRICS = ['spend', 'revenue', 'impressions', 'clicks', 'purchases']
+
+# Row-level rates kept as sums so rollups can report their mean
+AVERAGED_METRICS = ['ctr', 'roas']
+
+# Ratio metrics recomputed from additive components: name -> (numerator, denominator)
+DERIVED_METRICS = {
+    'roas': ('revenue', 'spend'),
+    'ctr': ('clicks', 'impressions'),
+    'cpc': ('spend', 'clicks'),
+    'cvr': ('purchases', 'clicks')
+}
+
+
+class DataCube:
+    """
+    Rollups over any subset of the ad dimensions
+
+    The raw rows are aggregated once into a base cuboid at the finest grain
+    of all dimensions; every coarser rollup is then a groupby over that much
+    smaller frame, memoized per dimension set. Cells below ``min_spend`` are
+    pruned from query results as too sparse to reason about.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions: list | None = None, min_spend: float = 0.0):
+        self.dimensions = [d for d in (dimensions or DIMENSIONS) if d in df.columns]
+        self.additive = [m for m in ADDITIVE_METRICS if m in df.columns]
+        self.averaged = [m for m in AVERAGED_METRICS if m in df.columns]
+        self.min_spend = min_spend
+        self._rollups = {}
+
+        sums = {m: (m, 'sum') for m in self.additive}
+        sums.update({f'{m}_sum': (m, 'sum') for m in self.averaged})
+        sums.update({f'{m}_count': (m, 'count') for m in self.averaged})
+        sums['rows'] = (self.dimensions[0], 'size')
+
+        self.base = (
+            df.groupby(self.dimensions, observed=True, dropna=False, sort=False)
+            .agg(**sums)
+            .reset_index()
+        )
+
+    @classmethod
+    def from_base(cls, base: pd.DataFrame, dimensions: list, min_spend: float = 0.0) -> 'DataCube':
+        """A cube over an already aggregated base cuboid (e.g. one attached from shared memory)"""
+        cube = cls.__new__(cls)
+        cube.dimensions = list(dimensions)
+        cube.additive = [m for m in ADDITIVE_METRICS if m in base.columns]
+        cube.averaged = [m for m in AVERAGED_METRICS if f'{m}_sum' in base.columns]
+        cube.min_spend = min_spend
+        cube._rollups = {}
+        cube.base = base
+        return cube
+
+    def rollup(self, dimensions: tuple) -> pd.DataFrame:
+        """Aggregate the base cuboid to ``dimensions`` (memoized), with derived rates"""
+        dimensions = tuple(dimensions)
+        unknown = set(dimensions) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {', '.join(sorted(unknown))}")
+
+        if dimensions not in self._rollups:
+            value_columns = [c for c in self.base.columns if c not in self.dimensions]
+            if dimensions:
+                frame = self.base.groupby(list(dimensions), observed=True, dropna=False)[value_columns].sum().reset_index()
+            else:
+                frame = self.base[value_columns].sum().to_frame().T
+            self._rollups[dimensions] = self._derive(frame)
+        return self._rollups[dimensions]
+
+    def rollups(self, max_dims: int = 2, dimensions: list | None = None) -> dict:
+        """All rollups over subsets of ``dimensions`` with up to ``max_dims`` members"""
+        dimensions = [d for d in (dimensions or self.dimensions) if d in self.dimensions]
+        result = {}
+        for size in range(1, max_dims + 1):
+            for subset in combinations(dimensions, size):
+                result[subset] = self.rollup(subset)
+        return result
+
+    def query(self, dimensions: list, filters: dict | None = None, metrics: list | None = None,
+              sort_by: str = 'spend', ascending: bool = False, top_k: int | None = 20,
+              date_range: tuple | None = None) -> list:
+        """
+        Drill down to ``dimensions`` within an optional slice
+
+        ``filters`` maps dimension columns to allowed values (matched on
+        normalized names); ``date_range`` is an inclusive (start, end) pair.
+        Returns JSON-ready records.
+        """
+        unknown = set(dimensions) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {', '.join(sorted(unknown))}")
+        
+        filters = {k: v for k, v in (filters or {}).items() if v}
+        if filters or date_range:
+            frame = self._slice(filters, date_range)
+            group = list(dimensions)
+            value_columns = [c for c in frame.columns if c not in self.dimensions]
+            if group:
+                frame = frame.groupby(group, observed=True, dropna=False)[value_columns].sum().reset_index()
+            else:
+                frame = frame[value_columns].sum().to_frame().T
+            frame = self._derive(frame)
+        else:
+            frame = self.rollup(tuple(dimensions))
+
+        frame = frame[frame['spend'] >= self.min_spend] if 'spend' in frame.columns else frame
+        if sort_by in frame.columns:
+            frame = frame.sort_values(sort_by, ascending=ascending)
+        if top_k:
+            frame = frame.head(top_k)
+
+        columns = list(dimensions) + [c for c in (metrics or self.metric_columns) if c in frame.columns]
+        return _to_records(frame[columns])
+
+    @property
+    def metric_columns(self) -> list:
+        """Metrics reported by rollups and queries"""
+        derived = list(DERIVED_METRICS) + [f'avg_{m}' for m in AVERAGED_METRICS]
+        return self.additive + [c for c in derived if self._can_derive(c)] + ['rows']
+
+    def _slice(self, filters: dict, date_range: tuple | None) -> pd.DataFrame:
+        mask = np.ones(len(self.base), dtype=bool)
+        for column, values in filters.items():
+            if column not in self.base.columns:
+                raise ValueError(f"Unknown filter dimension: {column}")
+            allowed = {normalize_name(v) for v in values}
+            mask &= self.base[column].map(normalize_name).isin(allowed).to_numpy()
+        if date_range and 'date' in self.base.columns:
+            start, end = date_range
+            if start is not None:
+                mask &= (self.base['date'] >= pd.Timestamp(start)).to_numpy()
+            if end is not None:
+                mask &= (self.base['date'] <= pd.Timestamp(end)).to_numpy()
+        return self.base[mask]
+
+    def _can_derive(self, metric: str) -> bool:
+        if metric.startswith('avg_'):
+            return metric[4:] in self.averaged
+        return set(DERIVED_METRICS[metric]) <= set(self.additive) or metric in self.averaged
+
+    def _derive(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute ratio metrics from summed components
+
+        Where a component was not loaded (e.g. pruned by the planner's
+        metrics), ctr/roas fall back to the mean of the row-level rate.
+        """
+        frame = frame.copy()
+        frame['rows'] = frame['rows'].astype(int)
+        for metric in self.averaged:
+            frame[f'avg_{metric}'] = _ratio(frame[f'{metric}_sum'], frame[f'{metric}_count'])
+        for metric, (numerator, denominator) in DERIVED_METRICS.items():
+            if {numerator, denominator} <= set(self.additive):
+                frame[metric] = _ratio(frame[numerator], frame[denominator])
+            elif metric in self.averaged:
+                frame[metric] = frame[f'avg_{metric}']
+        return frame
+
+
+def _ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    return (numerator / denominator.where(denominator != 0)).astype(float)
+
+
+def _to_records(frame: pd.DataFrame) -> list:
+    """Records with dates as strings and NaN as None"""
+    frame = frame.copy()
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.strftime('%Y-%m-%d')
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
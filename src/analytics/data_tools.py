@@ -0,0 +1,253 @@
+"""
+Data Tools - Memoized data queries exposed to agents via function calling
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+
+# OpenAI function-calling definitions for each tool
+FILTERS_SCHEMA = {
+    'type': 'object',
+    'description': 'Optional slice, e.g. {"campaigns": ["Men ComfortMax Launch"], "platforms": ["Instagram"]}',
+    'properties': {
+        key: {'type': 'array', 'items': {'type': 'string'}}
+        for key in ['campaigns', 'adsets', 'platforms', 'countries', 'audience_types', 'creative_types']
+    }
+}
+
+WINDOW_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'start': {'type': 'string', 'description': 'YYYY-MM-DD, inclusive'},
+        'end': {'type': 'string', 'description': 'YYYY-MM-DD, inclusive'}
+    }
+}
+
+DIMENSION_SCHEMA = {
+    'type': 'string',
+    'enum': ['campaign_name', 'adset_name', 'creative_type', 'audience_type', 'platform', 'country', 'date']
+}
+
+METRIC_SCHEMA = {
+    'type': 'string',
+    'enum': ['spend', 'revenue', 'impressions', 'clicks', 'purchases', 'roas', 'ctr', 'cpc', 'cvr']
+}
+
+TOOL_SPECS = [
+    {
+        'type': 'function',
+        'function': {
+            'name': 'metric_by_dimension',
+            'description': 'Aggregate metrics grouped by one or more dimensions, optionally within a filter slice and date window.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'dimensions': {'type': 'array', 'items': DIMENSION_SCHEMA},
+                    'metrics': {'type': 'array', 'items': METRIC_SCHEMA},
+                    'filters': FILTERS_SCHEMA,
+                    'window': WINDOW_SCHEMA,
+                    'limit': {'type': 'integer', 'description': 'Maximum rows (default 20), sorted by spend'}
+                },
+                'required': ['dimensions']
+            }
+        }
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'top_k',
+            'description': 'Best (or worst) values of a dimension ranked by a metric.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'dimension': DIMENSION_SCHEMA,
+                    'metric': METRIC_SCHEMA,
+                    'k': {'type': 'integer'},
+                    'worst': {'type': 'boolean', 'description': 'Rank ascending instead'},
+                    'filters': FILTERS_SCHEMA,
+                    'window': WINDOW_SCHEMA
+                },
+                'required': ['dimension', 'metric']
+            }
+        }
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'compare_windows',
+            'description': 'Compare metrics between two date windows, overall or per dimension value, with absolute and percent change.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'current': WINDOW_SCHEMA,
+                    'previous': WINDOW_SCHEMA,
+                    'dimension': DIMENSION_SCHEMA,
+                    'metrics': {'type': 'array', 'items': METRIC_SCHEMA},
+                    'filters': FILTERS_SCHEMA
+                },
+                'required': ['current', 'previous']
+            }
+        }
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'anomalies',
+            'description': 'Ranked fatigue, saturation and anomaly signals (CTR/ROAS trends, recent shifts, change dates) per creative, adset and campaign.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'entity_type': {'type': 'string', 'enum': ['creative', 'adset', 'campaign']},
+                    'signal': {'type': 'string', 'enum': ['creative_fatigue', 'audience_saturation', 'drop', 'spike']},
+                    'limit': {'type': 'integer'}
+                }
+            }
+        }
+    }
+]
+
+DEFAULT_METRICS = ['spend', 'revenue', 'roas', 'ctr']
+
+
+class DataTools:
+    """
+    Fast query tools over a loaded DataAgent
+
+    Each tool answers from the agent's data cube or anomaly scan. Results are memoized in
+    an LRU cache keyed by tool name and canonicalized arguments, so agents
+    repeating a query (or several agents asking the same one) pay for it
+    once.
+    """
+
+    def __init__(self, data_agent, config: dict):
+        self.data_agent = data_agent
+        self.cache_size = config.get('data_tools_cache_size', 256)
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def specs(self) -> list:
+        """Tool definitions for the chat completions ``tools`` parameter"""
+        return TOOL_SPECS
+
+    def call(self, name: str, arguments) -> str:
+        """
+        Run a tool by name and return its JSON-encoded result
+
+        ``arguments`` is the JSON string (or dict) from the model's tool
+        call. Bad calls return an ``error`` payload for the model to read
+        rather than raising.
+        """
+        try:
+            if isinstance(arguments, str):
+                arguments = json.loads(arguments or '{}')
+            handler = getattr(self, f'_tool_{name}', None)
+            if handler is None:
+                raise ValueError(f"Unknown tool: {name}")
+
+            key = f"{name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+            with self.lock:
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    return self.cache[key]
+
+            result = json.dumps(handler(**arguments), default=str)
+            with self.lock:
+                self.misses += 1
+                self.cache[key] = result
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            return result
+
+        except (ValueError, TypeError, KeyError) as e:
+            return json.dumps({'error': str(e)})
+
+    def _tool_metric_by_dimension(self, dimensions: list, metrics: list | None = None,
+                                  filters: dict | None = None, window: dict | None = None,
+                                  limit: int = 20) -> list:
+        return self.data_agent.drill_down(
+            dimensions,
+            filters=_with_window(filters, window),
+            metrics=metrics or DEFAULT_METRICS,
+            top_k=limit
+        )
+
+    def _tool_top_k(self, dimension: str, metric: str, k: int = 5, worst: bool = False,
+                    filters: dict | None = None, window: dict | None = None) -> list:
+        metrics = [metric] if metric == 'spend' else [metric, 'spend']
+        return self.data_agent.drill_down(
+            [dimension],
+            filters=_with_window(filters, window),
+            metrics=metrics,
+            sort_by=metric,
+            ascending=worst,
+            top_k=k
+        )
+
+    def _tool_compare_windows(self, current: dict, previous: dict, dimension: str | None = None,
+                              metrics: list | None = None, filters: dict | None = None) -> list:
+        metrics = metrics or DEFAULT_METRICS
+        dimensions = [dimension] if dimension else []
+
+        def by_key(window):
+            rows = self.data_agent.drill_down(dimensions, filters=_with_window(filters, window),
+                                              metrics=metrics, top_k=None)
+            return {tuple(row[d] for d in dimensions): row for row in rows}
+
+        now, before = by_key(current), by_key(previous)
+        comparison = []
+        for key in now.keys() | before.keys():
+            entry = dict(zip(dimensions, key))
+            for metric in metrics:
+                a = now.get(key, {}).get(metric)
+                b = before.get(key, {}).get(metric)
+                entry[metric] = {'current': a, 'previous': b}
+                if a is not None and b is not None:
+                    entry[metric]['change'] = a - b
+                    entry[metric]['change_pct'] = (a - b) / b * 100 if b else None
+            comparison.append(entry)
+        comparison.sort(key=lambda e: -(e.get('spend', {}).get('current') or 0))
+        return comparison
+
+    def _tool_anomalies(self, entity_type: str | None = None, signal: str | None = None,
+                        limit: int = 10) -> list:
+        return [
+            anomaly for anomaly in self.data_agent.anomalies
+            if entity_type in (None, anomaly['entity_type']) and signal in (None, anomaly['signal'])
+        ][:limit]
+
+
+def _with_window(filters: dict | None, window: dict | None) -> dict:
+    filters = dict(filters or {})
+    if window:
+        filters['date_window'] = window
+    return filters
+
+
+def compact_summary(summary: dict) -> dict:
+    """
+    The headline numbers of a full summary, for prompts backed by data tools
+
+    Keeps the overview, the week-over-week change, the strongest anomaly
+    signals and the names needed to address the tools; breakdowns are
+    fetched on demand instead.
+    """
+    time_series = summary.get('time_series', {})
+    return {
+        'overview': summary.get('overview', {}),
+        'last_7_days': time_series.get('last_7_days'),
+        'prev_7_days': time_series.get('prev_7_days'),
+        'change': time_series.get('change'),
+        'campaigns': [c.get('campaign_name') for c in summary.get('performance_by_campaign', [])],
+        'dimension_values': {
+            dimension: [row.get(dimension) for row in rows]
+            for dimension, rows in summary.get('dimension_breakdown', {}).items()
+        },
+        'anomalies': summary.get('anomalies', [])[:5],
+        'data_access': 'Summary is abbreviated. Call the data tools (metric_by_dimension, top_k, '
+                       'compare_windows, anomalies) for any breakdown you need to cite.'
+    }
@@ -0,0 +1,282 @@
+"""
+DuckDB Backend - Scoped reads and summary aggregations on an embedded SQL engine
+"""
+
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+NUMERIC_COLUMNS = ['spend', 'impressions', 'clicks', 'ctr', 'purchases', 'revenue', 'roas']
+
+# SQL equivalent of utils.helpers.normalize_name
+NORMALIZED = "trim(regexp_replace(lower(CAST({column} AS VARCHAR)), '[^0-9a-z]+', ' ', 'g'))"
+
+
+class DuckDBBackend:
+    """
+    Runs the DataAgent's reads and summary sections through DuckDB
+
+    The source file is scanned by DuckDB's multi-threaded CSV/Parquet
+    reader with the scope's columns projected and its date and dimension
+    predicates pushed into the scan. The summary sections are SQL over the
+    loaded frame and return exactly what the pandas methods of
+    ``DataAgent`` (the reference implementation) return.
+    """
+
+    def __init__(self, config: dict):
+        import duckdb
+
+        self.config = config
+        self.connection = duckdb.connect()
+        if config.get('duckdb_threads'):
+            self.connection.execute(f"SET threads = {int(config['duckdb_threads'])}")
+
+    def source_types(self, data_path: Path) -> dict:
+        """Column name -> DuckDB type of the source, in file order"""
+        described = self.connection.execute(f"DESCRIBE SELECT * FROM {self._scan(data_path)}").fetchall()
+        return {row[0]: row[1] for row in described}
+
+    def read(self, data_path: Path, scope: dict) -> pd.DataFrame:
+        """Source rows in file order, restricted to the scope's columns and predicates"""
+        types = self.source_types(data_path)
+        columns = scope.get('columns') or list(types)
+
+        select = []
+        for column in columns:
+            quoted = _quote(column)
+            if column == 'date' and types[column] == 'VARCHAR':
+                date_format = self.config.get('date_format', '%d-%m-%Y')
+                select.append(f"strptime({quoted}, '{date_format}') AS {quoted}")
+            elif column in NUMERIC_COLUMNS and types[column] == 'VARCHAR':
+                select.append(f"TRY_CAST({quoted} AS DOUBLE) AS {quoted}")
+            else:
+                select.append(quoted)
+
+        where, parameters = [], []
+        start, end = scope.get('date_range') or (None, None)
+        if start is not None:
+            where.append("date >= ?")
+            parameters.append(pd.Timestamp(start).to_pydatetime())
+        if end is not None:
+            where.append("date <= ?")
+            parameters.append(pd.Timestamp(end).to_pydatetime())
+        for column, values in scope.get('dimensions', {}).items():
+            placeholders = ', '.join('?' for _ in values)
+            where.append(f"{NORMALIZED.format(column=_quote(column))} IN ({placeholders})")
+            parameters.extend(sorted(values))
+
+        query = f"SELECT * FROM (SELECT {', '.join(select)} FROM {self._scan(data_path)})"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        return self.connection.execute(query, parameters).df()
+
+    def summary_sections(self, df: pd.DataFrame) -> dict:
+        """The overview, performance and time-series sections of the summary"""
+        self.connection.register('ads', df)
+        try:
+            return {
+                'overview': self._overview(df),
+                'performance_by_campaign': self._campaign_performance(df),
+                'performance_by_adset': self._adset_performance(df),
+                'creative_performance': self._creative_performance(),
+                'time_series': self._time_series(df),
+                'low_performers': self._low_performers(),
+                'top_performers': self._top_performers()
+            }
+        finally:
+            self.connection.unregister('ads')
+
+    def _scan(self, data_path: Path) -> str:
+        path = str(data_path).replace("'", "''")
+        if Path(data_path).suffix == '.parquet':
+            return f"read_parquet('{path}')"
+        return f"read_csv('{path}', delim='\\t', header=true)"
+
+    def _frame(self, query: str, parameters: list | None = None) -> pd.DataFrame:
+        return self.connection.execute(query, parameters or []).df()
+
+    def _overview(self, df: pd.DataFrame) -> dict:
+        purchases = "CAST(SUM(purchases) AS BIGINT)" if 'purchases' in df.columns else "NULL"
+        row = self._frame(f"""
+            SELECT COUNT(*) AS total_rows, MIN(date) AS start, MAX(date) AS "end",
+                   COALESCE(SUM(spend), 0) AS total_spend, COALESCE(SUM(revenue), 0) AS total_revenue,
+                   {purchases} AS total_purchases, AVG(ctr) AS avg_ctr,
+                   COUNT(DISTINCT campaign_name) AS unique_campaigns,
+                   COUNT(DISTINCT adset_name) AS unique_adsets
+            FROM ads
+        """).iloc[0]
+        return {
+            'total_rows': int(row['total_rows']),
+            'date_range': {
+                'start': row['start'].strftime('%Y-%m-%d'),
+                'end': row['end'].strftime('%Y-%m-%d'),
+                'days': int((row['end'] - row['start']).days)
+            },
+            'total_spend': float(row['total_spend']),
+            'total_revenue': float(row['total_revenue']),
+            'total_purchases': int(row['total_purchases']) if 'purchases' in df.columns else None,
+            'overall_roas': float(row['total_revenue'] / row['total_spend']) if row['total_spend'] > 0 else 0,
+            'avg_ctr': _float(row['avg_ctr']),
+            'unique_campaigns': int(row['unique_campaigns']),
+            'unique_adsets': int(row['unique_adsets'])
+        }
+
+    def _campaign_performance(self, df: pd.DataFrame) -> list:
+        aggregates = _aggregates(df, {
+            'spend': 'sum',
+            'revenue': 'sum',
+            'purchases': 'sum',
+            'impressions': 'sum',
+            'clicks': 'sum',
+            'ctr': 'mean'
+        })
+        return _records(self._frame(f"""
+            SELECT campaign_name, {aggregates}, SUM(revenue) / SUM(spend) AS roas
+            FROM ads WHERE campaign_name IS NOT NULL
+            GROUP BY campaign_name ORDER BY spend DESC, campaign_name LIMIT 10
+        """))
+
+    def _adset_performance(self, df: pd.DataFrame) -> list:
+        aggregates = _aggregates(df, {
+            'spend': 'sum',
+            'revenue': 'sum',
+            'purchases': 'sum',
+            'ctr': 'mean',
+            'roas': 'mean'
+        })
+        return _records(self._frame(f"""
+            SELECT adset_name, {aggregates}
+            FROM ads WHERE adset_name IS NOT NULL
+            GROUP BY adset_name ORDER BY spend DESC, adset_name LIMIT 15
+        """))
+
+    def _creative_performance(self) -> dict:
+        by_type = self._frame("""
+            SELECT creative_type, SUM(spend) AS spend, AVG(ctr) AS ctr, AVG(roas) AS roas, SUM(revenue) AS revenue
+            FROM ads WHERE creative_type IS NOT NULL
+            GROUP BY creative_type ORDER BY creative_type
+        """)
+        top_messages = self._frame("""
+            SELECT * FROM (
+                SELECT creative_message, AVG(ctr) AS ctr, AVG(roas) AS roas, SUM(spend) AS spend
+                FROM ads WHERE creative_message IS NOT NULL GROUP BY creative_message
+            ) WHERE spend > 100
+            ORDER BY ctr DESC, creative_message LIMIT 10
+        """)
+        return {'by_type': _records(by_type), 'top_messages': _records(top_messages)}
+
+    def _time_series(self, df: pd.DataFrame) -> dict:
+        aggregates = _aggregates(df, {
+            'spend': 'sum',
+            'revenue': 'sum',
+            'ctr': 'mean',
+            'purchases': 'sum'
+        })
+        daily = self._frame(f"""
+            SELECT * FROM (
+                SELECT date, {aggregates}, SUM(revenue) / SUM(spend) AS roas
+                FROM ads WHERE date IS NOT NULL GROUP BY date ORDER BY date DESC LIMIT 30
+            ) ORDER BY date
+        """)
+        daily['date'] = daily['date'].dt.strftime('%Y-%m-%d')
+
+        max_date = self._frame("SELECT MAX(date) AS max_date FROM ads")['max_date'].iloc[0]
+        windows = self._frame("""
+            SELECT CASE WHEN date > ? THEN 'last' ELSE 'prev' END AS window,
+                   SUM(spend) AS spend, SUM(revenue) AS revenue, AVG(ctr) AS ctr
+            FROM ads WHERE date > ? GROUP BY 1
+        """, [(max_date - timedelta(days=7)).to_pydatetime(), (max_date - timedelta(days=14)).to_pydatetime()])
+        windows = {row['window']: row for row in windows.to_dict('records')}
+        empty = {'spend': 0.0, 'revenue': 0.0, 'ctr': np.nan}
+        last_7, prev_7 = windows.get('last', empty), windows.get('prev', empty)
+
+        last_7_roas = last_7['revenue'] / last_7['spend'] if last_7['spend'] > 0 else 0
+        prev_7_roas = prev_7['revenue'] / prev_7['spend'] if prev_7['spend'] > 0 else 0
+
+        return {
+            'daily_metrics': _records(daily),
+            'last_7_days': {
+                'roas': float(last_7_roas),
+                'ctr': _float(last_7['ctr']),
+                'spend': float(last_7['spend'] or 0)
+            },
+            'prev_7_days': {
+                'roas': float(prev_7_roas),
+                'ctr': _float(prev_7['ctr']),
+                'spend': float(prev_7['spend'] or 0)
+            },
+            'change': {
+                'roas_change': float(last_7_roas - prev_7_roas),
+                'roas_change_pct': float((last_7_roas - prev_7_roas) / prev_7_roas * 100) if prev_7_roas > 0 else 0
+            }
+        }
+
+    def _low_performers(self) -> list:
+        low_ctr_threshold = self.config.get('low_ctr_threshold', 0.015)
+        min_spend = self.config.get('min_spend_threshold', 50)
+        return _records(self._frame(f"""
+            WITH low AS (SELECT * FROM ads WHERE ctr < ? AND campaign_name IS NOT NULL)
+            SELECT * FROM (
+                SELECT campaign_name, AVG(ctr) AS ctr, SUM(spend) AS spend, AVG(roas) AS roas
+                FROM low GROUP BY campaign_name
+            ) LEFT JOIN ({_mode('low', 'campaign_name', 'creative_message')}) USING (campaign_name)
+            WHERE spend > ?
+            ORDER BY spend DESC, campaign_name LIMIT 10
+        """, [low_ctr_threshold, min_spend]))
+
+    def _top_performers(self) -> list:
+        return _records(self._frame(f"""
+            WITH rows AS (SELECT * FROM ads WHERE campaign_name IS NOT NULL)
+            SELECT * FROM (
+                SELECT campaign_name, AVG(ctr) AS ctr, AVG(roas) AS roas, SUM(spend) AS spend
+                FROM rows GROUP BY campaign_name
+            )
+            LEFT JOIN ({_mode('rows', 'campaign_name', 'creative_type')}) USING (campaign_name)
+            LEFT JOIN ({_mode('rows', 'campaign_name', 'creative_message')}) USING (campaign_name)
+            WHERE spend > 200
+            ORDER BY ctr DESC, roas DESC, campaign_name LIMIT 10
+        """))
+
+
+def _aggregates(df: pd.DataFrame, spec: dict) -> str:
+    """SELECT list for an aggregation spec, restricted to the loaded columns"""
+    functions = {'sum': 'SUM', 'mean': 'AVG'}
+    parts = []
+    for column, how in spec.items():
+        if column not in df.columns:
+            continue
+        expression = f"{functions[how]}({_quote(column)})"
+        if how == 'sum' and pd.api.types.is_integer_dtype(df[column]):
+            expression = f"CAST({expression} AS BIGINT)"
+        parts.append(f"{expression} AS {_quote(column)}")
+    return ', '.join(parts)
+
+
+def _mode(table: str, group: str, column: str) -> str:
+    """Most frequent ``column`` per ``group``, ties to the smallest value (as pandas' mode()[0])"""
+    return f"""
+        SELECT {group}, {column} FROM (
+            SELECT {group}, {column},
+                   ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY COUNT(*) DESC, {column}) AS rank
+            FROM {table} WHERE {column} IS NOT NULL GROUP BY {group}, {column}
+        ) WHERE rank = 1
+    """
+
+
+def _records(frame: pd.DataFrame) -> list:
+    """JSON-ready records with native Python scalars, as pandas' to_dict returns"""
+    return [
+        {key: value.item() if isinstance(value, np.generic) else value for key, value in row.items()}
+        for row in frame.to_dict('records')
+    ]
+
+
+def _float(value) -> float:
+    return float('nan') if value is None or pd.isna(value) else float(value)
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
@@ -0,0 +1,102 @@
+"""
+Shared Frame - Typed DataFrame columns in shared memory for worker processes
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+class SharedFrame:
+    """
+    A DataFrame whose column buffers live in ``multiprocessing.shared_memory``
+
+    Numeric and datetime columns are copied once into their own block;
+    text columns are dictionary-encoded (codes in a block, the distinct
+    values in the handle). ``handle`` is a small picklable dict, so a
+    worker receives it instead of the pickled frame and ``attach`` maps
+    the same memory: numeric columns are zero-copy views.
+
+    Workers must be started from the publishing process (multiprocessing
+    pools, ProcessPoolExecutor) so they share its resource tracker; the
+    publisher calls ``unlink`` once every worker is done.
+    """
+
+    def __init__(self, handle: dict, blocks: list, owner: bool = False):
+        self.handle = handle
+        self.blocks = blocks
+        self.owner = owner
+
+    @classmethod
+    def publish(cls, df: pd.DataFrame) -> 'SharedFrame':
+        """Copy ``df`` into new shared memory blocks"""
+        columns, blocks = [], []
+        try:
+            for name in df.columns:
+                values, spec = _encode(df[name])
+                block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+                columns.append({**spec, 'name': name, 'block': block.name, 'dtype': values.dtype.str})
+        except Exception:
+            for block in blocks:
+                block.close()
+                block.unlink()
+            raise
+        return cls({'rows': len(df), 'columns': columns}, blocks, owner=True)
+
+    @classmethod
+    def attach(cls, handle: dict) -> 'SharedFrame':
+        """Map the blocks described by a published frame's ``handle``"""
+        blocks = [shared_memory.SharedMemory(name=column['block']) for column in handle['columns']]
+        return cls(handle, blocks)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The frame as views over the shared blocks (text columns as categoricals)"""
+        rows = self.handle['rows']
+        data = {}
+        for column, block in zip(self.handle['columns'], self.blocks):
+            values = np.ndarray((rows,), dtype=np.dtype(column['dtype']), buffer=block.buf)
+            if column['kind'] == 'category':
+                data[column['name']] = pd.Categorical.from_codes(values, categories=column['categories'])
+            elif column['kind'] == 'datetime':
+                data[column['name']] = values.view(column['unit'])
+            else:
+                data[column['name']] = values
+        return pd.DataFrame(data, copy=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.size for block in self.blocks)
+
+    def close(self):
+        """
+        Unmap this process's view of the blocks
+
+        Frames returned by ``to_frame`` must be dropped first; their
+        columns point into the mapped memory.
+        """
+        for block in self.blocks:
+            block.close()
+
+    def unlink(self):
+        """Free the blocks (publisher only, after workers have finished)"""
+        self.close()
+        if self.owner:
+            for block in self.blocks:
+                block.unlink()
+
+
+def _encode(series: pd.Series) -> tuple:
+    """Fixed-width array for a column, plus what is needed to decode it"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), {'kind': 'category', 'categories': series.cat.categories.tolist()}
+    if pd.api.types.is_datetime64_any_dtype(series) and not isinstance(series.dtype, pd.DatetimeTZDtype):
+        values = series.to_numpy()
+        return values.view('i8'), {'kind': 'datetime', 'unit': values.dtype.str}
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        return series.to_numpy(), {'kind': 'numeric'}
+    codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=True)
+    codes = codes.astype(np.int32 if len(uniques) > np.iinfo(np.int16).max else np.int16)
+    return codes, {'kind': 'category', 'categories': uniques.tolist()}
@@ -2,200 +2,383 @@
 Agent Orchestrator - Coordinates the multi-agent workflow
 """
 
+import importlib
 import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 
-from agents.planner import PlannerAgent
-from agents.data_agent import DataAgent
-from agents.insight_agent import InsightAgent
-from agents.evaluator import EvaluatorAgent
-from agents.creative_generator import CreativeGenerator
+from orchestrator.refinement import rank_refinements
+from reporting.renderers import MarkdownRenderer, build_report
+from utils.checkpoint import CheckpointStore, default_run_id, input_hash
+from utils.llm_scheduler import get_scheduler
+from utils.llm_usage import summarize_usage, usage_log
+from utils.model_router import router
+
+
+class LazyAgent:
+    """
+    Imports and constructs an agent on first access
+    
+    Agent modules pull in pandas/numpy/openai, so they are only loaded
+    once the orchestrator actually needs that agent. The instance is then
+    cached on the orchestrator (and can be replaced by plain assignment).
+    """
+    
+    def __init__(self, module: str, class_name: str):
+        self.module = module
+        self.class_name = class_name
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, orchestrator, owner=None):
+        if orchestrator is None:
+            return self
+        agent_class = getattr(importlib.import_module(self.module), self.class_name)
+        agent = agent_class(orchestrator.config, orchestrator.logger)
+        orchestrator.__dict__[self.name] = agent
+        return agent
 
 
 class AgentOrchestrator:
     """Orchestrates the execution of multiple agents in sequence"""
     
+    # Agents are constructed on demand
+    planner = LazyAgent('agents.planner', 'PlannerAgent')
+    data_agent = LazyAgent('agents.data_agent', 'DataAgent')
+    insight_agent = LazyAgent('agents.insight_agent', 'InsightAgent')
+    evaluator = LazyAgent('agents.evaluator', 'EvaluatorAgent')
+    creative_gen = LazyAgent('agents.creative_generator', 'CreativeGenerator')
+    
     def __init__(self, config: dict, logger):
         self.config = config
         self.logger = logger
         self.trace = []
-        
-        # Initialize agents
-        self.planner = PlannerAgent(config, logger)
-        self.data_agent = DataAgent(config, logger)
-        self.insight_agent = InsightAgent(config, logger)
-        self.evaluator = EvaluatorAgent(config, logger)
-        self.creative_gen = CreativeGenerator(config, logger)
+        self._usage_cursor = 0
+        self.checkpoints = None
+        self.resume = False
+        # Created here so the shared scheduler logs retries and hedges
+        get_scheduler(config, logger)
     
-    def execute(self, query: str) -> dict:
-        """Execute the full agent workflow"""
+    def execute(self, query: str, resume: bool = False, run_id: str | None = None) -> dict:
+        """
+        Execute the full agent workflow
+        
+        With ``checkpoint_dir`` configured, each LLM stage's output is saved
+        under the run ID (by default derived from the query, data path and
+        model). ``resume`` reuses saved stages whose inputs are unchanged;
+        data loading always reruns, so changed data invalidates every stage
+        after it.
+        """
         
         self.logger.info("Starting agent orchestration", query=query)
         start_time = datetime.now()
+        self._usage_cursor = run_cursor = len(usage_log)
+        run_id = run_id or default_run_id(query, self.config)
+        checkpoint_dir = self.config.get('checkpoint_dir')
+        self.checkpoints = CheckpointStore(checkpoint_dir, run_id) if checkpoint_dir else None
+        self.resume = resume and self.checkpoints is not None
+        if resume and not self.resume:
+            self.logger.warning("Resume requested but checkpoint_dir is not configured")
         
         # Step 1: Planner decomposes query
         self.logger.info("Step 1: Planning")
-        plan = self.planner.plan(query)
+        plan = self._run_stage("planner", {"query": query}, lambda: self.planner.plan(query))
         self._log_step("planner", {"query": query}, plan)
         
         # Step 2: Data Agent loads and summarizes data
         self.logger.info("Step 2: Data loading and summarization")
-        data_summary = self.data_agent.load_and_summarize()
-        self._log_step("data_agent", {}, data_summary)
+        filters = plan.get('filters') or {}
+        data_summary = self.data_agent.load_and_summarize(filters=filters)
+        self._log_step("data_agent", {"filters": filters}, data_summary)
+        
+        # With data tools, analysis agents get headline numbers and query the rest
+        prompt_summary = data_summary
+        if self.config.get('data_tools', False):
+            prompt_summary = self._attach_data_tools(data_summary)
         
         # Step 3: Insight Agent generates hypotheses
         self.logger.info("Step 3: Hypothesis generation")
-        hypotheses = self.insight_agent.generate_insights(
-            query=query,
-            plan=plan,
-            data_summary=data_summary
+        hypotheses = self._run_stage(
+            "insight_agent",
+            {"query": query, "plan": plan, "data_summary": prompt_summary},
+            lambda: self.insight_agent.generate_insights(
+                query=query,
+                plan=plan,
+                data_summary=prompt_summary
+            )
         )
-        self._log_step("insight_agent", {"plan": plan, "data_summary": data_summary}, hypotheses)
+        self._log_step("insight_agent", {"plan": plan, "data_summary": prompt_summary}, hypotheses)
         
-        # Step 4: Evaluator validates hypotheses
-        self.logger.info("Step 4: Hypothesis validation")
-        validated_insights = []
-        retry_count = 0
-        max_retries = self.config.get('max_retries', 2)
-        
-        for hypothesis in hypotheses:
-            evaluation = self.evaluator.evaluate(
-                hypothesis=hypothesis,
+        # Optionally start creative generation before hypotheses are validated
+        speculative = None
+        if self.config.get('speculative_creative', False) and hypotheses and not self._resumable("creative_generator"):
+            self.logger.info("Starting speculative creative generation", hypotheses=len(hypotheses))
+            executor = ThreadPoolExecutor(max_workers=1)
+            speculative = executor.submit(
+                self._generate_creatives,
+                insights=hypotheses,
                 data_summary=data_summary
             )
-            
-            # Retry logic for low confidence
-            if evaluation['confidence'] < self.config['confidence_min'] and retry_count < max_retries:
-                self.logger.info(
-                    "Low confidence, retrying",
-                    confidence=evaluation['confidence'],
-                    hypothesis=hypothesis['hypothesis']
-                )
-                retry_count += 1
-                # Re-generate this specific insight
-                refined = self.insight_agent.refine_insight(
-                    hypothesis=hypothesis,
-                    evaluation=evaluation,
-                    data_summary=data_summary
-                )
-                evaluation = self.evaluator.evaluate(refined, data_summary)
-            
-            if evaluation['confidence'] >= self.config['confidence_min']:
-                validated_insights.append(evaluation)
+            executor.shutdown(wait=False)
         
+        # Step 4: Evaluator validates hypotheses
+        self.logger.info("Step 4: Hypothesis validation")
+        validation = self._run_stage(
+            "evaluator",
+            {"hypotheses": hypotheses, "data_summary": prompt_summary},
+            lambda: self._validate(hypotheses, prompt_summary)
+        )
+        validated_insights = validation['insights']
+        # original hypothesis index -> validated insight index (unrefined only)
+        validated_index = dict(validation['validated_index'])
         self._log_step("evaluator", {"hypotheses": hypotheses}, validated_insights)
         
         # Step 5: Creative Generator produces recommendations
         self.logger.info("Step 5: Creative generation")
-        creatives = self.creative_gen.generate(
-            insights=validated_insights,
-            data_summary=data_summary
-        )
+        creative_inputs = {
+            "insights": validated_insights,
+            "data_summary": data_summary,
+            "creative_mode": self.config.get('creative_mode', 'batch')
+        }
+        creatives = None
+        if speculative is not None:
+            creatives = self._resolve_speculative_creatives(speculative, len(hypotheses), validated_index)
+            if creatives is not None and self.checkpoints is not None:
+                self.checkpoints.save("creative_generator", input_hash(creative_inputs), creatives)
+        if creatives is None:
+            creatives = self._run_stage(
+                "creative_generator",
+                creative_inputs,
+                lambda: self._generate_creatives(
+                    insights=validated_insights,
+                    data_summary=data_summary
+                )
+            )
         self._log_step("creative_generator", {"insights": validated_insights}, creatives)
         
         # Step 6: Generate final report
         self.logger.info("Step 6: Report generation")
-        report = self._generate_report(
-            query=query,
-            insights=validated_insights,
-            creatives=creatives
-        )
+        report_data = build_report(query, validated_insights, creatives)
+        report = self._generate_report(report_data)
         
         end_time = datetime.now()
         execution_time = (end_time - start_time).total_seconds()
         
+        model_stats = router.stats(self.config, usage_log.since(run_cursor))
         self.logger.info(
             "Orchestration complete",
             execution_time=execution_time,
             insights_count=len(validated_insights),
-            creatives_count=len(creatives)
+            creatives_count=len(creatives),
+            model_stats=model_stats
         )
         
         return {
             'insights': validated_insights,
             'creatives': creatives,
             'report': report,
+            'report_data': report_data,
             'trace': self.trace,
-            'execution_time': execution_time
+            'execution_time': execution_time,
+            'run_id': run_id,
+            'model_stats': model_stats
         }
     
+    def _validate(self, hypotheses: list, prompt_summary: dict) -> dict:
+        """Evaluate hypotheses, then refine the most promising low-confidence ones"""
+        confidence_min = self.config['confidence_min']
+        evaluations = self.evaluator.batch_evaluate(
+            hypotheses=hypotheses,
+            data_summary=prompt_summary
+        )
+        
+        passed = sum(1 for evaluation in evaluations if evaluation['confidence'] >= confidence_min)
+        candidates = rank_refinements(hypotheses, evaluations, prompt_summary, self.config)
+        refined = self._refine(candidates, hypotheses, evaluations, prompt_summary, passed)
+        
+        validated_insights = []
+        validated_index = {}
+        for i, evaluation in enumerate(evaluations):
+            evaluation = refined.get(i, evaluation)
+            if evaluation['confidence'] >= confidence_min:
+                if i not in refined:
+                    validated_index[i] = len(validated_insights)
+                validated_insights.append(evaluation)
+        
+        return {
+            'insights': validated_insights,
+            'validated_index': sorted(validated_index.items())
+        }
+    
+    def _refine(self, candidates: list, hypotheses: list, evaluations: list,
+                prompt_summary: dict, passed: int) -> dict:
+        """
+        Refine and re-evaluate ranked candidates concurrently within budgets
+        
+        Up to ``max_retries`` candidates run, ``refinement_concurrency`` at a
+        time. No new refinement starts once ``refinement_target`` insights
+        pass, the ``refinement_token_budget`` (tokens spent by insight and
+        evaluator calls since refinement began) is used up, or the
+        ``refinement_time_budget`` in seconds has elapsed; at the deadline
+        refinements still running are abandoned. Returns refined
+        evaluations by hypothesis index.
+        """
+        queue = list(candidates[:self.config.get('max_retries', 2)])
+        if not queue:
+            return {}
+        
+        confidence_min = self.config['confidence_min']
+        concurrency = max(1, self.config.get('refinement_concurrency', 4))
+        target = self.config.get('refinement_target')
+        token_budget = self.config.get('refinement_token_budget')
+        time_budget = self.config.get('refinement_time_budget')
+        deadline = time.monotonic() + time_budget if time_budget else None
+        cursor = len(usage_log)
+        
+        def tokens_spent() -> int:
+            return sum(
+                (r['prompt_tokens'] or 0) + (r['completion_tokens'] or 0)
+                for r in usage_log.since(cursor) if r['agent'] in ('insight_agent', 'evaluator')
+            )
+        
+        def stop_reason() -> str | None:
+            if target and passed >= target:
+                return 'target_reached'
+            if deadline is not None and time.monotonic() >= deadline:
+                return 'time_budget'
+            if token_budget and tokens_spent() >= token_budget:
+                return 'token_budget'
+            return None
+        
+        def refine(i: int) -> dict:
+            refined = self.insight_agent.refine_insight(
+                hypothesis=hypotheses[i],
+                evaluation=evaluations[i],
+                data_summary=prompt_summary
+            )
+            return self.evaluator.evaluate(refined, prompt_summary)
+        
+        results = {}
+        pending = {}
+        reason = None
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            while queue or pending:
+                reason = reason or stop_reason()
+                while queue and len(pending) < concurrency and reason is None:
+                    i = queue.pop(0)
+                    self.logger.info(
+                        "Low confidence, retrying",
+                        confidence=evaluations[i]['confidence'],
+                        hypothesis=hypotheses[i]['hypothesis']
+                    )
+                    pending[executor.submit(refine, i)] = i
+                if not pending:
+                    break
+                
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    reason = 'time_budget'
+                    break
+                for future in done:
+                    i = pending.pop(future)
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        self.logger.error("Refinement failed", hypothesis=hypotheses[i]['hypothesis'], error=str(e))
+                        continue
+                    passed += results[i]['confidence'] >= confidence_min
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        self.logger.info(
+            "Refinement finished",
+            refined=len(results),
+            skipped=len(queue),
+            abandoned=len(pending),
+            stop_reason=reason,
+            tokens=tokens_spent()
+        )
+        return results
+    
+    def _run_stage(self, stage: str, inputs: dict, compute):
+        """Run a stage, or reuse its checkpoint when resuming with unchanged inputs"""
+        if self.checkpoints is None:
+            return compute()
+        key = input_hash(inputs)
+        if self.resume:
+            entry = self.checkpoints.load(stage, key)
+            if entry is not None:
+                self.logger.info("Resumed stage from checkpoint", stage=stage, run_id=self.checkpoints.run_id)
+                return entry['output']
+        output = compute()
+        self.checkpoints.save(stage, key, output)
+        return output
+    
+    def _resumable(self, stage: str) -> bool:
+        """Whether a resumed run has a saved output for ``stage`` (inputs not yet checked)"""
+        return self.resume and self.checkpoints.path(stage).exists()
+    
+    def _generate_creatives(self, insights: list, data_summary: dict) -> list:
+        """Single batched request, or one request per campaign when ``creative_mode`` is fanout"""
+        self.creative_gen.creative_index = getattr(self.data_agent, 'creative_index', None)
+        if self.config.get('creative_mode', 'batch') == 'fanout':
+            return self.creative_gen.generate_fanout(insights=insights, data_summary=data_summary)
+        return self.creative_gen.generate(insights=insights, data_summary=data_summary)
+    
+    def _attach_data_tools(self, data_summary: dict) -> dict:
+        """Give the insight and evaluator agents query tools; returns the compact summary"""
+        from analytics.data_tools import DataTools, compact_summary
+        
+        tools = DataTools(self.data_agent, self.config)
+        self.insight_agent.data_tools = tools
+        self.evaluator.data_tools = tools
+        return compact_summary(data_summary)
+    
+    def _resolve_speculative_creatives(self, speculative, hypothesis_count: int, validated_index: dict):
+        """
+        Keep speculative creatives that only rely on hypotheses which passed
+        
+        Returns None when the speculative run failed or nothing survived, so
+        the caller regenerates from the validated insights.
+        """
+        try:
+            creatives = speculative.result()
+        except Exception as e:
+            self.logger.error("Speculative creative generation failed", error=str(e))
+            return None
+        
+        kept = []
+        for creative in creatives:
+            insight_ids = creative.get('insight_ids') or []
+            if all(i in validated_index for i in insight_ids):
+                kept.append({**creative, 'insight_ids': [validated_index[i] for i in insight_ids]})
+        
+        self.logger.info(
+            "Speculative creatives resolved",
+            kept=len(kept),
+            discarded=len(creatives) - len(kept)
+        )
+        if len(validated_index) < hypothesis_count and not kept:
+            return None
+        return kept
+    
     def _log_step(self, agent: str, inputs: dict, outputs: dict):
-        """Log agent execution step to trace"""
+        """Log agent execution step to trace, with the LLM usage it incurred"""
+        calls = usage_log.since(self._usage_cursor)
+        self._usage_cursor += len(calls)
         self.trace.append({
             'timestamp': datetime.now().isoformat(),
             'agent': agent,
             'inputs': inputs,
-            'outputs': outputs
+            'outputs': outputs,
+            'llm_usage': summarize_usage(calls)
         })
     
-    def _generate_report(self, query: str, insights: list, creatives: list) -> str:
+    def _generate_report(self, report_data: dict) -> str:
         """Generate markdown report"""
-        
-        report = f"""# Facebook Ads Performance Analysis
-
-**Query:** {query}
-
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
----
-
-## Executive Summary
-
-Analysis completed with {len(insights)} validated insights and {len(creatives)} creative recommendations.
-
-## Key Insights
-
-"""
-        
-        for i, insight in enumerate(insights, 1):
-            report += f"""
-### {i}. {insight['hypothesis']}
-
-**Confidence:** {insight['confidence']:.2%}
-
-**Evidence:**
-{insight['evidence']}
-
-**Recommendation:**
-{insight.get('recommendation', 'See creative recommendations below')}
-
----
-"""
-        
-        if creatives:
-            report += """
-## Creative Recommendations
-
-These recommendations are based on low-performing campaigns and existing high-performing creative patterns.
-
-"""
-            for i, creative in enumerate(creatives, 1):
-                report += f"""
-### Creative Set {i}
-
-**Target Campaign:** {creative.get('campaign', 'N/A')}  
-**Current CTR:** {creative.get('current_ctr', 'N/A')}  
-**Issue:** {creative.get('issue', 'N/A')}
-
-**Recommended Messages:**
-"""
-                for msg in creative.get('recommended_messages', []):
-                    report += f"- {msg}\n"
-                
-                report += f"\n**Rationale:** {creative.get('rationale', 'N/A')}\n\n---\n"
-        
-        report += """
-## Next Steps
-
-1. Review high-confidence insights and prioritize action items
-2. Test recommended creative variations with A/B testing
-3. Monitor performance metrics after implementing changes
-4. Re-run analysis in 7-14 days to measure impact
-
----
-
-*Generated by Kasparro Agentic FB Analyst*
-"""
-        
-        return report
\ No newline at end of file
+        return MarkdownRenderer().render_to_string(report_data)
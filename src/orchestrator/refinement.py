@@ -0,0 +1,79 @@
+"""
+Refinement Planning - Ranks low-confidence hypotheses by expected gain from a retry
+"""
+
+
+# How likely a refined hypothesis of each category can be settled from the data
+DEFAULT_CATEGORY_WEIGHTS = {
+    'creative_decay': 1.0,
+    'audience_fatigue': 1.0,
+    'platform': 0.9,
+    'budget': 0.9,
+    'targeting': 0.8,
+    'other': 0.6
+}
+
+# Hypothesis categories corroborated by each anomaly detector signal
+SIGNAL_CATEGORIES = {
+    'creative_fatigue': 'creative_decay',
+    'audience_saturation': 'audience_fatigue'
+}
+
+
+def expected_gain(hypothesis: dict, evaluation: dict, data_summary: dict, config: dict) -> float:
+    """
+    Score in [0, 1] for how worthwhile refining a failed hypothesis is
+
+    Hypotheses just under ``confidence_min`` gain most; the score is
+    weighted by category and by data support: entities from the summary
+    the hypothesis names, and anomaly signals that back its category.
+    """
+    confidence_min = config['confidence_min']
+    gap = max(0.0, confidence_min - float(evaluation.get('confidence') or 0.0))
+    closeness = max(0.0, 1 - gap / confidence_min) if confidence_min > 0 else 1.0
+
+    weights = {**DEFAULT_CATEGORY_WEIGHTS, **config.get('refinement_category_weights', {})}
+    weight = weights.get(hypothesis.get('category'), weights['other'])
+
+    return closeness * weight * (0.5 + 0.5 * data_support(hypothesis, data_summary))
+
+
+def data_support(hypothesis: dict, data_summary: dict) -> float:
+    """Share of support, in [0, 1], the summary gives a hypothesis"""
+    from utils.helpers import normalize_name
+
+    text = f" {normalize_name(' '.join(str(hypothesis.get(k, '')) for k in ('hypothesis', 'data_evidence')))} "
+    names = {normalize_name(name) for name in _entity_names(data_summary)}
+    mentioned = sum(1 for name in names if name and f' {name} ' in text)
+
+    anomalies = data_summary.get('anomalies') or []
+    signalled = any(
+        SIGNAL_CATEGORIES.get(anomaly.get('signal')) == hypothesis.get('category')
+        for anomaly in anomalies
+    )
+    return 0.5 * min(1.0, mentioned / 2) + 0.5 * signalled
+
+
+def rank_refinements(hypotheses: list, evaluations: list, data_summary: dict, config: dict) -> list:
+    """Indices of hypotheses below ``confidence_min``, highest expected gain first"""
+    failed = [
+        i for i, evaluation in enumerate(evaluations)
+        if evaluation['confidence'] < config['confidence_min']
+    ]
+    gains = {i: expected_gain(hypotheses[i], evaluations[i], data_summary, config) for i in failed}
+    return sorted(failed, key=lambda i: -gains[i])
+
+
+def _entity_names(data_summary: dict):
+    for row in data_summary.get('performance_by_campaign') or []:
+        yield str(row.get('campaign_name', ''))
+    for name in data_summary.get('campaigns') or []:
+        yield str(name)
+    for anomaly in data_summary.get('anomalies') or []:
+        yield str(anomaly.get('entity', ''))
+    for dimension, rows in (data_summary.get('dimension_breakdown') or {}).items():
+        for row in rows:
+            yield str(row.get(dimension, ''))
+    for values in (data_summary.get('dimension_values') or {}).values():
+        for value in values:
+            yield str(value)
@@ -0,0 +1,241 @@
+"""
+Report Renderers - Markdown, JSON and HTML output for analysis reports
+"""
+
+import html
+import io
+import json
+from datetime import datetime
+
+
+NEXT_STEPS = [
+    "Review high-confidence insights and prioritize action items",
+    "Test recommended creative variations with A/B testing",
+    "Monitor performance metrics after implementing changes",
+    "Re-run analysis in 7-14 days to measure impact"
+]
+
+
+def build_report(query: str, insights: list, creatives: list, generated: datetime | None = None) -> dict:
+    """Format-independent report contents, rendered by any ``ReportRenderer``"""
+    return {
+        'query': query,
+        'generated': (generated or datetime.now()).strftime('%Y-%m-%d %H:%M:%S'),
+        'insights': insights,
+        'creatives': creatives,
+        'next_steps': NEXT_STEPS
+    }
+
+
+class ReportRenderer:
+    """
+    Renders a report section by section onto a text stream
+
+    Each section is built independently (list-join, no repeated string
+    concatenation) and written as soon as it is ready, so the whole
+    document is never held in memory. Passing an ``executor`` renders the
+    sections concurrently while still writing them in order.
+    """
+
+    sections = ('header', 'insights', 'creatives', 'next_steps')
+    separator = ''
+
+    def render(self, report: dict, out, executor=None):
+        """Write ``report`` to the file-like ``out``"""
+        names = list(self.sections)
+        if executor is not None:
+            parts = executor.map(self.render_section, names, [report] * len(names))
+        else:
+            parts = (self.render_section(name, report) for name in names)
+
+        out.write(self.begin(report))
+        first = True
+        for part in parts:
+            if not part:
+                continue
+            if not first:
+                out.write(self.separator)
+            out.write(part)
+            first = False
+        out.write(self.end(report))
+
+    def render_to_string(self, report: dict, executor=None) -> str:
+        buffer = io.StringIO()
+        self.render(report, buffer, executor)
+        return buffer.getvalue()
+
+    def render_section(self, name: str, report: dict) -> str:
+        return getattr(self, f'section_{name}')(report)
+
+    def begin(self, report: dict) -> str:
+        return ''
+
+    def end(self, report: dict) -> str:
+        return ''
+
+
+class MarkdownRenderer(ReportRenderer):
+    """The human-readable ``report.md``"""
+
+    extension = 'md'
+
+    def section_header(self, report: dict) -> str:
+        return ''.join([
+            "# Facebook Ads Performance Analysis\n\n",
+            f"**Query:** {report['query']}\n\n",
+            f"**Generated:** {report['generated']}\n\n",
+            "---\n\n",
+            "## Executive Summary\n\n",
+            f"Analysis completed with {len(report['insights'])} validated insights "
+            f"and {len(report['creatives'])} creative recommendations.\n\n",
+            "## Key Insights\n\n"
+        ])
+
+    def section_insights(self, report: dict) -> str:
+        parts = []
+        for i, insight in enumerate(report['insights'], 1):
+            parts += [
+                f"\n### {i}. {insight['hypothesis']}\n\n",
+                f"**Confidence:** {insight['confidence']:.2%}\n\n",
+                f"**Evidence:**\n{insight['evidence']}\n\n",
+                f"**Recommendation:**\n{insight.get('recommendation', 'See creative recommendations below')}\n\n",
+                "---\n"
+            ]
+        return ''.join(parts)
+
+    def section_creatives(self, report: dict) -> str:
+        if not report['creatives']:
+            return ''
+        parts = [
+            "\n## Creative Recommendations\n\n",
+            "These recommendations are based on low-performing campaigns "
+            "and existing high-performing creative patterns.\n\n"
+        ]
+        for i, creative in enumerate(report['creatives'], 1):
+            parts += [
+                f"\n### Creative Set {i}\n\n",
+                f"**Target Campaign:** {creative.get('campaign', 'N/A')}  \n",
+                f"**Current CTR:** {creative.get('current_ctr', 'N/A')}  \n",
+                f"**Issue:** {creative.get('issue', 'N/A')}\n\n",
+                "**Recommended Messages:**\n"
+            ]
+            parts += [f"- {msg}\n" for msg in creative.get('recommended_messages', [])]
+            parts.append(f"\n**Rationale:** {creative.get('rationale', 'N/A')}\n\n---\n")
+        return ''.join(parts)
+
+    def section_next_steps(self, report: dict) -> str:
+        steps = ''.join(f"{i}. {step}\n" for i, step in enumerate(report['next_steps'], 1))
+        return f"\n## Next Steps\n\n{steps}\n---\n\n*Generated by Kasparro Agentic FB Analyst*\n"
+
+
+class JsonRenderer(ReportRenderer):
+    """The report as one JSON object with a key per section"""
+
+    extension = 'json'
+    separator = ',\n'
+
+    def begin(self, report: dict) -> str:
+        return '{\n'
+
+    def end(self, report: dict) -> str:
+        return '\n}\n'
+
+    def section_header(self, report: dict) -> str:
+        return ',\n'.join([
+            self._member('query', report['query']),
+            self._member('generated', report['generated']),
+            self._member('insight_count', len(report['insights'])),
+            self._member('creative_count', len(report['creatives']))
+        ])
+
+    def section_insights(self, report: dict) -> str:
+        return self._member('insights', report['insights'])
+
+    def section_creatives(self, report: dict) -> str:
+        return self._member('creatives', report['creatives'])
+
+    def section_next_steps(self, report: dict) -> str:
+        return self._member('next_steps', report['next_steps'])
+
+    @staticmethod
+    def _member(key: str, value) -> str:
+        return f"  {json.dumps(key)}: {json.dumps(value, default=str)}"
+
+
+class HtmlRenderer(ReportRenderer):
+    """A standalone HTML page"""
+
+    extension = 'html'
+
+    def begin(self, report: dict) -> str:
+        return (
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            '<title>Facebook Ads Performance Analysis</title>\n</head>\n<body>\n'
+        )
+
+    def end(self, report: dict) -> str:
+        return '<footer><em>Generated by Kasparro Agentic FB Analyst</em></footer>\n</body>\n</html>\n'
+
+    def section_header(self, report: dict) -> str:
+        return ''.join([
+            "<h1>Facebook Ads Performance Analysis</h1>\n",
+            f"<p><strong>Query:</strong> {_escape(report['query'])}</p>\n",
+            f"<p><strong>Generated:</strong> {_escape(report['generated'])}</p>\n",
+            "<h2>Executive Summary</h2>\n",
+            f"<p>Analysis completed with {len(report['insights'])} validated insights "
+            f"and {len(report['creatives'])} creative recommendations.</p>\n"
+        ])
+
+    def section_insights(self, report: dict) -> str:
+        parts = ["<section>\n<h2>Key Insights</h2>\n"]
+        for i, insight in enumerate(report['insights'], 1):
+            parts += [
+                f"<article>\n<h3>{i}. {_escape(insight['hypothesis'])}</h3>\n",
+                f"<p><strong>Confidence:</strong> {insight['confidence']:.2%}</p>\n",
+                f"<p><strong>Evidence:</strong> {_escape(insight['evidence'])}</p>\n",
+                "<p><strong>Recommendation:</strong> "
+                f"{_escape(insight.get('recommendation', 'See creative recommendations below'))}</p>\n",
+                "</article>\n"
+            ]
+        parts.append("</section>\n")
+        return ''.join(parts)
+
+    def section_creatives(self, report: dict) -> str:
+        if not report['creatives']:
+            return ''
+        parts = ["<section>\n<h2>Creative Recommendations</h2>\n"]
+        for i, creative in enumerate(report['creatives'], 1):
+            parts += [
+                f"<article>\n<h3>Creative Set {i}</h3>\n<ul>\n",
+                f"<li><strong>Target Campaign:</strong> {_escape(creative.get('campaign', 'N/A'))}</li>\n",
+                f"<li><strong>Current CTR:</strong> {_escape(creative.get('current_ctr', 'N/A'))}</li>\n",
+                f"<li><strong>Issue:</strong> {_escape(creative.get('issue', 'N/A'))}</li>\n",
+                "</ul>\n<p><strong>Recommended Messages:</strong></p>\n<ul>\n"
+            ]
+            parts += [f"<li>{_escape(msg)}</li>\n" for msg in creative.get('recommended_messages', [])]
+            parts.append(
+                f"</ul>\n<p><strong>Rationale:</strong> {_escape(creative.get('rationale', 'N/A'))}</p>\n</article>\n"
+            )
+        parts.append("</section>\n")
+        return ''.join(parts)
+
+    def section_next_steps(self, report: dict) -> str:
+        steps = ''.join(f"<li>{_escape(step)}</li>\n" for step in report['next_steps'])
+        return f"<section>\n<h2>Next Steps</h2>\n<ol>\n{steps}</ol>\n</section>\n"
+
+
+RENDERERS = {
+    'markdown': MarkdownRenderer,
+    'json': JsonRenderer,
+    'html': HtmlRenderer
+}
+
+
+def get_renderer(name: str) -> ReportRenderer:
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown report format: {name} (expected one of {', '.join(RENDERERS)})")
+    return RENDERERS[name]()
+
+
+def _escape(value) -> str:
+    return html.escape(str(value))
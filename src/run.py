@@ -4,22 +4,29 @@ Kasparro Agentic Facebook Performance Analyst
 Main entry point for the multi-agent system
 """
 
+import argparse
 import os
 import sys
-import json
-import yaml
 from datetime import datetime
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from orchestrator.agent_orchestrator import AgentOrchestrator
-from utils.helpers import setup_logging, save_json, save_markdown
+# Heavy modules (orchestrator, agents, pandas, openai, yaml, structlog) are
+# imported inside main() so argument errors and --help return immediately.
+
+EXAMPLE_QUERIES = [
+    "Analyze ROAS drop in last 7 days",
+    "Which campaigns have low CTR?",
+    "Recommend new creative messages"
+]
 
 
 def load_config():
     """Load configuration from config.yaml"""
+    import yaml
+    
     config_path = Path(__file__).parent.parent / "config" / "config.yaml"
     with open(config_path, 'r') as f:
         config = yaml.safe_load(f)
@@ -32,15 +39,17 @@ def load_config():
     return config
 
 
-def main(query: str):
+def main(query: str, resume: bool = False, run_id: str | None = None):
     """Main execution function"""
     
+    from utils.helpers import setup_logging, save_json
+    
     # Load configuration
     config = load_config()
     
     # Setup logging
     logger = setup_logging(config)
-    logger.info("Starting Kasparro Agentic FB Analyst", query=query)
+    logger.info("Starting Kasparro Agentic FB Analyst", query=query, resume=resume)
     
     # Validate OpenAI API key
     if not os.getenv('OPENAI_API_KEY'):
@@ -55,12 +64,13 @@ def main(query: str):
     log_dir.mkdir(exist_ok=True)
     
     try:
-        # Initialize orchestrator
+        # Initialize orchestrator (agents are constructed on first use)
+        from orchestrator.agent_orchestrator import AgentOrchestrator
         orchestrator = AgentOrchestrator(config, logger)
         
         # Execute agent workflow
         logger.info("Executing agent workflow")
-        result = orchestrator.execute(query)
+        result = orchestrator.execute(query, resume=resume, run_id=run_id)
         
         # Save outputs
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -75,10 +85,17 @@ def main(query: str):
         save_json(result['creatives'], creatives_path)
         logger.info(f"Saved creatives to {creatives_path}")
         
-        # Save report.md
-        report_path = output_dir / "report.md"
-        save_markdown(result['report'], report_path)
-        logger.info(f"Saved report to {report_path}")
+        # Save report.md (and any other configured formats), streamed to the file
+        from reporting.renderers import get_renderer
+        report_paths = []
+        for fmt in config.get('report_formats') or ['markdown']:
+            renderer = get_renderer(fmt)
+            path = output_dir / f"report.{renderer.extension}"
+            with open(path, 'w', encoding='utf-8') as f:
+                renderer.render(result['report_data'], f)
+            report_paths.append(path)
+            logger.info(f"Saved report to {path}")
+        report_path = report_paths[0]
         
         # Save execution trace
         trace_path = log_dir / f"execution_trace_{timestamp}.json"
@@ -91,10 +108,12 @@ def main(query: str):
         print("="*60)
         print(f"\n📊 Generated {len(result['insights'])} insights")
         print(f"💡 Generated {len(result['creatives'])} creative recommendations")
+        print(f"🔖 Run ID: {result['run_id']}")
         print(f"\n📁 Outputs saved to:")
         print(f"   - {insights_path}")
         print(f"   - {creatives_path}")
-        print(f"   - {report_path}")
+        for path in report_paths:
+            print(f"   - {path}")
         print(f"\n📝 View the full report:")
         print(f"   cat {report_path}")
         print("\n" + "="*60)
@@ -102,17 +121,31 @@ def main(query: str):
     except Exception as e:
         logger.error("Execution failed", error=str(e), exc_info=True)
         print(f"\n❌ Error: {str(e)}")
+        if config.get('checkpoint_dir'):
+            print("   Completed stages were checkpointed; rerun with --resume to skip them")
         sys.exit(1)
 
 
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Kasparro Agentic Facebook Performance Analyst",
+        epilog="Example queries:\n" + "\n".join(f'  python src/run.py "{q}"' for q in EXAMPLE_QUERIES),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("query", help="Natural-language analysis question")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reuse checkpointed stage outputs from a previous run of the same query"
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Checkpoint run ID (default: derived from the query, data path and model)"
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python src/run.py 'Your query here'")
-        print("\nExample queries:")
-        print('  python src/run.py "Analyze ROAS drop in last 7 days"')
-        print('  python src/run.py "Which campaigns have low CTR?"')
-        print('  python src/run.py "Recommend new creative messages"')
-        sys.exit(1)
-    
-    query = sys.argv[1]
-    main(query)
\ No newline at end of file
+    args = parse_args()
+    main(args.query, resume=args.resume, run_id=args.run_id)
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Checkpoint - Per-stage persistence of orchestrator outputs for resumable runs
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def input_hash(inputs) -> str:
+    """Stable content hash of a stage's JSON-serializable inputs"""
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def default_run_id(query: str, config: dict) -> str:
+    """Run ID shared by reruns of the same query over the same data and model"""
+    return input_hash({
+        'query': query,
+        'data_path': config.get('data_path'),
+        'model': config.get('openai_model')
+    })[:12]
+
+
+class CheckpointStore:
+    """
+    Stage outputs of one run, stored as ``<checkpoint_dir>/<run_id>/<stage>.json``
+
+    Each file records the hash of the inputs the stage ran on. A stored
+    output is only returned for the same input hash, so when an upstream
+    stage (or the data) changes, every stage after it runs again.
+    """
+
+    def __init__(self, directory, run_id: str):
+        self.run_id = run_id
+        self.directory = Path(directory) / run_id
+
+    def path(self, stage: str) -> Path:
+        return self.directory / f"{stage}.json"
+
+    def load(self, stage: str, key: str):
+        """Saved output for ``stage`` computed from inputs hashing to ``key``, else None"""
+        try:
+            with open(self.path(stage), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('input_hash') != key:
+            return None
+        return entry
+
+    def save(self, stage: str, key: str, output):
+        """Write a stage's output atomically so a crash never leaves a partial file"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(stage)
+        temporary = path.with_suffix('.json.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'stage': stage, 'input_hash': key, 'output': output}, f, indent=2, default=str)
+        os.replace(temporary, path)
+
+    def clear(self):
+        """Remove every stage saved for this run"""
+        for path in self.directory.glob('*.json'):
+            path.unlink()
@@ -0,0 +1,70 @@
+"""
+Hedging - Latency-percentile tracking and duplicate-request budgeting
+"""
+
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """Rolling per-agent latency history used to pick hedge thresholds"""
+
+    def __init__(self, window: int = 50):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, agent: str, seconds: float):
+        with self.lock:
+            self.samples.setdefault(agent, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, agent: str, pct: float, min_samples: int = 1) -> float | None:
+        """Latency percentile for an agent, or None without enough history"""
+        with self.lock:
+            history = sorted(self.samples.get(agent, ()))
+        if len(history) < max(min_samples, 1):
+            return None
+        rank = min(len(history) - 1, max(0, int(round(pct / 100.0 * len(history))) - 1))
+        return history[rank]
+
+
+class HedgePolicy:
+    """
+    Decides when to fire a duplicate request
+
+    A hedge is sent once a call has run past the configured percentile of
+    that agent's recent latencies, provided the hedge ratio and the extra
+    token budget for this process are not exhausted.
+    """
+
+    def __init__(self, config: dict):
+        self.enabled = config.get('hedge_requests', False)
+        self.agents = set(config.get('hedge_agents', ['insight_agent', 'creative_generator']))
+        self.pct = config.get('hedge_percentile', 95)
+        self.min_samples = config.get('hedge_min_samples', 5)
+        self.max_ratio = config.get('hedge_max_ratio', 0.1)
+        self.max_extra_tokens = config.get('hedge_max_extra_tokens', 20000)
+        self.latency = LatencyTracker(config.get('hedge_window', 50))
+        self.calls = 0
+        self.hedges = 0
+        self.extra_tokens = 0
+        self.lock = threading.Lock()
+
+    def threshold(self, agent: str) -> float | None:
+        """Seconds to wait before hedging, or None if this call is not hedged"""
+        with self.lock:
+            self.calls += 1
+        if not self.enabled or agent not in self.agents:
+            return None
+        return self.latency.percentile(agent, self.pct, self.min_samples)
+
+    def try_acquire(self, estimated_tokens: int) -> bool:
+        """Reserve budget for one hedge; False once the cost caps are reached"""
+        with self.lock:
+            if (self.hedges + 1) > self.max_ratio * self.calls:
+                return False
+            if self.extra_tokens + estimated_tokens > self.max_extra_tokens:
+                return False
+            self.hedges += 1
+            self.extra_tokens += estimated_tokens
+            return True
@@ -1,5 +1,6 @@
 import json
 import logging
+import re
 import sys
 from pathlib import Path
 import structlog
@@ -23,6 +24,10 @@ def setup_logging(config: dict):
     
     return structlog.get_logger()
 
+def normalize_name(value) -> str:
+    """Case/punctuation-insensitive form used to match dimension values"""
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', str(value).lower()).split())
+
 def save_json(data: dict | list, path: Path):
     """Save data to JSON file"""
     with open(path, 'w', encoding='utf-8') as f:
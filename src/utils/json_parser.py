@@ -0,0 +1,327 @@
+"""
+JSON Parser - Shared extraction, repair and validation of LLM JSON responses
+"""
+
+import json
+import re
+
+
+class ResponseParseError(ValueError):
+    """Raised when an LLM response cannot be turned into the expected JSON"""
+
+
+# Lightweight per-agent schemas: expected top-level type, typed fields,
+# required fields and, for list payloads, the key holding the items and
+# the schema each item must satisfy.
+SCHEMAS = {
+    'plan': {
+        'type': dict,
+        'fields': {'subtasks': list, 'analysis_type': str, 'requires_creative': bool, 'filters': dict},
+        'required': ['subtasks']
+    },
+    'hypothesis': {
+        'type': dict,
+        'fields': {'hypothesis': str, 'reasoning': str, 'data_evidence': str, 'category': str},
+        'required': ['hypothesis']
+    },
+    'hypotheses': {
+        'type': dict,
+        'fields': {'hypotheses': list},
+        'required': ['hypotheses'],
+        'items': ('hypotheses', 'hypothesis')
+    },
+    'evaluation': {
+        'type': dict,
+        'fields': {'hypothesis': str, 'confidence': float, 'evidence': str, 'reasoning': str, 'recommendation': str},
+        'required': ['confidence']
+    },
+    'evaluations': {
+        'type': dict,
+        'fields': {'evaluations': list},
+        'required': ['evaluations'],
+        'items': ('evaluations', 'evaluation')
+    },
+    'creative': {
+        'type': dict,
+        'fields': {'campaign': str, 'recommended_messages': list},
+        'required': ['recommended_messages']
+    },
+    'creatives': {
+        'type': dict,
+        'fields': {'recommendations': list},
+        'required': ['recommendations'],
+        'items': ('recommendations', 'creative')
+    },
+    'messages': {
+        'type': dict,
+        'fields': {'messages': list, 'rationale': str, 'inspired_by': str},
+        'required': ['messages']
+    }
+}
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*", re.IGNORECASE)
+_PARTIAL_TOKEN_RE = re.compile(r"[\[:,]\s*([A-Za-z]+|[-+.\deE]+)$")
+
+
+def parse_json_response(content: str, schema: str | None = None):
+    """
+    Extract, repair and validate the JSON payload of an LLM response
+
+    Raises ResponseParseError when nothing usable can be recovered.
+    """
+    data = extract_json(content)
+    if schema is not None:
+        data = validate_schema(data, schema)
+    return data
+
+
+def extract_json(text: str):
+    """Locate the first JSON value in free text and parse it, repairing if needed"""
+    text = (text or '').strip()
+    fence = _FENCE_RE.search(text)
+    if fence:
+        text = text[fence.end():]
+
+    extractor = StreamingJSONExtractor()
+    extractor.feed(text)
+    return extractor.result()
+
+
+def repair_json(text: str) -> str:
+    """
+    Repair common LLM JSON defects
+
+    Removes trailing commas, drops stray closing brackets, terminates
+    unterminated strings and closes containers left open by truncation
+    (discarding a dangling key or partial literal at the cut-off point).
+    """
+    out = []
+    stack = []
+    in_string = escape = False
+    last_string_start = None
+    last_string_is_key = False
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            previous = _last_significant(out)
+            last_string_start = len(out)
+            last_string_is_key = bool(stack) and stack[-1] == '}' and previous in ('{', ',')
+            in_string = True
+            out.append(ch)
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+        elif ch in '}]':
+            _strip_trailing(out, ',')
+            if stack and stack[-1] == ch:
+                stack.pop()
+                out.append(ch)
+        else:
+            out.append(ch)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+
+    if stack:
+        # Trim whatever was cut off mid-token before closing containers
+        changed = True
+        while changed:
+            changed = False
+            _strip_trailing(out, '')
+            tail = ''.join(out[-40:])
+            partial = _PARTIAL_TOKEN_RE.search(tail)
+            if partial and not _is_literal(partial.group(1)):
+                del out[len(out) - len(partial.group(1)):]
+                changed = True
+                continue
+            if out and out[-1] in (',', ':'):
+                out.pop()
+                changed = True
+                continue
+            if (
+                last_string_is_key
+                and last_string_start is not None
+                and out and out[-1] == '"'
+                and last_string_start < len(out)
+                and _string_ends_at(out, last_string_start)
+            ):
+                del out[last_string_start:]
+                last_string_start = None
+                changed = True
+        out.extend(reversed(stack))
+
+    return ''.join(out)
+
+
+def validate_schema(data, schema: str):
+    """
+    Validate and normalize parsed JSON against a named schema
+
+    Bare arrays are wrapped under the schema's items key, numeric strings
+    are coerced to numbers and list items that fail their own schema are
+    dropped. Raises ResponseParseError if the payload is unusable.
+    """
+    spec = SCHEMAS[schema]
+    items = spec.get('items')
+
+    if items and isinstance(data, list):
+        data = {items[0]: data}
+    if not isinstance(data, spec['type']):
+        raise ResponseParseError(f"Expected {spec['type'].__name__} for '{schema}', got {type(data).__name__}")
+
+    for field in spec.get('required', []):
+        if field not in data:
+            raise ResponseParseError(f"Missing required field '{field}' for '{schema}'")
+
+    for field, expected in spec.get('fields', {}).items():
+        if field not in data or data[field] is None:
+            continue
+        value = data[field]
+        if expected is float:
+            try:
+                data[field] = float(value)
+            except (TypeError, ValueError):
+                raise ResponseParseError(f"Field '{field}' for '{schema}' is not numeric")
+        elif not isinstance(value, expected):
+            raise ResponseParseError(f"Field '{field}' for '{schema}' should be {expected.__name__}")
+
+    if items:
+        key, item_schema = items
+        valid = []
+        for item in data[key]:
+            try:
+                valid.append(validate_schema(item, item_schema))
+            except ResponseParseError:
+                continue
+        if data[key] and not valid:
+            raise ResponseParseError(f"No valid '{item_schema}' items in '{schema}'")
+        data[key] = valid
+
+    return data
+
+
+class StreamingJSONExtractor:
+    """
+    Incrementally locates a complete JSON value in streamed text
+
+    Feed response chunks as they arrive; ``complete`` turns true as soon as
+    the first top-level object or array closes, so callers can stop reading
+    the stream early. ``result()`` parses the value, repairing it if the
+    stream ended before it was complete.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = None
+        self._end = None
+
+    @property
+    def complete(self) -> bool:
+        return self._end is not None
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk of text; returns True once the value is complete"""
+        if self.complete or not chunk:
+            return self.complete
+
+        offset = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+
+        for i, ch in enumerate(chunk):
+            if self._start is None:
+                if ch in '{[':
+                    self._start = offset + i
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = offset + i + 1
+                    break
+        return self.complete
+
+    def result(self):
+        """Parse the located JSON value"""
+        if self._start is None:
+            raise ResponseParseError("No JSON value found in response")
+
+        candidate = self.text[self._start:self._end]
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(repair_json(candidate))
+        except json.JSONDecodeError as e:
+            raise ResponseParseError(f"Unrecoverable JSON: {e}") from e
+
+
+def _last_significant(out: list) -> str:
+    for ch in reversed(out):
+        if not ch.isspace():
+            return ch
+    return ''
+
+
+def _strip_trailing(out: list, char: str):
+    """Drop trailing whitespace and, if given, one trailing ``char``"""
+    while out and out[-1].isspace():
+        out.pop()
+    if char and out and out[-1] == char:
+        out.pop()
+        while out and out[-1].isspace():
+            out.pop()
+
+
+def _string_ends_at(out: list, start: int) -> bool:
+    """True if the string opened at ``start`` is the last token in ``out``"""
+    escape = False
+    for i in range(start + 1, len(out)):
+        ch = out[i]
+        if escape:
+            escape = False
+        elif ch == '\\':
+            escape = True
+        elif ch == '"':
+            return i == len(out) - 1
+    return False
+
+
+def _is_literal(token: str) -> bool:
+    try:
+        json.loads(token)
+        return True
+    except json.JSONDecodeError:
+        return False
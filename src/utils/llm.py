@@ -0,0 +1,264 @@
+"""
+LLM helpers - Shared chat completion calls that return parsed JSON
+"""
+
+import json
+import threading
+import time
+
+from utils.json_parser import ResponseParseError, StreamingJSONExtractor, parse_json_response
+from utils.llm_scheduler import get_scheduler
+from utils.llm_usage import usage_log
+from utils.model_router import is_timeout, router
+
+
+# Models that rejected ``response_format`` during this process
+_JSON_MODE_UNSUPPORTED = set()
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Process-wide OpenAI client shared by every agent
+
+    The SDK is imported on first use so CLI startup does not pay for it,
+    and its own retries are disabled because the scheduler owns retries.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(max_retries=0)
+        return _client
+
+
+def complete_json(client, config: dict, messages: list, temperature: float,
+                  max_tokens: int, schema: str | None = None, json_mode: bool = True,
+                  agent: str = 'default', tools=None, escalate_if=None, n: int = 1):
+    """
+    Run a chat completion and return its parsed, schema-validated JSON
+
+    The request goes through the shared scheduler (timeouts, retries, rate
+    limits, agent priority). JSON mode is requested when enabled in config
+    and supported by the model, and the response can be streamed, stopping
+    as soon as the JSON value is complete. With ``tools`` (a DataTools),
+    the model may call them before answering. With ``model_routing``, the
+    model is picked per agent and an unparseable response, or one for
+    which ``escalate_if(result)`` is true, is retried on the next larger
+    tier. With ``n`` > 1 the model returns ``n`` completions in one
+    request and the list of those that parse is returned (``escalate_if``
+    then receives the list). Raises ResponseParseError if the output is
+    unusable.
+    """
+    kwargs = {
+        'model': router.route(agent, config),
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }
+    if n > 1:
+        if tools is not None:
+            raise ValueError("Sampling several completions is not supported with tools")
+        kwargs['n'] = n
+
+    # Bounded: a timeout fallback can move a call back down a tier
+    for _ in range(len(config.get('model_tiers', [])) + 1):
+        try:
+            content = _complete(client, config, kwargs, json_mode, agent, tools)
+            result = _parse_samples(content, schema) if n > 1 else parse_json_response(content, schema)
+            error, escalate = None, escalate_if is not None and escalate_if(result)
+        except ResponseParseError as e:
+            error, escalate = e, True
+
+        # A timeout may have moved the call to a fallback model
+        larger = router.escalation(kwargs['model'], config) if escalate else None
+        if config.get('model_routing', False):
+            router.record(agent, kwargs['model'], config, escalated=larger is not None)
+        if larger is None:
+            break
+        kwargs['model'] = larger
+
+    if error is not None:
+        raise error
+    return result
+
+
+def _complete(client, config: dict, kwargs: dict, json_mode: bool, agent: str, tools) -> str:
+    """Response text for one model, requesting JSON mode where supported"""
+    model = kwargs['model']
+    use_json_mode = json_mode and config.get('json_mode', True) and model not in _JSON_MODE_UNSUPPORTED
+    if use_json_mode:
+        kwargs['response_format'] = {'type': 'json_object'}
+    else:
+        kwargs.pop('response_format', None)
+
+    def run():
+        if kwargs.get('n', 1) > 1:
+            return _request(client, config, kwargs, agent, send=_send_choices)
+        if tools is None:
+            return _request(client, config, kwargs, agent)
+        return _request_with_tools(client, config, kwargs, agent, tools)
+
+    try:
+        return run()
+    except Exception as e:
+        if not use_json_mode or 'response_format' not in str(e):
+            raise
+        # Model does not support JSON mode; remember and fall back to prompting
+        _JSON_MODE_UNSUPPORTED.add(kwargs['model'])
+        kwargs.pop('response_format')
+        return run()
+
+
+def _parse_samples(contents: list, schema: str | None) -> list:
+    """Parsed completions, skipping those that cannot be parsed"""
+    samples = []
+    for content in contents:
+        try:
+            samples.append(parse_json_response(content, schema))
+        except ResponseParseError:
+            continue
+    if not samples:
+        raise ResponseParseError(f"None of {len(contents)} sampled completions could be parsed")
+    return samples
+
+
+def estimate_tokens(messages: list, max_tokens: int = 0) -> int:
+    """Rough request size in tokens (~4 characters per token) plus output budget"""
+    return len(json.dumps(messages, default=str)) // 4 + max_tokens
+
+
+def _request_with_tools(client, config: dict, kwargs: dict, agent: str, tools) -> str:
+    """
+    Function-calling loop: run requested tools until the model answers
+
+    Tool results are appended to the conversation and the request is
+    reissued, for at most ``data_tools_max_rounds`` rounds; the last round
+    disallows further tool calls so the model must answer.
+    """
+    messages = list(kwargs['messages'])
+    max_rounds = config.get('data_tools_max_rounds', 4)
+
+    for round_number in range(max_rounds + 1):
+        request = {**kwargs, 'messages': messages, 'tools': tools.specs()}
+        if round_number == max_rounds:
+            request['tool_choice'] = 'none'
+        message = _request(client, config, request, agent, send=_send_message)
+        # Keep any timeout fallback for the following rounds
+        kwargs['model'] = request['model']
+
+        tool_calls = getattr(message, 'tool_calls', None)
+        if not tool_calls:
+            return (message.content or '').strip()
+
+        messages.append({
+            'role': 'assistant',
+            'content': message.content,
+            'tool_calls': [
+                {
+                    'id': call.id,
+                    'type': 'function',
+                    'function': {'name': call.function.name, 'arguments': call.function.arguments}
+                }
+                for call in tool_calls
+            ]
+        })
+        for call in tool_calls:
+            messages.append({
+                'role': 'tool',
+                'tool_call_id': call.id,
+                'content': tools.call(call.function.name, call.function.arguments)
+            })
+
+
+def _request(client, config: dict, kwargs: dict, agent: str, send=None):
+    """
+    Issue the request through the shared scheduler
+
+    ``send(client, config, kwargs)`` performs the call and returns
+    ``(result, usage)``; by default the message content is returned. When
+    an attempt times out and the model has a routing fallback, the retry
+    (and ``kwargs['model']``) switches to it.
+    """
+    send = send or _send
+    scheduler = get_scheduler(config)
+    estimated = estimate_tokens(kwargs['messages'], kwargs['max_tokens'] * kwargs.get('n', 1))
+    # The scheduler owns retries; keep the SDK from retrying underneath it
+    with_options = getattr(client, 'with_options', None)
+    if with_options:
+        client = with_options(max_retries=0)
+
+    def attempt(timeout: float) -> tuple:
+        model = kwargs['model']
+        started = time.monotonic()
+        try:
+            content, usage = send(client, config, {**kwargs, 'timeout': timeout})
+        except Exception as e:
+            fallback = router.fallback(model, config) if is_timeout(e) else None
+            if fallback:
+                router.record(agent, model, config, timed_out=True)
+                kwargs['model'] = fallback
+            raise
+        return content, usage, time.monotonic() - started, model
+
+    def discard(result: tuple):
+        # A hedge race loser still consumed tokens
+        _, loser_usage, loser_latency, loser_model = result
+        usage_log.record(agent, loser_model, loser_usage, loser_latency, discarded=True)
+        if loser_usage is not None:
+            scheduler.record_usage(0, getattr(loser_usage, 'total_tokens', 0))
+
+    content, usage, latency, model = scheduler.call(attempt, agent=agent, estimated_tokens=estimated, on_discard=discard)
+    entry = usage_log.record(agent, model, usage, latency)
+    if config.get('model_routing', False):
+        router.observe(entry, config)
+    if usage is not None:
+        scheduler.record_usage(estimated, getattr(usage, 'total_tokens', estimated))
+    return content
+
+
+def _send_message(client, config: dict, kwargs: dict) -> tuple:
+    """Issue a single non-streamed request; returns (message, usage)"""
+    response = client.chat.completions.create(**kwargs)
+    return response.choices[0].message, getattr(response, 'usage', None)
+
+
+def _send_choices(client, config: dict, kwargs: dict) -> tuple:
+    """Issue a single non-streamed request for several choices; returns (contents, usage)"""
+    response = client.chat.completions.create(**kwargs)
+    contents = [(choice.message.content or '').strip() for choice in response.choices]
+    return contents, getattr(response, 'usage', None)
+
+
+def _send(client, config: dict, kwargs: dict) -> tuple:
+    """
+    Issue a single request, streaming when configured; returns (content, usage)
+
+    Streams request usage in a final chunk. Once the JSON value is complete
+    the stream is only drained while chunks carry no more content (the
+    usual finish + usage tail); if the model keeps writing, the stream is
+    closed early and usage is reported as None.
+    """
+    if not config.get('stream_responses', False):
+        response = client.chat.completions.create(**kwargs)
+        return (response.choices[0].message.content or '').strip(), getattr(response, 'usage', None)
+
+    stream = client.chat.completions.create(stream=True, stream_options={'include_usage': True}, **kwargs)
+    extractor = StreamingJSONExtractor()
+    usage = None
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None) or usage
+            text = (chunk.choices[0].delta.content or '') if chunk.choices else ''
+            if extractor.complete:
+                if text:
+                    break
+                continue
+            extractor.feed(text)
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+    return extractor.text, usage
@@ -0,0 +1,237 @@
+"""
+LLM Scheduler - Central rate-limited, prioritized execution of LLM requests
+"""
+
+import itertools
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import partial
+
+from utils.hedging import HedgePolicy
+
+
+# Lower value runs first when requests are waiting for capacity
+DEFAULT_PRIORITIES = {
+    'planner': 0,
+    'evaluator': 0,
+    'insight_agent': 1,
+    'creative_generator': 2
+}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {'APITimeoutError', 'APIConnectionError', 'RateLimitError', 'InternalServerError', 'TimeoutError'}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float):
+        """Block until ``amount`` tokens are available, then take them"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(min(delay, 1.0))
+
+    def adjust(self, amount: float):
+        """Debit (or credit, if negative) tokens after the fact; may go into debt"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class LLMScheduler:
+    """
+    Runs LLM requests through a shared worker pool
+
+    Requests wait in a priority queue, pass request- and token-per-minute
+    buckets before dispatch, and are retried with jittered exponential
+    backoff on timeouts, rate limits and transient server errors. When
+    hedging is enabled, calls that outlive the agent's recent latency
+    percentile get a duplicate request and the first result wins.
+    """
+
+    def __init__(self, config: dict, logger=None):
+        self.config = config
+        self.logger = logger
+        self.priorities = {**DEFAULT_PRIORITIES, **config.get('llm_priorities', {})}
+        self.timeouts = config.get('llm_timeouts', {})
+        self.max_retries = config.get('llm_max_retries', 4)
+        self.backoff_base = config.get('llm_backoff_base', 1.0)
+        self.backoff_max = config.get('llm_backoff_max', 30.0)
+        self.request_bucket = TokenBucket(config.get('llm_requests_per_minute', 500))
+        self.token_bucket = TokenBucket(config.get('llm_tokens_per_minute', 30000))
+        self.hedging = HedgePolicy(config)
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._workers = []
+        self._max_workers = config.get('llm_max_concurrency', 4)
+        self._lock = threading.Lock()
+
+    def timeout_for(self, agent: str) -> float:
+        """Per-call timeout in seconds for an agent"""
+        return self.timeouts.get(agent, self.timeouts.get('default', 60.0))
+
+    def submit(self, fn, agent: str = 'default', estimated_tokens: int = 0) -> Future:
+        """
+        Queue ``fn(timeout)`` for execution and return its Future
+
+        ``fn`` receives the per-call timeout and should return the API
+        response; it may be invoked several times when retried.
+        """
+        future = Future()
+        priority = self.priorities.get(agent, max(self.priorities.values()) + 1)
+        self._queue.put((priority, next(self._sequence), fn, agent, estimated_tokens, future))
+        self._ensure_workers()
+        return future
+
+    def call(self, fn, agent: str = 'default', estimated_tokens: int = 0, on_discard=None):
+        """
+        Submit ``fn`` and block until it completes, hedging slow calls if enabled
+
+        When a hedge race is lost by a request already in flight, its
+        result is passed to ``on_discard`` once it arrives, so the tokens
+        it spent can still be accounted for.
+        """
+        threshold = self.hedging.threshold(agent)
+        primary = self.submit(fn, agent, estimated_tokens)
+        if threshold is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self.hedging.try_acquire(estimated_tokens):
+            return primary.result()
+
+        if self.logger:
+            self.logger.info("Hedging slow LLM request", agent=agent, threshold=round(threshold, 2))
+        pending = {primary, self.submit(fn, agent, estimated_tokens)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The loser may already be in flight; its result is discarded
+                    for other in pending:
+                        if not other.cancel() and on_discard is not None:
+                            other.add_done_callback(partial(_discarded, on_discard))
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real token usage is known"""
+        self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < self._max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            _, _, fn, agent, estimated_tokens, future = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(self._execute(fn, agent, estimated_tokens))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, fn, agent: str, estimated_tokens: int):
+        attempt = 0
+        while True:
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(estimated_tokens)
+            started = time.monotonic()
+            try:
+                result = fn(self.timeout_for(agent))
+                self.hedging.latency.record(agent, time.monotonic() - started)
+                return result
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                if self.logger:
+                    self.logger.info(
+                        "LLM request failed, retrying",
+                        agent=agent,
+                        error=type(e).__name__,
+                        attempt=attempt,
+                        delay=round(delay, 2)
+                    )
+                time.sleep(delay)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Jittered exponential backoff, honoring Retry-After when sent"""
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+
+def _discarded(on_discard, future: Future):
+    if not future.cancelled() and future.exception() is None:
+        on_discard(future.result())
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for timeouts, rate limits and transient server errors"""
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    return getattr(error, 'status_code', None) in RETRYABLE_STATUS_CODES
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(config: dict, logger=None) -> LLMScheduler:
+    """
+    Process-wide scheduler shared by every agent
+
+    A logger passed later is attached if the scheduler was created without
+    one, so retries and hedges show up in the run's logs.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(config, logger)
+        elif logger is not None and _scheduler.logger is None:
+            _scheduler.logger = logger
+        return _scheduler
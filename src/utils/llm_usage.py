@@ -0,0 +1,66 @@
+"""
+LLM Usage - Per-call token, prompt-cache and latency accounting
+"""
+
+import threading
+
+
+class UsageLog:
+    """Thread-safe record of every LLM call made in this process"""
+
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def record(self, agent: str, model: str, usage, latency: float, discarded: bool = False) -> dict:
+        """
+        Store one call's usage; ``usage`` is the API response's usage object (or None)
+
+        ``discarded`` marks a request whose result was thrown away (a hedge
+        race loser) but whose tokens were spent all the same.
+        """
+        details = getattr(usage, 'prompt_tokens_details', None)
+        entry = {
+            'agent': agent,
+            'model': model,
+            'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+            'completion_tokens': getattr(usage, 'completion_tokens', None),
+            'cached_tokens': getattr(details, 'cached_tokens', None) or 0,
+            'latency_s': round(latency, 3),
+            'discarded': discarded
+        }
+        with self.lock:
+            self.records.append(entry)
+        return entry
+
+    def since(self, cursor: int) -> list:
+        """Records added after position ``cursor``"""
+        with self.lock:
+            return self.records[cursor:]
+
+
+def summarize_usage(records: list) -> dict:
+    """
+    Aggregate call count, tokens, cache hits and latency for trace output
+
+    Token totals include discarded hedge requests; ``discarded_calls``
+    counts them separately.
+    """
+    prompt_tokens = sum(r['prompt_tokens'] or 0 for r in records)
+    cached_tokens = sum(r['cached_tokens'] or 0 for r in records)
+    return {
+        'calls': len(records),
+        'discarded_calls': sum(1 for r in records if r.get('discarded')),
+        'prompt_tokens': prompt_tokens,
+        'cached_tokens': cached_tokens,
+        'cache_hit_ratio': round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+        'completion_tokens': sum(r['completion_tokens'] or 0 for r in records),
+        'latency_s': round(sum(r['latency_s'] for r in records), 3),
+        'records': records
+    }
+
+
+usage_log = UsageLog()
@@ -0,0 +1,202 @@
+"""
+Model Router - Per-agent model tiers with timeout fallback and escalation
+"""
+
+import threading
+from collections import deque
+
+from utils.llm_usage import usage_log
+
+
+TIMEOUT_ERRORS = {'APITimeoutError', 'TimeoutError'}
+
+
+class ModelRouter:
+    """
+    Chooses the model for each agent call
+
+    With ``model_routing`` enabled every agent starts on its configured
+    model (``agent_models``, usually the cheap tier). A call that times out
+    moves to ``model_fallbacks[model]`` for its next attempt; a response
+    that fails to parse, or that the caller flags (e.g. a borderline
+    evaluator confidence), is retried one step up ``model_tiers``.
+
+    Outcomes, latencies and token usage are kept per agent and model over
+    the last ``routing_window`` calls. An agent keeps starting on a cheaper
+    tier while, escalations included, it is cheaper and faster (p95) than
+    starting on the next tier and escalates less than
+    ``routing_max_escalation_rate``; otherwise new calls start on the
+    larger (or, on frequent timeouts, the fallback) model directly. Every
+    ``routing_probe_interval``-th rerouted call goes back to the configured
+    model so its window reflects how it performs now.
+    """
+
+    def __init__(self):
+        self.totals = {}  # (agent, model) -> cumulative counters, for stats
+        self.outcomes = {}  # (agent, model) -> recent (escalated, timed_out)
+        self.usage = {}  # (agent, model) -> recent (latency_s, prompt_tokens, completion_tokens)
+        self.rerouted = {}  # agent -> calls started away from its configured model
+        self.lock = threading.Lock()
+
+    def route(self, agent: str, config: dict) -> str:
+        """Model to start an agent's call on"""
+        model = config['openai_model']
+        if not config.get('model_routing', False):
+            return model
+        configured = model = config.get('agent_models', {}).get(agent, model)
+
+        for _ in range(len(config.get('model_tiers', [])) + 1):
+            larger, fallback = self.escalation(model, config), self.fallback(model, config)
+            if larger and self._outgrown(agent, model, larger, config):
+                model = larger
+            elif fallback and self._timing_out(agent, model, config):
+                model = fallback
+            else:
+                break
+
+        if model != configured:
+            interval = config.get('routing_probe_interval', 20)
+            with self.lock:
+                self.rerouted[agent] = self.rerouted.get(agent, 0) + 1
+                probe = bool(interval) and self.rerouted[agent] % interval == 0
+            if probe:
+                return configured
+        return model
+
+    def fallback(self, model: str, config: dict) -> str | None:
+        """Model to retry on after ``model`` timed out"""
+        if not config.get('model_routing', False):
+            return None
+        return config.get('model_fallbacks', {}).get(model)
+
+    def escalation(self, model: str, config: dict) -> str | None:
+        """The next larger tier, or None at the top (or for models outside the tiers)"""
+        if not config.get('model_routing', False):
+            return None
+        tiers = config.get('model_tiers', [])
+        if model not in tiers or tiers.index(model) == len(tiers) - 1:
+            return None
+        return tiers[tiers.index(model) + 1]
+
+    def record(self, agent: str, model: str, config: dict, escalated: bool = False, timed_out: bool = False):
+        """Count one call's outcome for routing decisions"""
+        with self.lock:
+            counts = self.totals.setdefault((agent, model), {'calls': 0, 'escalated': 0, 'timeouts': 0})
+            counts['calls'] += 1
+            counts['escalated'] += int(escalated)
+            counts['timeouts'] += int(timed_out)
+            self._window(self.outcomes, (agent, model), config).append((escalated, timed_out))
+
+    def observe(self, entry: dict, config: dict):
+        """Track a completed call's latency and tokens (a usage log entry)"""
+        with self.lock:
+            self._window(self.usage, (entry['agent'], entry['model']), config).append((
+                entry['latency_s'], entry['prompt_tokens'] or 0, entry['completion_tokens'] or 0
+            ))
+
+    def stats(self, config: dict, records: list | None = None) -> dict:
+        """
+        Per-agent, per-model calls, latency, tokens, estimated cost and outcomes
+
+        ``records`` defaults to every call in the usage log; prices come
+        from ``model_prices`` (USD per million prompt and completion tokens).
+        """
+        stats = {}
+        for record in (usage_log.since(0) if records is None else records):
+            entry = stats.setdefault(record['agent'], {}).setdefault(record['model'], {
+                'calls': 0, 'latencies': [], 'prompt_tokens': 0, 'completion_tokens': 0
+            })
+            entry['calls'] += 1
+            entry['latencies'].append(record['latency_s'])
+            entry['prompt_tokens'] += record['prompt_tokens'] or 0
+            entry['completion_tokens'] += record['completion_tokens'] or 0
+
+        for agent, models in stats.items():
+            for model, entry in models.items():
+                latencies = entry.pop('latencies')
+                entry['mean_latency_s'] = round(sum(latencies) / len(latencies), 3)
+                entry['p95_latency_s'] = _p95(latencies)
+                cost = _cost(model, entry['prompt_tokens'], entry['completion_tokens'], config)
+                entry['cost_usd'] = round(cost, 6) if cost is not None else None
+                with self.lock:
+                    counts = dict(self.totals.get((agent, model), {'escalated': 0, 'timeouts': 0}))
+                entry['escalated'] = counts['escalated']
+                entry['timeouts'] = counts['timeouts']
+        return stats
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+            self.outcomes.clear()
+            self.usage.clear()
+            self.rerouted.clear()
+
+    def _outgrown(self, agent: str, model: str, larger: str, config: dict) -> bool:
+        """Whether new calls should skip ``model`` and start on ``larger``"""
+        rates = self._rates(agent, model, config)
+        if rates is None:
+            return False
+        escalation_rate = rates[0]
+        if escalation_rate >= config.get('routing_max_escalation_rate', 0.5):
+            return True
+
+        # Starting small pays for the small call plus, when escalated, the larger one
+        small, large = self._performance(agent, model, config), self._performance(agent, larger, config)
+        if small is None or large is None:
+            return False
+        if small['p95_latency_s'] + escalation_rate * large['p95_latency_s'] > large['p95_latency_s']:
+            return True
+        if small['cost_usd'] is not None and large['cost_usd'] is not None:
+            return small['cost_usd'] + escalation_rate * large['cost_usd'] > large['cost_usd']
+        return False
+
+    def _timing_out(self, agent: str, model: str, config: dict) -> bool:
+        rates = self._rates(agent, model, config)
+        return rates is not None and rates[1] >= config.get('routing_max_escalation_rate', 0.5)
+
+    def _rates(self, agent: str, model: str, config: dict) -> tuple | None:
+        """Recent (escalation, timeout) rates, or None before ``routing_min_samples`` calls"""
+        with self.lock:
+            recent = list(self.outcomes.get((agent, model), ()))
+        if not recent or len(recent) < config.get('routing_min_samples', 10):
+            return None
+        return (
+            sum(1 for escalated, _ in recent if escalated) / len(recent),
+            sum(1 for _, timed_out in recent if timed_out) / len(recent)
+        )
+
+    def _performance(self, agent: str, model: str, config: dict) -> dict | None:
+        """Recent p95 latency and mean cost per call, or None without history"""
+        with self.lock:
+            recent = list(self.usage.get((agent, model), ()))
+        if not recent:
+            return None
+        cost = _cost(model, sum(r[1] for r in recent), sum(r[2] for r in recent), config)
+        return {
+            'p95_latency_s': _p95([r[0] for r in recent]),
+            'cost_usd': cost / len(recent) if cost is not None else None
+        }
+
+    @staticmethod
+    def _window(windows: dict, key: tuple, config: dict) -> deque:
+        return windows.setdefault(key, deque(maxlen=config.get('routing_window', 50)))
+
+
+def is_timeout(error: Exception) -> bool:
+    return type(error).__name__ in TIMEOUT_ERRORS or getattr(error, 'status_code', None) == 408
+
+
+def _p95(values: list) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(0.95 * len(values)))]
+
+
+def _cost(model: str, prompt_tokens: int, completion_tokens: int, config: dict) -> float | None:
+    """USD for the tokens at ``model_prices``, or None for an unpriced model"""
+    price = config.get('model_prices', {}).get(model)
+    if not price:
+        return None
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1e6
+
+
+router = ModelRouter()
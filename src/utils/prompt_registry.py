@@ -0,0 +1,103 @@
+"""
+Prompt Registry - Loads and compiles prompt templates once per process
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+
+
+PROMPTS_DIR = Path(__file__).parent.parent.parent / "prompts"
+
+# Placeholders are upper-case names in single braces, e.g. {DATA_SUMMARY};
+# JSON examples in the prompts never match this pattern.
+PLACEHOLDER_RE = re.compile(r"\{([A-Z][A-Z0-9_]*)\}")
+
+# Placeholders each agent prompt must declare, checked at load time
+EXPECTED_PLACEHOLDERS = {
+    'planner_prompt': {'USER_QUERY'},
+    'insight_agent_prompt': {'USER_QUERY', 'PLAN', 'DATA_SUMMARY', 'MAX_INSIGHTS'},
+    'refine_insight_prompt': {'CONFIDENCE', 'HYPOTHESIS', 'REASONING', 'EVALUATOR_FEEDBACK', 'DATA_SUMMARY'},
+    'evaluator_prompt': {'HYPOTHESIS', 'DATA_SUMMARY', 'CONFIDENCE_MIN'},
+    'evaluator_batch_prompt': {'DATA_SUMMARY', 'HYPOTHESIS_COUNT', 'CONFIDENCE_MIN', 'HYPOTHESES'},
+    'creative_generator_prompt': {'INSIGHTS', 'LOW_PERFORMERS', 'TOP_MESSAGES', 'LOW_CTR_THRESHOLD'},
+    'campaign_creative_prompt': {'CAMPAIGN', 'CURRENT_MESSAGE', 'ISSUE', 'TOP_PATTERNS'}
+}
+
+
+class PromptTemplate:
+    """
+    A prompt parsed into literal segments and placeholder slots
+
+    Rendering fills the slots and joins once, instead of copying the whole
+    template for every ``str.replace``. ``static_prefix`` is the literal
+    text before the first placeholder, identical across every render.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.segments = []
+        self.slots = []  # (segment index, placeholder name)
+
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            self.segments.append(text[position:match.start()])
+            self.slots.append((len(self.segments), match.group(1)))
+            self.segments.append('')
+            position = match.end()
+        self.segments.append(text[position:])
+
+        self.placeholders = frozenset(slot_name for _, slot_name in self.slots)
+        self.static_prefix = self.segments[0]
+
+    def render(self, **values) -> str:
+        """Fill every placeholder; raises KeyError for any missing value"""
+        missing = self.placeholders - values.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' missing values for: {', '.join(sorted(missing))}")
+
+        parts = self.segments.copy()
+        for index, slot_name in self.slots:
+            parts[index] = str(values[slot_name])
+        return ''.join(parts)
+
+
+class PromptRegistry:
+    """All prompt templates in a directory, validated against expected placeholders"""
+
+    def __init__(self, directory: Path = PROMPTS_DIR):
+        self.templates = {}
+        for path in sorted(Path(directory).glob("*.md")):
+            with open(path, 'r', encoding='utf-8') as f:
+                template = PromptTemplate(path.stem, f.read())
+            self._validate(template)
+            self.templates[template.name] = template
+
+        missing = EXPECTED_PLACEHOLDERS.keys() - self.templates.keys()
+        if missing:
+            raise ValueError(f"Prompt templates not found: {', '.join(sorted(missing))}")
+
+    def _validate(self, template: PromptTemplate):
+        expected = EXPECTED_PLACEHOLDERS.get(template.name)
+        if expected is None or template.placeholders == expected:
+            return
+        problems = []
+        if expected - template.placeholders:
+            problems.append(f"missing {sorted(expected - template.placeholders)}")
+        if template.placeholders - expected:
+            problems.append(f"unexpected {sorted(template.placeholders - expected)}")
+        raise ValueError(f"Prompt '{template.name}' placeholders invalid: {'; '.join(problems)}")
+
+    def get(self, name: str) -> PromptTemplate:
+        return self.templates[name]
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> PromptRegistry:
+    """Process-wide registry, loaded on first use"""
+    return PromptRegistry()
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    """Compiled template for a prompt file (name without ``.md``)"""
+    return get_registry().get(name)
@@ -0,0 +1,86 @@
+"""
+Tests for vectorized anomaly and fatigue detection
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from analytics.anomalies import change_points, detect_anomalies, recent_z_scores, slopes
+
+
+DAYS = 28
+
+
+def make_rows(campaign, adset, message, ctr, impressions, roas=4.0):
+    dates = pd.date_range('2025-01-01', periods=DAYS)
+    rows = []
+    for day, date in enumerate(dates):
+        shown = impressions(day)
+        clicks = shown * ctr(day)
+        spend = shown / 1000 * 10
+        rows.append({
+            'campaign_name': campaign, 'adset_name': adset, 'creative_message': message,
+            'date': date, 'spend': spend, 'impressions': shown, 'clicks': clicks,
+            'ctr': ctr(day), 'revenue': spend * (roas(day) if callable(roas) else roas),
+            'roas': roas(day) if callable(roas) else roas
+        })
+    return rows
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 0.0002, size=DAYS)
+    rows = (
+        # Stable control
+        make_rows('Steady', 'Adset-Steady', 'Always fresh', lambda d: 0.02 + noise[d], lambda d: 10000)
+        # Creative whose CTR decays ~3% a day at constant delivery
+        + make_rows('Decay', 'Adset-Decay', 'Tired message', lambda d: 0.02 * 0.97 ** d, lambda d: 10000)
+        # ROAS collapses in the last week
+        + make_rows('Crash', 'Adset-Crash', 'Crash message', lambda d: 0.02 + noise[d], lambda d: 10000,
+                    roas=lambda d: 4.0 + noise[d] * 100 if d < DAYS - 7 else 1.5)
+    )
+    return pd.DataFrame(rows)
+
+
+def test_slopes_match_polyfit():
+    matrix = np.array([[1.0, 2.0, 3.0, 4.0], [4.0, np.nan, 2.0, 1.0]])
+    expected = [np.polyfit([0, 1, 2, 3], matrix[0], 1)[0], np.polyfit([0, 2, 3], [4.0, 2.0, 1.0], 1)[0]]
+
+    assert slopes(matrix) == pytest.approx(expected)
+
+
+def test_z_scores_and_change_points_locate_shift():
+    matrix = np.array([[1.0, 1.1, 0.9, 1.0, 1.05, 0.95, 3.0, 3.1, 2.9]])
+
+    z, recent, baseline = recent_z_scores(matrix, 3)
+    index, strength = change_points(matrix)
+
+    assert z[0] > 10 and recent[0] == pytest.approx(3.0)
+    assert index[0] == 5  # last day before the shift
+    assert strength[0] > 1
+
+
+def test_detects_fatigue_and_drop_but_not_stable_series(frame):
+    anomalies = detect_anomalies(frame, {'min_spend_threshold': 0})
+    found = {(a['entity'], a['signal'], a['metric']) for a in anomalies}
+
+    assert ('Tired message', 'creative_fatigue', 'ctr') in found
+    assert ('Adset-Decay', 'audience_saturation', 'ctr') in found
+    assert ('Crash', 'drop', 'roas') in found
+    assert not any(a['entity'] in ('Always fresh', 'Adset-Steady', 'Steady') for a in anomalies)
+
+    crash = next(a for a in anomalies if a['entity'] == 'Crash' and a['metric'] == 'roas')
+    assert crash['change_date'] == '2025-01-21'
+    assert [a['severity'] for a in anomalies] == sorted((a['severity'] for a in anomalies), reverse=True)
+
+
+def test_short_history_and_low_spend_skipped(frame):
+    assert detect_anomalies(frame[frame['date'] < '2025-01-10'], {}) == []
+    assert detect_anomalies(frame, {'min_spend_threshold': 1e9}) == []
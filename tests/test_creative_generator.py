@@ -0,0 +1,142 @@
+"""
+Tests for Creative Generator fan-out mode
+"""
+
+import json
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from agents.creative_generator import CreativeGenerator, _dedupe_messages
+from utils.helpers import setup_logging
+
+
+CAMPAIGN_MESSAGES = {
+    'Men Bold Colors Drop': ['Bold colors, all-day comfort', 'Stand out in every shade'],
+    'Women Seamless Everyday': ['Bold colors, all day comfort!', 'Invisible under everything'],
+    'Women Cotton Classics': ['Organic cotton, zero itch']
+}
+
+
+class CampaignCompletions:
+    """Answers each campaign prompt with its canned messages, tracking concurrency"""
+    
+    def __init__(self):
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+    
+    def create(self, **kwargs):
+        prompt = kwargs['messages'][1]['content']
+        with self.lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        campaign = prompt.split('CAMPAIGN: ')[1].split('\n')[0]
+        payload = {'messages': CAMPAIGN_MESSAGES[campaign]}
+        if campaign == 'Women Cotton Classics':
+            payload.update(rationale='Lead with fabric comfort', inspired_by='Breathable cotton')
+        message = SimpleNamespace(content=json.dumps(payload))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def config():
+    return {
+        'openai_model': 'gpt-4o',
+        'low_ctr_threshold': 0.015,
+        'creative_fanout_concurrency': 2
+    }
+
+
+@pytest.fixture
+def generator(config, monkeypatch):
+    # Keep the fake out of the process-wide client cache
+    client = SimpleNamespace(chat=SimpleNamespace(completions=CampaignCompletions()))
+    monkeypatch.setattr('agents.creative_generator.get_client', lambda: client)
+    return CreativeGenerator(config, setup_logging(config))
+
+
+@pytest.fixture
+def data_summary():
+    return {
+        'low_performers': [
+            {'campaign_name': name, 'ctr': 0.01, 'spend': 500.0, 'creative_message': 'Old copy'}
+            for name in CAMPAIGN_MESSAGES
+        ],
+        'creative_performance': {'top_messages': [{'creative_message': 'Breathable cotton', 'ctr': 0.03}]}
+    }
+
+
+def test_fanout_merges_and_dedupes_across_campaigns(generator, data_summary):
+    insights = [
+        {'hypothesis': 'Creative fatigue in Women Cotton Classics', 'confidence': 0.8},
+        {'hypothesis': 'Instagram CPMs rose', 'confidence': 0.7}
+    ]
+    
+    creatives = generator.generate_fanout(insights, data_summary)
+    
+    by_campaign = {c['campaign']: c for c in creatives}
+    assert by_campaign['Men Bold Colors Drop']['recommended_messages'] == CAMPAIGN_MESSAGES['Men Bold Colors Drop']
+    assert by_campaign['Women Seamless Everyday']['recommended_messages'] == ['Invisible under everything']
+    assert by_campaign['Women Cotton Classics']['insight_ids'] == [0]
+    assert by_campaign['Men Bold Colors Drop']['insight_ids'] == []
+    assert [c['campaign'] for c in creatives] == list(CAMPAIGN_MESSAGES)
+
+
+def test_fanout_passes_through_model_rationale_only(generator, data_summary):
+    by_campaign = {c['campaign']: c for c in generator.generate_fanout([], data_summary)}
+    
+    assert by_campaign['Women Cotton Classics']['rationale'] == 'Lead with fabric comfort'
+    assert by_campaign['Women Cotton Classics']['inspired_by'] == 'Breathable cotton'
+    assert 'rationale' not in by_campaign['Men Bold Colors Drop']
+    assert 'inspired_by' not in by_campaign['Men Bold Colors Drop']
+
+
+def test_fanout_bounded_parallelism_and_shared_prefix(generator, data_summary):
+    generator.generate_fanout([], data_summary)
+    
+    completions = generator.client.chat.completions
+    assert len(completions.prompts) == 3
+    assert completions.peak == 2
+    prefix = completions.prompts[0].split('CAMPAIGN: ')[0]
+    assert 'Breathable cotton' in prefix
+    assert all(prompt.startswith(prefix) for prompt in completions.prompts)
+
+
+def test_fanout_skips_without_low_performers(generator):
+    assert generator.generate_fanout([], {'low_performers': []}) == []
+    assert generator.client.chat.completions.prompts == []
+
+
+def test_dedupe_messages_keeps_first_occurrence():
+    groups = [['Soft cotton for everyday wear'], ['soft COTTON for everyday wear!', 'Something new']]
+    
+    assert _dedupe_messages(groups, 0.8) == [['Soft cotton for everyday wear'], ['Something new']]
+
+
+def test_fanout_drops_near_copies_of_existing_copy(generator, data_summary):
+    import pandas as pd
+    from analytics.creative_index import CreativeIndex
+    history = pd.DataFrame({
+        'creative_message': ['Stand out in every shade', 'Soft cotton basics'],
+        'spend': [500.0, 500.0], 'revenue': [2000.0, 1000.0], 'ctr': [0.03, 0.01]
+    })
+    generator.creative_index = CreativeIndex.build(history)
+    
+    by_campaign = {c['campaign']: c for c in generator.generate_fanout([], data_summary)}
+    
+    bold = by_campaign['Men Bold Colors Drop']
+    assert bold['recommended_messages'] == ['Bold colors, all-day comfort']
+    assert bold['message_scores'][0]['novelty'] > 0.15
+    assert {'predicted_ctr', 'predicted_roas', 'nearest'} <= set(bold['message_scores'][0])
@@ -0,0 +1,94 @@
+"""
+Tests for the creative message similarity index
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from analytics.creative_index import CreativeIndex, source_fingerprint
+
+SAMPLE_CSV = Path(__file__).parent.parent / 'data' / 'synthetic_fb_ads_undergarments.csv'
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return pd.read_csv(SAMPLE_CSV)
+
+
+@pytest.fixture(scope='module')
+def index(frame):
+    return CreativeIndex.build(frame)
+
+
+def test_indexes_each_distinct_message(index, frame):
+    assert sorted(index.messages) == sorted(frame['creative_message'].unique())
+    assert np.allclose(np.linalg.norm(index.vectors, axis=1), 1.0, atol=1e-5)
+
+
+def test_near_copies_have_low_novelty(index):
+    existing = index.messages[0]
+    scores = index.score([existing, existing.upper() + '!!', 'Free returns on every pair of wool hiking socks'])
+
+    assert scores[0]['novelty'] < 0.01 and scores[0]['nearest'] == existing
+    assert scores[1]['novelty'] < 0.05
+    assert scores[2]['novelty'] > 0.5
+
+
+def test_predictions_follow_nearest_neighbours(index):
+    existing = index.messages[3]
+    score = index.score([existing], k=1)[0]
+
+    assert score['predicted_ctr'] == pytest.approx(index.metrics['ctr'][3])
+    assert score['predicted_roas'] == pytest.approx(index.metrics['roas'][3])
+
+
+def test_exemplars_are_diverse_top_performers(index):
+    exemplars = index.exemplars(k=5, min_spend=100, max_similarity=0.5)
+    vectors = index.embed([e['creative_message'] for e in exemplars])
+    similarity = vectors @ vectors.T
+
+    assert len(exemplars) == 5
+    assert all(e['spend'] >= 100 for e in exemplars)
+    assert exemplars[0]['ctr'] == max(
+        ctr for ctr, spend in zip(index.metrics['ctr'], index.metrics['spend']) if spend >= 100
+    )
+    assert (similarity[~np.eye(5, dtype=bool)] <= 0.5 + 1e-5).all()
+
+
+def test_persisted_index_reused_until_data_changes(frame, tmp_path):
+    path = tmp_path / 'creative_index.npz'
+    built = CreativeIndex.build_or_load(frame, path)
+    loaded = CreativeIndex.build_or_load(frame, path)
+
+    assert loaded.messages == built.messages
+    assert np.array_equal(loaded.vectors, built.vectors)
+    assert loaded.fingerprint == built.fingerprint
+
+    changed = frame.assign(spend=frame['spend'] * 2)
+    rebuilt = CreativeIndex.build_or_load(changed, path)
+    assert rebuilt.fingerprint != built.fingerprint
+    assert CreativeIndex.load(path).fingerprint == rebuilt.fingerprint
+
+
+def test_keyed_index_reads_source_only_to_rebuild(frame, tmp_path):
+    source = tmp_path / 'ads.csv'
+    frame.to_csv(source, sep='\t', index=False)
+    path = tmp_path / 'creative_index.npz'
+    reads = []
+
+    def read():
+        reads.append(1)
+        return frame
+
+    built = CreativeIndex.build_or_load(read, path, key=source_fingerprint(source))
+    loaded = CreativeIndex.build_or_load(read, path, key=source_fingerprint(source))
+
+    assert len(reads) == 1
+    assert loaded.messages == built.messages
+    assert loaded.fingerprint == source_fingerprint(source)
@@ -0,0 +1,83 @@
+"""
+Tests for the multi-dimensional data cube
+"""
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from analytics.cube import DataCube
+
+SAMPLE_CSV = Path(__file__).parent.parent / 'data' / 'synthetic_fb_ads_undergarments.csv'
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return pd.read_csv(SAMPLE_CSV, parse_dates=['date'])
+
+
+@pytest.fixture(scope='module')
+def cube(frame):
+    return DataCube(frame)
+
+
+def test_rollup_matches_direct_groupby(cube, frame):
+    """Rollups from the base cuboid equal a groupby over the raw rows"""
+    rolled = cube.rollup(('platform', 'country')).set_index(['platform', 'country']).sort_index()
+    direct = frame.groupby(['platform', 'country'])[['spend', 'revenue', 'clicks', 'impressions']].sum().sort_index()
+
+    pd.testing.assert_frame_equal(rolled[direct.columns], direct, check_dtype=False)
+    assert rolled['roas'].tolist() == pytest.approx((direct['revenue'] / direct['spend']).tolist())
+    assert rolled['ctr'].tolist() == pytest.approx((direct['clicks'] / direct['impressions']).tolist())
+
+
+def test_rollups_cover_every_subset_up_to_max_dims(cube):
+    rollups = cube.rollups(max_dims=2, dimensions=['platform', 'country', 'audience_type'])
+
+    assert set(rollups) == {
+        ('platform',), ('country',), ('audience_type',),
+        ('platform', 'country'), ('platform', 'audience_type'), ('country', 'audience_type')
+    }
+    assert cube.rollup(('platform',)) is rollups[('platform',)]
+
+
+def test_query_filters_on_normalized_names(cube, frame):
+    """Drill-down within a slice matches dirty names case-insensitively"""
+    records = cube.query(['country'], filters={'platform': ['  facebook ']}, top_k=None)
+
+    expected = frame[frame['platform'] == 'Facebook'].groupby('country')['spend'].sum()
+    assert {r['country']: r['spend'] for r in records} == pytest.approx(expected.to_dict())
+    assert [r['spend'] for r in records] == sorted((r['spend'] for r in records), reverse=True)
+
+
+def test_query_date_range_and_sparse_pruning(frame):
+    cube = DataCube(frame, min_spend=1e12)
+    assert cube.query(['platform']) == []
+
+    cube = DataCube(frame)
+    first_week = cube.query([], date_range=('2025-01-01', '2025-01-07'))
+    expected = frame[frame['date'] <= '2025-01-07']['spend'].sum()
+    assert first_week[0]['spend'] == pytest.approx(expected)
+
+
+def test_ratios_fall_back_to_row_means_when_components_pruned(frame):
+    cube = DataCube(frame[['platform', 'spend', 'revenue', 'ctr', 'roas']])
+    record = cube.query(['platform'], filters={'platform': ['Instagram']})[0]
+
+    instagram = frame[frame['platform'] == 'Instagram']
+    assert record['ctr'] == pytest.approx(instagram['ctr'].mean())
+    assert record['roas'] == pytest.approx(instagram['revenue'].sum() / instagram['spend'].sum())
+    assert 'cpc' not in record
+
+
+def test_unknown_dimension_rejected(cube):
+    with pytest.raises(ValueError):
+        cube.query(['region'])
+    with pytest.raises(ValueError, match='region'):
+        cube.query(['region'], filters={'platform': ['Facebook']})
+    with pytest.raises(ValueError, match='region'):
+        cube.query(['region'], date_range=('2025-01-01', None))
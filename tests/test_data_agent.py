@@ -0,0 +1,255 @@
+"""
+Tests for Data Agent loading and summarization
+"""
+
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from agents.data_agent import DataAgent, normalize_name
+from utils.helpers import setup_logging
+
+SAMPLE_CSV = Path(__file__).parent.parent / 'data' / 'synthetic_fb_ads_undergarments.csv'
+
+
+@pytest.fixture(scope='module')
+def sample_frame():
+    """Sample dataset in the documented format (tab-separated, DD-MM-YYYY dates)"""
+    df = pd.read_csv(SAMPLE_CSV)
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%d-%m-%Y')
+    return df
+
+
+@pytest.fixture
+def data_path(sample_frame, tmp_path):
+    path = tmp_path / 'fb_ads.csv'
+    sample_frame.to_csv(path, sep='\t', index=False)
+    return path
+
+
+@pytest.fixture
+def config(data_path):
+    """Data agent configuration"""
+    return {
+        'data_path': str(data_path),
+        'date_format': '%d-%m-%Y',
+        'low_ctr_threshold': 0.015,
+        'min_spend_threshold': 50.0,
+        'lookback_days': 7,
+        'read_chunksize': 500
+    }
+
+
+@pytest.fixture
+def agent(config):
+    return DataAgent(config, setup_logging(config))
+
+
+SCOPED_FILTERS = {
+    'date_window': {'last_n_days': 7},
+    'campaigns': ['Men ComfortMax Launch'],
+    'metrics': ['roas', 'ctr']
+}
+
+
+def test_unfiltered_load_reads_everything(agent, sample_frame):
+    """Without filters every row and column is loaded"""
+    summary = agent.load_and_summarize()
+    
+    assert len(agent.df) == len(sample_frame)
+    assert set(agent.df.columns) == set(sample_frame.columns)
+    assert 'scope' not in summary['overview']
+
+
+def test_filters_pushed_into_read(agent):
+    """Plan filters prune columns and rows during the chunked read"""
+    summary = agent.load_and_summarize(filters=SCOPED_FILTERS)
+    df = agent.df
+    
+    assert {normalize_name(c) for c in df['campaign_name'].unique()} == {'men comfortmax launch'}
+    assert 'purchases' not in df.columns
+    # Cube dimensions are always read so breakdowns survive pruning
+    assert {'platform', 'country', 'audience_type'} <= set(df.columns)
+    # Last 7 days plus an equally long comparison period
+    assert (df['date'].max() - df['date'].min()).days <= 13
+    assert summary['overview']['scope']['campaigns'] == ['Men ComfortMax Launch']
+    assert summary['overview']['total_purchases'] is None
+    assert summary['time_series']['prev_7_days']['spend'] > 0
+
+
+def test_parquet_read_matches_csv(agent, config, sample_frame, tmp_path):
+    """Parquet sources get the same pruning and row filtering"""
+    pytest.importorskip('pyarrow')
+    csv_summary = agent.load_and_summarize(filters=SCOPED_FILTERS)
+    csv_df = agent.df
+    
+    parquet_path = tmp_path / 'fb_ads.parquet'
+    sample_frame.to_parquet(parquet_path, index=False)
+    parquet_agent = DataAgent({**config, 'data_path': str(parquet_path)}, agent.logger)
+    parquet_summary = parquet_agent.load_and_summarize(filters=SCOPED_FILTERS)
+    
+    assert list(parquet_agent.df.columns) == list(csv_df.columns)
+    assert len(parquet_agent.df) == len(csv_df)
+    assert parquet_summary['overview'] == csv_summary['overview']
+
+
+def test_unmatched_filters_fall_back_to_full_load(agent, sample_frame):
+    """A scope that matches nothing loads the full dataset instead"""
+    agent.load_and_summarize(filters={'campaigns': ['No Such Campaign']})
+    assert len(agent.df) == len(sample_frame)
+
+
+@pytest.mark.parametrize('window', [
+    {'last_n_days': 'last week'},
+    {'last_n_days': -3},
+    {'start': 'recent'},
+    {'start': '2025-03-01', 'end': 'today-ish'},
+    'last 7 days'
+])
+def test_malformed_date_window_is_ignored(agent, sample_frame, window):
+    """An unparseable planner date window is dropped instead of failing the load"""
+    summary = agent.load_and_summarize(filters={'date_window': window})
+
+    assert len(agent.df) == len(sample_frame)
+    assert summary['overview']['total_rows'] == len(sample_frame)
+
+
+def test_malformed_date_window_keeps_other_filters(agent, sample_frame):
+    agent.load_and_summarize(filters={'date_window': {'start': 'recent'}, 'campaigns': ['Men ComfortMax Launch']})
+
+    assert set(agent.df['campaign_name'].map(normalize_name)) == {'men comfortmax launch'}
+
+
+def test_scalar_filter_value_is_one_value(agent, sample_frame):
+    """A bare string filter matches as a single value, not character by character"""
+    agent.load_and_summarize(filters={'campaigns': 'Men ComfortMax Launch', 'metrics': 'roas'})
+
+    expected = sample_frame['campaign_name'].map(normalize_name) == 'men comfortmax launch'
+    assert len(agent.df) == expected.sum()
+    assert set(agent.df['campaign_name'].map(normalize_name)) == {'men comfortmax launch'}
+    assert 'roas' in agent.df.columns
+
+    records = agent.drill_down(['platform'], filters={'platforms': 'Instagram'})
+    assert {normalize_name(r['platform']) for r in records} == {'instagram'}
+
+
+def test_summary_includes_dimension_breakdown(agent):
+    summary = agent.load_and_summarize()
+
+    breakdown = summary['dimension_breakdown']
+    assert set(breakdown) == {'audience_type', 'platform', 'country'}
+    assert {'spend', 'roas', 'ctr'} <= set(breakdown['platform'][0])
+
+
+def test_drill_down_uses_planner_filter_keys(agent, sample_frame):
+    agent.load_and_summarize()
+
+    records = agent.drill_down(['country'], filters={'campaigns': ['men comfortmax launch'], 'platforms': ['Instagram']})
+
+    scoped = sample_frame[sample_frame['campaign_name'].map(normalize_name) == 'men comfortmax launch']
+    scoped = scoped[scoped['platform'] == 'Instagram']
+    assert sum(r['spend'] for r in records) == pytest.approx(
+        scoped.groupby('country')['spend'].sum().loc[lambda s: s >= 50].sum()
+    )
+
+
+def test_summary_includes_ranked_anomalies(config):
+    agent = DataAgent({**config, 'max_anomalies': 3}, setup_logging(config))
+    summary = agent.load_and_summarize()
+
+    assert summary['anomalies'] == agent.anomalies[:3]
+    assert all({'entity_type', 'signal', 'metric', 'severity'} <= set(a) for a in summary['anomalies'])
+
+
+def test_scoped_load_keeps_breakdown_and_drill_down(agent):
+    """Metric-based pruning does not drop the dimensions the cube needs"""
+    summary = agent.load_and_summarize(filters={'date_window': {'last_n_days': 7}, 'metrics': ['roas', 'ctr', 'spend']})
+    
+    assert set(summary['dimension_breakdown']) == {'audience_type', 'platform', 'country'}
+    records = agent.drill_down(['platform', 'country'], filters={'date_window': {'start': '2025-03-01'}})
+    assert records and {'platform', 'country', 'roas'} <= set(records[0])
+
+
+def test_creative_exemplars_from_persisted_index(config, tmp_path):
+    index_path = tmp_path / 'creative_index.npz'
+    agent = DataAgent({**config, 'creative_index_path': str(index_path), 'creative_exemplars': 3}, setup_logging(config))
+    summary = agent.load_and_summarize()
+    
+    assert index_path.exists()
+    exemplars = summary['creative_performance']['exemplars']
+    assert len(exemplars) == 3
+    assert exemplars[0]['ctr'] >= exemplars[-1]['ctr']
+
+
+def test_creative_index_covers_all_history_across_scopes(config, sample_frame, tmp_path, monkeypatch):
+    """A scoped load still indexes every historical message, and reuses the persisted index"""
+    from analytics.creative_index import CreativeIndex
+
+    index_path = tmp_path / 'creative_index.npz'
+    agent = DataAgent({**config, 'creative_index_path': str(index_path)}, setup_logging(config))
+    agent.load_and_summarize(filters={'campaigns': ['Men ComfortMax Launch']})
+
+    assert sorted(agent.creative_index.messages) == sorted(sample_frame['creative_message'].unique())
+    outside = sample_frame.loc[
+        sample_frame['campaign_name'].map(normalize_name) != 'men comfortmax launch', 'creative_message'
+    ].iloc[0]
+    assert agent.creative_index.score([outside])[0]['novelty'] < 0.01
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("index rebuilt for a different scope")
+
+    monkeypatch.setattr(CreativeIndex, 'build', no_rebuild)
+    agent.load_and_summarize(filters={'date_window': {'last_n_days': 7}})
+    agent.load_and_summarize()
+    assert len(agent.creative_index.messages) == sample_frame['creative_message'].nunique()
+
+
+def _summarize_attached(handle, config):
+    """Worker process: rebuild the summary from shared memory only"""
+    agent = DataAgent.attach(handle, config, setup_logging(config))
+    try:
+        return agent.summarize(), agent.drill_down(['platform'], filters={'campaigns': ['Men ComfortMax Launch']})
+    finally:
+        agent.release()
+
+
+def test_worker_summary_from_shared_memory_matches(agent, config, data_path):
+    import json
+    from concurrent.futures import ProcessPoolExecutor
+    summary = agent.load_and_summarize(filters=SCOPED_FILTERS)
+    drill = agent.drill_down(['platform'], filters={'campaigns': ['Men ComfortMax Launch']})
+    handle = agent.publish()
+    try:
+        data_path.unlink()  # workers must not need the source
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            worker_summary, worker_drill = pool.submit(_summarize_attached, handle, config).result()
+    finally:
+        agent.release()
+    
+    assert json.dumps(worker_summary, sort_keys=True, default=str) == json.dumps(summary, sort_keys=True, default=str)
+    assert worker_drill == drill
+
+
+def test_attached_numeric_columns_are_zero_copy(agent):
+    from analytics.shared_frame import SharedFrame
+    agent.load_and_summarize()
+    published = SharedFrame.publish(agent.df)
+    attached = SharedFrame.attach(published.handle)
+    try:
+        frame = attached.to_frame()
+        assert list(frame.columns) == list(agent.df.columns)
+        assert frame['campaign_name'].astype(str).tolist() == agent.df['campaign_name'].tolist()
+        assert frame['date'].equals(agent.df['date'])
+        
+        # A write through the publisher's block shows up in the attached frame
+        spend = next(b for c, b in zip(published.handle['columns'], published.blocks) if c['name'] == 'spend')
+        spend.buf[:8] = memoryview(pd.Series([123.5]).to_numpy()).cast('B')
+        assert frame['spend'].iloc[0] == 123.5
+        del frame
+    finally:
+        attached.close()
+        published.unlink()
@@ -0,0 +1,150 @@
+"""
+Tests for on-demand data tools and the function-calling loop
+"""
+
+import json
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from agents.data_agent import DataAgent
+from analytics.data_tools import DataTools, compact_summary
+from utils.helpers import setup_logging
+from utils.llm import complete_json
+
+SAMPLE_CSV = Path(__file__).parent.parent / 'data' / 'synthetic_fb_ads_undergarments.csv'
+
+
+@pytest.fixture(scope='module')
+def loaded_agent(tmp_path_factory):
+    """Data agent loaded from the sample dataset in the documented format"""
+    df = pd.read_csv(SAMPLE_CSV)
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%d-%m-%Y')
+    path = tmp_path_factory.mktemp('data') / 'fb_ads.csv'
+    df.to_csv(path, sep='\t', index=False)
+
+    config = {'data_path': str(path), 'date_format': '%d-%m-%Y', 'min_spend_threshold': 50.0}
+    agent = DataAgent(config, setup_logging({'log_dir': str(path.parent)}))
+    agent.summary = agent.load_and_summarize()
+    return agent
+
+
+@pytest.fixture
+def tools(loaded_agent):
+    return DataTools(loaded_agent, {'data_tools_cache_size': 2})
+
+
+def test_metric_by_dimension(tools, loaded_agent):
+    rows = json.loads(tools.call('metric_by_dimension', {'dimensions': ['platform'], 'metrics': ['spend', 'roas']}))
+
+    assert {r['platform'] for r in rows} == {'Facebook', 'Instagram'}
+    assert set(rows[0]) == {'platform', 'spend', 'roas'}
+    assert sum(r['spend'] for r in rows) == pytest.approx(loaded_agent.df['spend'].sum())
+
+
+def test_top_k_worst(tools):
+    rows = json.loads(tools.call('top_k', json.dumps({'dimension': 'campaign_name', 'metric': 'ctr', 'k': 3, 'worst': True})))
+
+    assert len(rows) == 3
+    assert [r['ctr'] for r in rows] == sorted(r['ctr'] for r in rows)
+
+
+def test_compare_windows_reports_change(tools):
+    rows = json.loads(tools.call('compare_windows', {
+        'current': {'start': '2025-01-08', 'end': '2025-01-14'},
+        'previous': {'start': '2025-01-01', 'end': '2025-01-07'},
+        'dimension': 'platform'
+    }))
+
+    roas = rows[0]['roas']
+    assert roas['change'] == pytest.approx(roas['current'] - roas['previous'])
+
+
+def test_anomalies_filtered_and_ranked(tools):
+    anomalies = json.loads(tools.call('anomalies', {'entity_type': 'creative', 'limit': 5}))
+
+    assert len(anomalies) <= 5 and all(a['entity_type'] == 'creative' for a in anomalies)
+    assert [a['severity'] for a in anomalies] == sorted((a['severity'] for a in anomalies), reverse=True)
+
+
+def test_results_memoized_in_lru(tools):
+    args = {'dimensions': ['country']}
+    first = tools.call('metric_by_dimension', args)
+    assert tools.call('metric_by_dimension', dict(args)) == first
+    assert (tools.hits, tools.misses) == (1, 1)
+
+    tools.call('metric_by_dimension', {'dimensions': ['platform']})
+    tools.call('metric_by_dimension', {'dimensions': ['audience_type']})
+    assert len(tools.cache) == 2
+    tools.call('metric_by_dimension', args)
+    assert tools.misses == 4
+
+
+def test_bad_calls_return_error_payload(tools):
+    assert 'error' in json.loads(tools.call('unknown_tool', {}))
+    assert 'error' in json.loads(tools.call('metric_by_dimension', {'dimensions': ['region']}))
+
+
+def test_compact_summary_is_much_smaller(loaded_agent):
+    full = json.dumps(loaded_agent.summary, default=str)
+    compact = compact_summary(loaded_agent.summary)
+
+    assert len(json.dumps(compact, default=str)) * 5 < len(full)
+    assert compact['campaigns'] and 'platform' in compact['dimension_values']
+
+
+class ToolCallingCompletions:
+    """First asks for a tool call, then answers with the final JSON"""
+
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if len(self.requests) == 1:
+            call = SimpleNamespace(
+                id='call_1',
+                function=SimpleNamespace(name='top_k', arguments='{"dimension": "platform", "metric": "roas", "k": 1}')
+            )
+            message = SimpleNamespace(content=None, tool_calls=[call])
+        else:
+            message = SimpleNamespace(content='{"messages": ["ok"]}', tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def test_complete_json_runs_tool_calls(tools):
+    completions = ToolCallingCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    result = complete_json(client, {'openai_model': 'gpt-4o'}, messages=[{'role': 'user', 'content': 'hi'}],
+                           temperature=0.0, max_tokens=100, schema='messages', tools=tools)
+
+    assert result == {'messages': ['ok']}
+    followup = completions.requests[1]['messages']
+    assert followup[1]['tool_calls'][0]['function']['name'] == 'top_k'
+    assert followup[2]['role'] == 'tool' and followup[2]['tool_call_id'] == 'call_1'
+    assert json.loads(followup[2]['content'])[0]['platform'] == 'Facebook'
+    assert completions.requests[0]['tools'] == tools.specs()
+
+
+def test_tools_work_on_metric_scoped_load(loaded_agent):
+    """A plan with metrics prunes columns but keeps every tool dimension usable"""
+    scoped = DataAgent(loaded_agent.config, loaded_agent.logger)
+    summary = scoped.load_and_summarize(filters={'date_window': {'last_n_days': 7}, 'metrics': ['roas', 'ctr', 'spend']})
+    tools = DataTools(scoped, {})
+    end = scoped.df['date'].max()
+
+    def window(first, last):
+        return {'start': str((end - pd.Timedelta(days=first)).date()), 'end': str((end - pd.Timedelta(days=last)).date())}
+
+    platforms = json.loads(tools.call('metric_by_dimension', {'dimensions': ['platform', 'audience_type']}))
+    countries = json.loads(tools.call('compare_windows', {'current': window(6, 0), 'previous': window(13, 7), 'dimension': 'country'}))
+
+    assert 'error' not in platforms and {r['platform'] for r in platforms} == {'Facebook', 'Instagram'}
+    assert 'error' not in countries and all(c['roas']['previous'] is not None for c in countries)
+    assert compact_summary(summary)['dimension_values']['country']
@@ -0,0 +1,97 @@
+"""
+Parity tests: the DuckDB analytics backend against the pandas reference
+"""
+
+import math
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+pytest.importorskip('duckdb')
+
+from agents.data_agent import DataAgent
+from utils.helpers import setup_logging
+
+SAMPLE_CSV = Path(__file__).parent.parent / 'data' / 'synthetic_fb_ads_undergarments.csv'
+
+
+@pytest.fixture(scope='module')
+def sample_frame():
+    df = pd.read_csv(SAMPLE_CSV)
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%d-%m-%Y')
+    return df
+
+
+@pytest.fixture
+def config(sample_frame, tmp_path):
+    path = tmp_path / 'fb_ads.csv'
+    sample_frame.to_csv(path, sep='\t', index=False)
+    return {
+        'data_path': str(path),
+        'date_format': '%d-%m-%Y',
+        'low_ctr_threshold': 0.015,
+        'min_spend_threshold': 50.0,
+        'lookback_days': 7,
+        'read_chunksize': 500
+    }
+
+
+def summaries(config, filters=None):
+    pandas_agent = DataAgent(config, setup_logging(config))
+    duckdb_agent = DataAgent({**config, 'analytics_backend': 'duckdb'}, setup_logging(config))
+    return (
+        pandas_agent.load_and_summarize(filters=filters), duckdb_agent.load_and_summarize(filters=filters),
+        pandas_agent, duckdb_agent
+    )
+
+
+def assert_same(expected, actual, path='summary'):
+    """Equal structure and values; floats equal up to summation order"""
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and expected.keys() == actual.keys(), path
+        for key in expected:
+            assert_same(expected[key], actual[key], f'{path}.{key}')
+    elif isinstance(expected, list):
+        assert isinstance(actual, list) and len(expected) == len(actual), path
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            assert_same(e, a, f'{path}[{i}]')
+    elif isinstance(expected, float) and math.isnan(expected):
+        assert isinstance(actual, float) and math.isnan(actual), path
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-12), path
+    else:
+        assert type(actual) is type(expected) and actual == expected, path
+
+
+def test_full_summary_parity(config):
+    expected, actual, pandas_agent, duckdb_agent = summaries(config)
+    
+    assert_same(expected, actual)
+    pd.testing.assert_frame_equal(pandas_agent.df, duckdb_agent.df, check_dtype=False)
+
+
+@pytest.mark.parametrize('filters', [
+    {'date_window': {'last_n_days': 7}, 'campaigns': ['Men ComfortMax Launch'], 'metrics': ['roas', 'ctr']},
+    {'platforms': ['instagram'], 'countries': ['US', 'UK']},
+    {'date_window': {'start': '2025-02-01', 'end': '2025-02-14'}}
+])
+def test_scoped_summary_parity(config, filters):
+    expected, actual, pandas_agent, duckdb_agent = summaries(config, filters)
+    
+    assert_same(expected, actual)
+    assert list(duckdb_agent.df.columns) == list(pandas_agent.df.columns)
+    assert len(duckdb_agent.df) == len(pandas_agent.df) > 0
+
+
+def test_parquet_summary_parity(config, sample_frame, tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'fb_ads.parquet'
+    sample_frame.to_parquet(path, index=False)
+    
+    expected, actual, _, _ = summaries({**config, 'data_path': str(path)})
+    
+    assert_same(expected, actual)
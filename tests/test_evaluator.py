@@ -2,15 +2,19 @@
 Tests for Evaluator Agent
 """
 
+import json
+import os
 import pytest
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
 from agents.evaluator import EvaluatorAgent
 from utils.helpers import setup_logging
+from utils.llm_usage import summarize_usage, usage_log
 
 
 @pytest.fixture
@@ -146,5 +150,237 @@ def test_recommendation_generation(evaluator, sample_hypothesis, sample_data_sum
     assert len(result['recommendation']) > 0
 
 
+class FakeCompletions:
+    """Records requests and replays canned completion contents"""
+    
+    def __init__(self, contents):
+        self.contents = list(contents)
+        self.requests = []
+    
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        choices = [
+            SimpleNamespace(message=SimpleNamespace(content=self.contents.pop(0)))
+            for _ in range(kwargs.get('n', 1))
+        ]
+        # Simulate provider prefix caching: everything after the first request is a cache hit
+        usage = SimpleNamespace(
+            prompt_tokens=1000,
+            completion_tokens=200,
+            total_tokens=1200,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=900 if len(self.requests) > 1 else 0)
+        )
+        return SimpleNamespace(choices=choices, usage=usage)
+
+
+def fake_client(contents):
+    return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(contents)))
+
+
+def _evaluation_json(hypothesis, confidence, index=None):
+    evaluation = {
+        'hypothesis': hypothesis,
+        'confidence': confidence,
+        'evidence': 'ROAS 4.2 vs 4.9',
+        'reasoning': 'Consistent with summary',
+        'recommendation': 'Refresh creatives'
+    }
+    if index is not None:
+        evaluation['index'] = index
+    return evaluation
+
+
+@pytest.fixture
+def offline_evaluator(config, logger, monkeypatch):
+    """Evaluator with batching enabled and no network access"""
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    return EvaluatorAgent({**config, 'batch_evaluation': True}, logger)
+
+
+def test_batch_evaluation_single_request(offline_evaluator, sample_data_summary):
+    """Batched mode sends the data summary once for several hypotheses"""
+    hypotheses = [{'hypothesis': f'Hypothesis {i}', 'category': 'other'} for i in range(3)]
+    offline_evaluator.client = fake_client([json.dumps({
+        'evaluations': [_evaluation_json(f'Hypothesis {i}', 0.5 + i / 10, index=i) for i in reversed(range(3))]
+    })])
+    
+    results = offline_evaluator.batch_evaluate(hypotheses, sample_data_summary)
+    
+    requests = offline_evaluator.client.chat.completions.requests
+    assert len(requests) == 1
+    prompt = requests[0]['messages'][1]['content']
+    assert prompt.count('"total_spend"') == 1
+    assert [r['hypothesis'] for r in results] == ['Hypothesis 0', 'Hypothesis 1', 'Hypothesis 2']
+    assert [r['confidence'] for r in results] == [0.5, 0.6, 0.7]
+
+
+def test_batch_evaluation_splits_by_budget(offline_evaluator, sample_data_summary):
+    """Hypotheses are split into several requests when the budget is exceeded"""
+    offline_evaluator.config['eval_batch_max_size'] = 2
+    hypotheses = [{'hypothesis': f'Hypothesis {i}'} for i in range(3)]
+    offline_evaluator.client = fake_client([
+        json.dumps({'evaluations': [_evaluation_json('Hypothesis 0', 0.8, 0), _evaluation_json('Hypothesis 1', 0.8, 1)]}),
+        json.dumps(_evaluation_json('Hypothesis 2', 0.8))
+    ])
+    
+    results = offline_evaluator.batch_evaluate(hypotheses, sample_data_summary)
+    
+    assert len(offline_evaluator.client.chat.completions.requests) == 2
+    assert len(results) == 3
+
+
+def test_batch_evaluation_accepts_string_indices(offline_evaluator, sample_data_summary):
+    """Indices echoed back as strings still match; booleans are not indices"""
+    hypotheses = [{'hypothesis': 'Hypothesis 0'}, {'hypothesis': 'Hypothesis 1'}]
+    offline_evaluator.client = fake_client([
+        json.dumps({'evaluations': [
+            _evaluation_json('Hypothesis 1', 0.7, index='1'),
+            _evaluation_json('Hypothesis 0', 0.8, index=' 0 '),
+            _evaluation_json('Bogus', 0.1, index=True)
+        ]})
+    ])
+    
+    results = offline_evaluator.batch_evaluate(hypotheses, sample_data_summary)
+    
+    assert len(offline_evaluator.client.chat.completions.requests) == 1
+    assert [r['confidence'] for r in results] == [0.8, 0.7]
+
+
+def test_batch_evaluation_falls_back_on_parse_failure(offline_evaluator, sample_data_summary):
+    """An unparseable batch response is retried one hypothesis at a time"""
+    hypotheses = [{'hypothesis': 'Hypothesis 0'}, {'hypothesis': 'Hypothesis 1'}]
+    offline_evaluator.client = fake_client([
+        'not json at all',
+        json.dumps(_evaluation_json('Hypothesis 0', 0.9)),
+        json.dumps(_evaluation_json('Hypothesis 1', 0.4))
+    ])
+    
+    results = offline_evaluator.batch_evaluate(hypotheses, sample_data_summary)
+    
+    assert len(offline_evaluator.client.chat.completions.requests) == 3
+    assert [r['confidence'] for r in results] == [0.9, 0.4]
+
+
+def test_evaluation_prompts_share_stable_prefix(offline_evaluator, sample_data_summary):
+    """Repeated evaluations share a prefix covering instructions and the full data summary"""
+    offline_evaluator.client = fake_client([
+        json.dumps(_evaluation_json('Hypothesis A', 0.8)),
+        json.dumps(_evaluation_json('Hypothesis B', 0.8))
+    ])
+    
+    offline_evaluator.evaluate({'hypothesis': 'Hypothesis A'}, sample_data_summary)
+    offline_evaluator.evaluate({'hypothesis': 'Hypothesis B'}, sample_data_summary)
+    
+    first, second = [r['messages'] for r in offline_evaluator.client.chat.completions.requests]
+    assert first[0] == second[0]
+    prefix = os.path.commonprefix([first[1]['content'], second[1]['content']])
+    summary_str = json.dumps(sample_data_summary, indent=2, default=str)
+    assert summary_str in prefix
+    assert 'Hypothesis A' not in prefix
+
+
+def test_cached_tokens_recorded(offline_evaluator, sample_data_summary):
+    """Prompt-cache hits reported by the API are recorded per call"""
+    cursor = len(usage_log)
+    offline_evaluator.client = fake_client([
+        json.dumps(_evaluation_json('Hypothesis A', 0.8)),
+        json.dumps(_evaluation_json('Hypothesis B', 0.8))
+    ])
+    
+    offline_evaluator.evaluate({'hypothesis': 'Hypothesis A'}, sample_data_summary)
+    offline_evaluator.evaluate({'hypothesis': 'Hypothesis B'}, sample_data_summary)
+    
+    usage = summarize_usage(usage_log.since(cursor))
+    assert usage['calls'] == 2
+    assert usage['cached_tokens'] == 900
+    assert [r['agent'] for r in usage['records']] == ['evaluator', 'evaluator']
+
+
+def test_borderline_confidence_escalates_to_larger_model(offline_evaluator, sample_data_summary):
+    """With model routing, a confidence near the pass mark is re-checked by the next tier"""
+    offline_evaluator.config.update({
+        'model_routing': True,
+        'model_tiers': ['gpt-4o-mini', 'gpt-4o'],
+        'agent_models': {'evaluator': 'gpt-4o-mini'}
+    })
+    offline_evaluator.client = fake_client([
+        json.dumps(_evaluation_json('H', offline_evaluator.config['confidence_min'] + 0.02)),
+        json.dumps(_evaluation_json('H', 0.9))
+    ])
+    
+    result = offline_evaluator.evaluate({'hypothesis': 'H'}, sample_data_summary)
+    
+    requests = offline_evaluator.client.chat.completions.requests
+    assert [r['model'] for r in requests] == ['gpt-4o-mini', 'gpt-4o']
+    assert result['confidence'] == 0.9
+
+
+def test_self_consistency_samples_in_one_request(offline_evaluator, sample_data_summary):
+    """Several evaluations come back as choices of one request and are aggregated"""
+    offline_evaluator.config['evaluator_samples'] = 3
+    offline_evaluator.client = fake_client([
+        json.dumps(_evaluation_json('H', confidence)) for confidence in (0.5, 0.8, 0.7)
+    ])
+    
+    result = offline_evaluator.evaluate({'hypothesis': 'H'}, sample_data_summary)
+    
+    requests = offline_evaluator.client.chat.completions.requests
+    assert len(requests) == 1
+    assert requests[0]['n'] == 3
+    assert requests[0]['temperature'] == 0.7
+    assert result['confidence'] == 0.7
+    assert result['confidence_samples'] == [0.5, 0.8, 0.7]
+    assert result['confidence_spread'] == pytest.approx(0.3)
+    assert result['confidence_variance'] == pytest.approx(0.01555556)
+
+
+def test_self_consistency_mean_skips_unparseable_samples(offline_evaluator, sample_data_summary):
+    """The mean aggregate ignores samples that cannot be parsed"""
+    offline_evaluator.config.update({'evaluator_samples': 3, 'evaluator_aggregate': 'mean'})
+    offline_evaluator.client = fake_client([
+        json.dumps(_evaluation_json('H', 0.4)),
+        'not json at all',
+        json.dumps(_evaluation_json('H', 0.8))
+    ])
+    
+    result = offline_evaluator.evaluate({'hypothesis': 'H'}, sample_data_summary)
+    
+    assert result['confidence'] == pytest.approx(0.6)
+    assert result['confidence_samples'] == [0.4, 0.8]
+
+
+def test_self_consistency_parallel_calls(offline_evaluator, sample_data_summary):
+    """Parallel sampling issues one single-choice call per sample"""
+    offline_evaluator.config.update({'evaluator_samples': 3, 'evaluator_sampling': 'parallel'})
+    offline_evaluator.client = fake_client([
+        json.dumps(_evaluation_json('H', 0.6)) for _ in range(3)
+    ])
+    
+    result = offline_evaluator.evaluate({'hypothesis': 'H'}, sample_data_summary)
+    
+    requests = offline_evaluator.client.chat.completions.requests
+    assert len(requests) == 3
+    assert all('n' not in r for r in requests)
+    assert result['confidence'] == 0.6
+    assert result['confidence_spread'] == 0
+
+
+def test_self_consistency_batch_aggregates_per_hypothesis(offline_evaluator, sample_data_summary):
+    """Sampled batch responses are matched by index before aggregating"""
+    offline_evaluator.config['evaluator_samples'] = 2
+    hypotheses = [{'hypothesis': 'Hypothesis 0'}, {'hypothesis': 'Hypothesis 1'}]
+    offline_evaluator.client = fake_client([
+        json.dumps({'evaluations': [_evaluation_json('Hypothesis 0', 0.4, 0), _evaluation_json('Hypothesis 1', 0.9, 1)]}),
+        json.dumps({'evaluations': [_evaluation_json('Hypothesis 1', 0.7, 1), _evaluation_json('Hypothesis 0', 0.6, 0)]})
+    ])
+    
+    results = offline_evaluator.batch_evaluate(hypotheses, sample_data_summary)
+    
+    assert len(offline_evaluator.client.chat.completions.requests) == 1
+    assert [r['confidence'] for r in results] == pytest.approx([0.5, 0.8])
+    assert [r['confidence_samples'] for r in results] == [[0.4, 0.6], [0.9, 0.7]]
+    assert all('index' not in r for r in results)
+
+
 if __name__ == '__main__':
-    pytest.main([__file__, '-v'])
\ No newline at end of file
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,142 @@
+"""
+Tests for shared LLM JSON parsing
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from utils.json_parser import (
+    ResponseParseError,
+    StreamingJSONExtractor,
+    extract_json,
+    parse_json_response,
+    repair_json
+)
+from utils.llm import complete_json
+
+
+def test_extract_from_markdown_fence():
+    """JSON wrapped in a fenced code block with surrounding prose is extracted"""
+    content = 'Here you go:\n```json\n{"subtasks": ["a", "b"]}\n```\nThanks!'
+    assert extract_json(content) == {'subtasks': ['a', 'b']}
+
+
+def test_repair_trailing_commas():
+    """Trailing commas in objects and arrays are removed"""
+    assert extract_json('{"a": [1, 2,], "b": 3,}') == {'a': [1, 2], 'b': 3}
+
+
+@pytest.mark.parametrize('truncated, expected', [
+    ('{"hypotheses": [{"hypothesis": "CTR fell", "reasoning": "Fatig', {'hypotheses': [{'hypothesis': 'CTR fell', 'reasoning': 'Fatig'}]}),
+    ('{"confidence": 0.8, "evidence"', {'confidence': 0.8}),
+    ('{"confidence": 0.8, "evidence":', {'confidence': 0.8}),
+    ('{"flag": tr', {}),
+])
+def test_repair_truncated_output(truncated, expected):
+    """Responses cut off by max_tokens are closed at the last complete value"""
+    assert extract_json(truncated) == expected
+
+
+def test_repair_ignores_brackets_inside_strings():
+    """Brackets and quotes inside string values do not confuse the repair"""
+    repaired = repair_json('{"text": "a [b] {c} \\"d\\"", "n": [1')
+    assert repaired == '{"text": "a [b] {c} \\"d\\"", "n": [1]}'
+
+
+def test_streaming_extractor_completes_early():
+    """The streaming extractor reports completion as soon as the value closes"""
+    extractor = StreamingJSONExtractor()
+    chunks = ['Sure: {"messages": ["Buy', ' now", "Save {20%}"]', '}', ' and more text {']
+    
+    done = [extractor.feed(chunk) for chunk in chunks]
+    
+    assert done == [False, False, True, True]
+    assert extractor.result() == {'messages': ['Buy now', 'Save {20%}']}
+
+
+def test_schema_wraps_bare_arrays_and_drops_invalid_items():
+    """Bare arrays are accepted and items failing their schema are dropped"""
+    result = parse_json_response('[{"hypothesis": "A"}, {"reasoning": "no hypothesis"}]', 'hypotheses')
+    assert result == {'hypotheses': [{'hypothesis': 'A'}]}
+
+
+def test_schema_coerces_numeric_confidence():
+    """String confidence values are coerced to floats"""
+    assert parse_json_response('{"confidence": "0.72"}', 'evaluation')['confidence'] == 0.72
+
+
+def test_schema_rejects_missing_required_field():
+    """Missing required fields raise a parse error"""
+    with pytest.raises(ResponseParseError):
+        parse_json_response('{"hypothesis": "no confidence"}', 'evaluation')
+
+
+def test_no_json_raises():
+    """Plain prose without JSON raises a parse error"""
+    with pytest.raises(ResponseParseError):
+        extract_json('I could not find any issues.')
+
+
+def _chunk(text):
+    if not isinstance(text, str):
+        return text
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+class FakeStream:
+    """Streamed completion that records how far it was consumed"""
+    
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.consumed = 0
+        self.closed = False
+    
+    def __iter__(self):
+        for piece in self.pieces:
+            self.consumed += 1
+            yield _chunk(piece)
+    
+    def close(self):
+        self.closed = True
+
+
+def test_complete_json_streams_and_requests_json_mode():
+    """Streaming requests stop reading once the JSON value is complete"""
+    stream = FakeStream(['{"subtasks": ', '["a"]}', ' trailing', ' tokens'])
+    requests = []
+    
+    def create(**kwargs):
+        requests.append(kwargs)
+        return stream
+    
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    config = {'openai_model': 'gpt-4o', 'stream_responses': True}
+    
+    plan = complete_json(client, config, messages=[], temperature=0.3, max_tokens=100, schema='plan')
+    
+    assert plan == {'subtasks': ['a']}
+    assert requests[0]['response_format'] == {'type': 'json_object'}
+    assert requests[0]['stream_options'] == {'include_usage': True}
+    assert stream.consumed == 3  # stops at the first content past the JSON value
+    assert stream.closed
+
+
+def test_streamed_usage_read_from_final_chunk(monkeypatch):
+    """The usage-only tail chunk is drained so tokens are still accounted for"""
+    usage = SimpleNamespace(prompt_tokens=50, completion_tokens=10, total_tokens=60)
+    tail = SimpleNamespace(choices=[], usage=usage)
+    stream = FakeStream(['{"subtasks": ["a"]}', '', tail])
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: stream)))
+    recorded = []
+    monkeypatch.setattr('utils.llm.usage_log.record', lambda *args, **kwargs: recorded.append(args))
+    
+    complete_json(client, {'openai_model': 'gpt-4o', 'stream_responses': True}, messages=[],
+                  temperature=0.3, max_tokens=100, schema='plan')
+    
+    assert stream.consumed == 3
+    assert recorded[0][2] is usage
@@ -0,0 +1,224 @@
+"""
+Tests for the LLM request scheduler
+"""
+
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from utils.llm_scheduler import LLMScheduler, TokenBucket, is_retryable
+
+
+class RateLimitError(Exception):
+    """Stand-in for the SDK's 429 error"""
+    status_code = 429
+
+
+@pytest.fixture
+def config():
+    """Fast scheduler configuration"""
+    return {
+        'llm_max_concurrency': 1,
+        'llm_max_retries': 3,
+        'llm_backoff_base': 0.01,
+        'llm_backoff_max': 0.05,
+        'llm_timeouts': {'default': 12, 'creative_generator': 34}
+    }
+
+
+def test_retries_rate_limited_calls(config):
+    """429s are retried with backoff until the call succeeds"""
+    scheduler = LLMScheduler(config)
+    attempts = []
+    
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise RateLimitError("slow down")
+        return 'ok'
+    
+    assert scheduler.call(flaky, agent='planner') == 'ok'
+    assert attempts == [12, 12, 12]
+
+
+def test_gives_up_after_max_retries(config):
+    """Persistent failures surface after the retry budget is spent"""
+    scheduler = LLMScheduler(config)
+    calls = []
+    
+    def always_limited(timeout):
+        calls.append(timeout)
+        raise RateLimitError("slow down")
+    
+    with pytest.raises(RateLimitError):
+        scheduler.call(always_limited)
+    assert len(calls) == config['llm_max_retries'] + 1
+
+
+def test_non_retryable_errors_fail_fast(config):
+    """Client errors are raised immediately"""
+    scheduler = LLMScheduler(config)
+    calls = []
+    
+    def bad_request(timeout):
+        calls.append(timeout)
+        raise ValueError("bad request")
+    
+    with pytest.raises(ValueError):
+        scheduler.call(bad_request)
+    assert len(calls) == 1
+    assert not is_retryable(ValueError())
+
+
+def test_per_agent_timeouts(config):
+    """Each agent's configured timeout is passed to the call"""
+    scheduler = LLMScheduler(config)
+    assert scheduler.call(lambda timeout: timeout, agent='creative_generator') == 34
+    assert scheduler.call(lambda timeout: timeout, agent='evaluator') == 12
+
+
+def test_priority_ordering(config):
+    """Queued planner/evaluator requests run before creative requests"""
+    scheduler = LLMScheduler(config)
+    release = threading.Event()
+    order = []
+    
+    blocker = scheduler.submit(lambda timeout: release.wait(5))
+    time.sleep(0.05)
+    futures = [
+        scheduler.submit(lambda timeout: order.append('creative'), agent='creative_generator'),
+        scheduler.submit(lambda timeout: order.append('insight'), agent='insight_agent'),
+        scheduler.submit(lambda timeout: order.append('evaluator'), agent='evaluator'),
+    ]
+    release.set()
+    blocker.result()
+    for future in futures:
+        future.result()
+    
+    assert order == ['evaluator', 'insight', 'creative']
+
+
+def test_token_bucket_throttles():
+    """Requests beyond the per-minute budget wait for refill"""
+    bucket = TokenBucket(per_minute=600, capacity=10)  # 10 tokens/second
+    bucket.acquire(10)
+    start = time.monotonic()
+    bucket.acquire(2)
+    assert time.monotonic() - start >= 0.15
+
+
+def test_hedges_slow_calls(config):
+    """A call slower than the learned percentile is raced against a duplicate"""
+    scheduler = LLMScheduler({
+        **config,
+        'llm_max_concurrency': 2,
+        'hedge_requests': True,
+        'hedge_agents': ['insight_agent'],
+        'hedge_min_samples': 3,
+        'hedge_max_ratio': 0.5
+    })
+    for _ in range(3):
+        scheduler.call(lambda timeout: time.sleep(0.01), agent='insight_agent')
+    
+    attempts = []
+    
+    def slow_then_fast(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            time.sleep(1.0)
+            return 'primary'
+        return 'hedge'
+    
+    start = time.monotonic()
+    assert scheduler.call(slow_then_fast, agent='insight_agent') == 'hedge'
+    assert time.monotonic() - start < 0.5
+    assert scheduler.hedging.hedges == 1
+
+
+def test_hedge_loser_reported_when_it_finishes(config):
+    """A losing request already in flight is handed to on_discard when it completes"""
+    scheduler = LLMScheduler({
+        **config,
+        'llm_max_concurrency': 2,
+        'hedge_requests': True,
+        'hedge_agents': ['insight_agent'],
+        'hedge_min_samples': 3,
+        'hedge_max_ratio': 0.5
+    })
+    for _ in range(3):
+        scheduler.call(lambda timeout: time.sleep(0.01), agent='insight_agent')
+    
+    attempts = []
+    discarded = []
+    loser_done = threading.Event()
+    
+    def slow_then_fast(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            time.sleep(0.3)
+            return 'primary'
+        return 'hedge'
+    
+    def on_discard(result):
+        discarded.append(result)
+        loser_done.set()
+    
+    assert scheduler.call(slow_then_fast, agent='insight_agent', on_discard=on_discard) == 'hedge'
+    assert loser_done.wait(2)
+    assert discarded == ['primary']
+
+
+def test_hedging_respects_cost_caps(config):
+    """No duplicate is sent once the extra token budget is exhausted"""
+    scheduler = LLMScheduler({
+        **config,
+        'llm_max_concurrency': 2,
+        'hedge_requests': True,
+        'hedge_agents': ['insight_agent'],
+        'hedge_min_samples': 1,
+        'hedge_max_ratio': 1.0,
+        'hedge_max_extra_tokens': 100
+    })
+    scheduler.call(lambda timeout: time.sleep(0.01), agent='insight_agent')
+    attempts = []
+    
+    def slow(timeout):
+        attempts.append(timeout)
+        time.sleep(0.1)
+        return 'done'
+    
+    assert scheduler.call(slow, agent='insight_agent', estimated_tokens=500) == 'done'
+    assert len(attempts) == 1
+    assert scheduler.hedging.hedges == 0
+
+
+def test_shared_scheduler_adopts_run_logger(config, monkeypatch):
+    """A scheduler first created without a logger picks up the run's logger"""
+    import utils.llm_scheduler as llm_scheduler
+    monkeypatch.setattr(llm_scheduler, '_scheduler', None)
+    logger = object()
+    
+    scheduler = llm_scheduler.get_scheduler(config)
+    assert scheduler.logger is None
+    assert llm_scheduler.get_scheduler(config, logger) is scheduler
+    assert scheduler.logger is logger
+
+
+def test_discarded_calls_counted_in_usage():
+    """Hedge losers' tokens are included in totals and counted separately"""
+    from types import SimpleNamespace
+    from utils.llm_usage import UsageLog, summarize_usage
+    log = UsageLog()
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+    log.record('insight_agent', 'gpt-4o', usage, 0.5)
+    log.record('insight_agent', 'gpt-4o', usage, 1.5, discarded=True)
+    
+    summary = summarize_usage(log.since(0))
+    
+    assert (summary['calls'], summary['discarded_calls']) == (2, 1)
+    assert summary['prompt_tokens'] == 200
@@ -0,0 +1,193 @@
+"""
+Tests for per-agent model routing, timeout fallback and escalation
+"""
+
+import json
+import pytest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from utils.json_parser import ResponseParseError
+from utils.llm import complete_json
+from utils.llm_scheduler import get_scheduler
+from utils.llm_usage import usage_log
+from utils.model_router import router
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+@pytest.fixture
+def config():
+    return {
+        'openai_model': 'gpt-4o',
+        'model_routing': True,
+        'model_tiers': ['gpt-4o-mini', 'gpt-4o'],
+        'agent_models': {'planner': 'gpt-4o-mini', 'insight_agent': 'gpt-4o'},
+        'model_fallbacks': {'gpt-4o': 'gpt-4o-mini'},
+        'routing_min_samples': 3,
+        'routing_max_escalation_rate': 0.5,
+        'model_prices': {'gpt-4o': [2.5, 10.0], 'gpt-4o-mini': [0.15, 0.6]}
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_router(monkeypatch):
+    router.reset()
+    scheduler = get_scheduler({})
+    monkeypatch.setattr(scheduler, 'backoff_base', 0.001)
+    # Fake calls report real token counts; keep the shared rate limit from throttling them
+    monkeypatch.setattr(scheduler.token_bucket, 'rate', 1e9)
+    yield
+    router.reset()
+
+
+def fake_client(replies: dict, requests: list):
+    """Client answering per model; a reply may be an exception to raise"""
+    def create(**kwargs):
+        requests.append(kwargs['model'])
+        reply = replies[kwargs['model']]
+        if isinstance(reply, Exception):
+            raise reply
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100, total_tokens=1100)
+        message = SimpleNamespace(content=reply, tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def call(client, config, agent, **kwargs):
+    return complete_json(client, config, messages=[{'role': 'user', 'content': 'hi'}],
+                         temperature=0.3, max_tokens=100, agent=agent, **kwargs)
+
+
+def test_agents_start_on_their_tier(config):
+    requests = []
+    client = fake_client({'gpt-4o-mini': '{"a": 1}', 'gpt-4o': '{"a": 2}'}, requests)
+    
+    assert call(client, config, 'planner') == {'a': 1}
+    assert call(client, config, 'insight_agent') == {'a': 2}
+    assert call(client, {**config, 'model_routing': False}, 'planner') == {'a': 2}
+    assert requests == ['gpt-4o-mini', 'gpt-4o', 'gpt-4o']
+
+
+def test_parse_failure_escalates_one_tier(config):
+    requests = []
+    client = fake_client({'gpt-4o-mini': 'not json at all', 'gpt-4o': '{"subtasks": ["a"]}'}, requests)
+    
+    assert call(client, config, 'planner', schema='plan') == {'subtasks': ['a']}
+    assert requests == ['gpt-4o-mini', 'gpt-4o']
+
+
+def test_parse_failure_on_top_tier_raises(config):
+    client = fake_client({'gpt-4o': 'not json at all'}, [])
+    
+    with pytest.raises(ResponseParseError):
+        call(client, config, 'insight_agent', schema='plan')
+
+
+def test_borderline_result_escalates(config):
+    requests = []
+    client = fake_client({'gpt-4o-mini': '{"confidence": 0.62}', 'gpt-4o': '{"confidence": 0.81}'}, requests)
+    borderline = lambda result: abs(result['confidence'] - 0.6) <= 0.05
+    
+    assert call(client, {**config, 'agent_models': {'evaluator': 'gpt-4o-mini'}}, 'evaluator',
+                escalate_if=borderline) == {'confidence': 0.81}
+    assert requests == ['gpt-4o-mini', 'gpt-4o']
+
+
+def test_timeout_falls_back_to_smaller_model(config):
+    requests = []
+    client = fake_client({'gpt-4o': APITimeoutError('timed out'), 'gpt-4o-mini': '{"a": 1}'}, requests)
+    cursor = len(usage_log)
+    
+    assert call(client, config, 'insight_agent') == {'a': 1}
+    assert requests == ['gpt-4o', 'gpt-4o-mini']
+    assert [r['model'] for r in usage_log.since(cursor)] == ['gpt-4o-mini']
+
+
+def test_frequent_escalation_routes_straight_to_larger_model(config):
+    requests = []
+    client = fake_client({'gpt-4o-mini': 'not json at all', 'gpt-4o': '{"a": 1}'}, requests)
+    
+    for _ in range(4):
+        call(client, config, 'planner')
+    
+    assert requests == ['gpt-4o-mini', 'gpt-4o'] * 3 + ['gpt-4o']
+
+
+def test_smaller_model_is_reprobed_and_recovers(config):
+    """Outcomes are windowed and the configured tier is retried, so routing can return to it"""
+    config = {**config, 'routing_window': 4, 'routing_probe_interval': 2}
+    requests = []
+    replies = {'gpt-4o-mini': 'not json at all', 'gpt-4o': '{"a": 1}'}
+    client = fake_client(replies, requests)
+    
+    for _ in range(4):
+        call(client, config, 'planner')
+    assert requests[-1:] == ['gpt-4o']
+    replies['gpt-4o-mini'] = '{"a": 2}'
+    del requests[:]
+    
+    results = [call(client, config, 'planner') for _ in range(12)]
+    
+    assert results[-3:] == [{'a': 2}] * 3
+    assert requests[-3:] == ['gpt-4o-mini'] * 3
+
+
+def _observe(agent, model, latency, calls, config):
+    for _ in range(calls):
+        router.observe({'agent': agent, 'model': model, 'latency_s': latency,
+                        'prompt_tokens': 1000, 'completion_tokens': 100}, config)
+
+
+def _outcomes(agent, model, escalated, calls, config):
+    for i in range(calls):
+        router.record(agent, model, config, escalated=i < escalated)
+
+
+def test_routing_prefers_cheaper_tier_while_faster_and_cheaper(config):
+    _outcomes('planner', 'gpt-4o-mini', escalated=1, calls=4, config=config)
+    _observe('planner', 'gpt-4o-mini', 1.0, 4, config)
+    _observe('planner', 'gpt-4o', 2.0, 4, config)
+    
+    # 1.0s + 25% x 2.0s beats 2.0s, and mini plus escalations costs less
+    assert router.route('planner', config) == 'gpt-4o-mini'
+
+
+def test_routing_moves_up_when_cheaper_tier_is_slower(config):
+    _outcomes('planner', 'gpt-4o-mini', escalated=1, calls=4, config=config)
+    _observe('planner', 'gpt-4o-mini', 3.0, 4, config)
+    _observe('planner', 'gpt-4o', 2.0, 4, config)
+    
+    assert router.route('planner', config) == 'gpt-4o'
+
+
+def test_routing_moves_up_when_escalations_cost_more(config):
+    prices = {'gpt-4o-mini': [2.0, 8.0], 'gpt-4o': [2.5, 10.0]}
+    config = {**config, 'model_prices': prices}
+    _outcomes('planner', 'gpt-4o-mini', escalated=1, calls=4, config=config)
+    _observe('planner', 'gpt-4o-mini', 1.0, 4, config)
+    _observe('planner', 'gpt-4o', 2.0, 4, config)
+    
+    assert router.route('planner', config) == 'gpt-4o'
+
+
+def test_stats_report_latency_cost_and_outcomes(config):
+    client = fake_client({'gpt-4o-mini': 'not json at all', 'gpt-4o': '{"a": 1}'}, [])
+    cursor = len(usage_log)
+    call(client, config, 'planner')
+    
+    stats = router.stats(config, usage_log.since(cursor))
+    
+    assert set(stats['planner']) == {'gpt-4o-mini', 'gpt-4o'}
+    mini = stats['planner']['gpt-4o-mini']
+    assert mini['calls'] == 1 and mini['escalated'] == 1
+    assert mini['cost_usd'] == pytest.approx((1000 * 0.15 + 100 * 0.6) / 1e6)
+    assert stats['planner']['gpt-4o']['cost_usd'] == pytest.approx((1000 * 2.5 + 100 * 10.0) / 1e6)
+    assert mini['mean_latency_s'] >= 0 and mini['p95_latency_s'] >= 0
+    json.dumps(stats)
@@ -0,0 +1,252 @@
+"""
+Tests for Agent Orchestrator control flow
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from orchestrator.agent_orchestrator import AgentOrchestrator
+from utils.helpers import setup_logging
+
+
+class StubPlanner:
+    def plan(self, query):
+        return {'subtasks': ['analyze'], 'analysis_type': 'general', 'requires_creative': True}
+
+
+class StubDataAgent:
+    def load_and_summarize(self, *args, **kwargs):
+        return {'overview': {'total_spend': 100.0}, 'low_performers': [{'campaign_name': 'A'}]}
+
+
+class StubInsightAgent:
+    def __init__(self, hypotheses):
+        self.hypotheses = hypotheses
+        self.refined = []
+    
+    def generate_insights(self, query, plan, data_summary):
+        return list(self.hypotheses)
+    
+    def refine_insight(self, hypothesis, evaluation, data_summary):
+        self.refined.append(hypothesis['hypothesis'])
+        return {**hypothesis, 'hypothesis': hypothesis['hypothesis'] + ' (refined)'}
+
+
+class StubEvaluator:
+    def __init__(self, confidences):
+        self.confidences = confidences
+    
+    def evaluate(self, hypothesis, data_summary):
+        return {
+            'hypothesis': hypothesis['hypothesis'],
+            'confidence': self.confidences.get(hypothesis['hypothesis'], 0.3),
+            'evidence': 'stub evidence',
+            'reasoning': 'stub reasoning',
+            'recommendation': 'stub recommendation'
+        }
+    
+    def batch_evaluate(self, hypotheses, data_summary):
+        return [self.evaluate(h, data_summary) for h in hypotheses]
+
+
+class StubCreativeGenerator:
+    def __init__(self):
+        self.calls = []
+    
+    def generate(self, insights, data_summary):
+        self.calls.append([i['hypothesis'] for i in insights])
+        return [
+            {'campaign': f'Campaign {i}', 'recommended_messages': ['msg'], 'insight_ids': [i]}
+            for i in range(len(insights))
+        ]
+
+
+@pytest.fixture
+def config():
+    """Orchestrator configuration"""
+    return {
+        'openai_model': 'gpt-4o',
+        'confidence_min': 0.6,
+        'max_retries': 0,
+        'low_ctr_threshold': 0.015
+    }
+
+
+def make_orchestrator(config, monkeypatch, hypotheses, confidences):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    orchestrator = AgentOrchestrator(config, setup_logging(config))
+    orchestrator.planner = StubPlanner()
+    orchestrator.data_agent = StubDataAgent()
+    orchestrator.insight_agent = StubInsightAgent(hypotheses)
+    orchestrator.evaluator = StubEvaluator(confidences)
+    orchestrator.creative_gen = StubCreativeGenerator()
+    return orchestrator
+
+
+def test_speculative_creatives_drop_failed_hypotheses(config, monkeypatch):
+    """Speculative creatives tied to hypotheses that failed evaluation are discarded"""
+    hypotheses = [{'hypothesis': 'H0'}, {'hypothesis': 'H1'}, {'hypothesis': 'H2'}]
+    orchestrator = make_orchestrator(
+        {**config, 'speculative_creative': True},
+        monkeypatch,
+        hypotheses,
+        {'H0': 0.9, 'H2': 0.8}
+    )
+    
+    result = orchestrator.execute('Why did ROAS drop?')
+    
+    assert orchestrator.creative_gen.calls == [['H0', 'H1', 'H2']]
+    assert [c['campaign'] for c in result['creatives']] == ['Campaign 0', 'Campaign 2']
+    assert [c['insight_ids'] for c in result['creatives']] == [[0], [1]]
+
+
+def test_speculative_creatives_regenerated_when_nothing_survives(config, monkeypatch):
+    """Creatives are regenerated from validated insights if no speculative result is usable"""
+    hypotheses = [{'hypothesis': 'H0'}, {'hypothesis': 'H1'}]
+    orchestrator = make_orchestrator(
+        {**config, 'speculative_creative': True, 'max_retries': 1},
+        monkeypatch,
+        hypotheses,
+        {'H0 (refined)': 0.9}
+    )
+    
+    result = orchestrator.execute('Why did ROAS drop?')
+    
+    assert orchestrator.creative_gen.calls == [['H0', 'H1'], ['H0 (refined)']]
+    assert len(result['creatives']) == 1
+
+
+def test_data_tools_mode_sends_compact_summary(config, monkeypatch):
+    """With data tools enabled, analysis agents get the tools and a compact summary"""
+    orchestrator = make_orchestrator({**config, 'data_tools': True}, monkeypatch, [{'hypothesis': 'H0'}], {'H0': 0.9})
+    seen = []
+    generate_insights = orchestrator.insight_agent.generate_insights
+    orchestrator.insight_agent.generate_insights = lambda query, plan, data_summary: (
+        seen.append(data_summary) or generate_insights(query, plan, data_summary)
+    )
+    
+    orchestrator.execute('Why did ROAS drop?')
+    
+    assert 'data_access' in seen[0] and 'low_performers' not in seen[0]
+    assert orchestrator.evaluator.data_tools is orchestrator.insight_agent.data_tools
+    assert orchestrator.evaluator.data_tools.data_agent is orchestrator.data_agent
+
+
+def test_fanout_creative_mode_uses_per_campaign_generation(config, monkeypatch):
+    orchestrator = make_orchestrator({**config, 'creative_mode': 'fanout'}, monkeypatch, [{'hypothesis': 'H0'}], {'H0': 0.9})
+    fanout_calls = []
+    orchestrator.creative_gen.generate_fanout = lambda insights, data_summary: fanout_calls.append(insights) or []
+    
+    orchestrator.execute('Why did ROAS drop?')
+    
+    assert [[i['hypothesis'] for i in call] for call in fanout_calls] == [['H0']]
+    assert orchestrator.creative_gen.calls == []
+
+
+class FailingCreativeGenerator(StubCreativeGenerator):
+    def generate(self, insights, data_summary):
+        raise RuntimeError('creative request timed out')
+
+
+def test_resume_skips_checkpointed_stages(config, monkeypatch, tmp_path):
+    """A resumed run reuses planner/insight/evaluator outputs and only reruns what failed"""
+    config = {**config, 'checkpoint_dir': str(tmp_path)}
+    hypotheses = [{'hypothesis': 'H0'}, {'hypothesis': 'H1'}]
+    orchestrator = make_orchestrator(config, monkeypatch, hypotheses, {'H0': 0.9})
+    orchestrator.creative_gen = FailingCreativeGenerator()
+    with pytest.raises(RuntimeError):
+        orchestrator.execute('Why did ROAS drop?')
+    
+    resumed = make_orchestrator(config, monkeypatch, [{'hypothesis': 'other'}], {})
+    resumed.planner = None  # any call would fail
+    resumed.evaluator = None
+    result = resumed.execute('Why did ROAS drop?', resume=True)
+    
+    assert [i['hypothesis'] for i in result['insights']] == ['H0']
+    assert resumed.creative_gen.calls == [['H0']]
+    assert sorted(p.name for p in (tmp_path / result['run_id']).iterdir()) == [
+        'creative_generator.json', 'evaluator.json', 'insight_agent.json', 'planner.json'
+    ]
+
+
+def test_resume_reruns_stages_after_changed_data(config, monkeypatch, tmp_path):
+    """Checkpoints keyed by input hash are not reused once upstream inputs change"""
+    config = {**config, 'checkpoint_dir': str(tmp_path)}
+    make_orchestrator(config, monkeypatch, [{'hypothesis': 'H0'}], {'H0': 0.9}).execute('Why did ROAS drop?')
+    
+    resumed = make_orchestrator(config, monkeypatch, [{'hypothesis': 'H1'}], {'H1': 0.9})
+    resumed.data_agent.load_and_summarize = lambda *args, **kwargs: {'overview': {'total_spend': 250.0}}
+    result = resumed.execute('Why did ROAS drop?', resume=True)
+    
+    assert [i['hypothesis'] for i in result['insights']] == ['H1']
+    assert resumed.creative_gen.calls == [['H1']]
+
+
+def test_refinement_ranked_by_expected_gain(config, monkeypatch):
+    """Retries go to near misses backed by the data before far misses"""
+    from orchestrator.refinement import rank_refinements
+    hypotheses = [
+        {'hypothesis': 'Far miss', 'category': 'other'},
+        {'hypothesis': 'Campaign A creatives are fatiguing', 'category': 'creative_decay'},
+        {'hypothesis': 'Near miss', 'category': 'other'}
+    ]
+    evaluations = [{'confidence': 0.1}, {'confidence': 0.4}, {'confidence': 0.5}]
+    summary = {'performance_by_campaign': [{'campaign_name': 'A'}],
+               'anomalies': [{'entity': 'A', 'signal': 'creative_fatigue'}]}
+    
+    assert rank_refinements(hypotheses, evaluations, summary, config) == [1, 2, 0]
+    
+    orchestrator = make_orchestrator({**config, 'max_retries': 1}, monkeypatch, hypotheses, {})
+    orchestrator.evaluator.confidences = {h['hypothesis']: e['confidence'] for h, e in zip(hypotheses, evaluations)}
+    orchestrator.data_agent.load_and_summarize = lambda *args, **kwargs: summary
+    orchestrator.execute('Why did ROAS drop?')
+    
+    assert orchestrator.insight_agent.refined == ['Campaign A creatives are fatiguing']
+
+
+def test_refinements_run_concurrently(config, monkeypatch):
+    import threading
+    hypotheses = [{'hypothesis': 'H0'}, {'hypothesis': 'H1'}]
+    orchestrator = make_orchestrator({**config, 'max_retries': 2}, monkeypatch, hypotheses,
+                                     {'H0 (refined)': 0.9, 'H1 (refined)': 0.9})
+    barrier = threading.Barrier(2, timeout=5)
+    refine_insight = orchestrator.insight_agent.refine_insight
+    orchestrator.insight_agent.refine_insight = lambda **kwargs: barrier.wait() is not None and refine_insight(**kwargs)
+    
+    result = orchestrator.execute('Why did ROAS drop?')
+    
+    assert [i['hypothesis'] for i in result['insights']] == ['H0 (refined)', 'H1 (refined)']
+
+
+def test_refinement_stops_once_target_reached(config, monkeypatch):
+    hypotheses = [{'hypothesis': 'H0'}, {'hypothesis': 'H1'}, {'hypothesis': 'H2'}]
+    orchestrator = make_orchestrator(
+        {**config, 'max_retries': 2, 'refinement_concurrency': 1, 'refinement_target': 2},
+        monkeypatch, hypotheses, {'H0': 0.9, 'H1 (refined)': 0.9, 'H2 (refined)': 0.9}
+    )
+    
+    result = orchestrator.execute('Why did ROAS drop?')
+    
+    assert orchestrator.insight_agent.refined == ['H1']
+    assert [i['hypothesis'] for i in result['insights']] == ['H0', 'H1 (refined)']
+
+
+def test_refinement_abandoned_after_time_budget(config, monkeypatch):
+    import time
+    hypotheses = [{'hypothesis': 'H0'}, {'hypothesis': 'H1'}]
+    orchestrator = make_orchestrator(
+        {**config, 'max_retries': 2, 'refinement_time_budget': 0.1},
+        monkeypatch, hypotheses, {'H0': 0.9, 'H1 (refined)': 0.9}
+    )
+    refine_insight = orchestrator.insight_agent.refine_insight
+    orchestrator.insight_agent.refine_insight = lambda **kwargs: time.sleep(0.5) or refine_insight(**kwargs)
+    
+    started = time.monotonic()
+    result = orchestrator.execute('Why did ROAS drop?')
+    
+    assert time.monotonic() - started < 0.4
+    assert [i['hypothesis'] for i in result['insights']] == ['H0']
@@ -0,0 +1,59 @@
+"""
+Tests for the prompt registry
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from utils.prompt_registry import EXPECTED_PLACEHOLDERS, PromptRegistry, PromptTemplate, get_prompt
+
+
+def test_render_fills_all_placeholders():
+    """Rendering substitutes every placeholder and leaves JSON braces intact"""
+    template = PromptTemplate('t', 'Query: {USER_QUERY}\n{"a": 1}\nAgain {USER_QUERY} and {PLAN}')
+    
+    rendered = template.render(USER_QUERY='why?', PLAN='{"x": 2}')
+    
+    assert rendered == 'Query: why?\n{"a": 1}\nAgain why? and {"x": 2}'
+    assert template.placeholders == {'USER_QUERY', 'PLAN'}
+    assert template.static_prefix == 'Query: '
+
+
+def test_render_missing_value_raises():
+    """A missing placeholder value is an error, not silently left in the prompt"""
+    template = PromptTemplate('t', '{A} and {B}')
+    with pytest.raises(KeyError):
+        template.render(A='only a')
+
+
+def test_render_does_not_substitute_inside_values():
+    """Values containing placeholder-like text are inserted verbatim"""
+    template = PromptTemplate('t', '{A}|{B}')
+    assert template.render(A='{B}', B='b') == '{B}|b'
+
+
+def test_shipped_prompts_validate():
+    """Every agent prompt declares exactly the placeholders its agent fills"""
+    registry = PromptRegistry()
+    for name, expected in EXPECTED_PLACEHOLDERS.items():
+        assert registry.get(name).placeholders == expected
+
+
+def test_invalid_placeholders_rejected_at_load(tmp_path):
+    """Unexpected or missing placeholders fail when the registry loads"""
+    for name in EXPECTED_PLACEHOLDERS:
+        text = ' '.join('{%s}' % p for p in EXPECTED_PLACEHOLDERS[name])
+        (tmp_path / f'{name}.md').write_text(text)
+    (tmp_path / 'planner_prompt.md').write_text('{USER_QUERY} {TYPO_QUERY}')
+    
+    with pytest.raises(ValueError, match='planner_prompt'):
+        PromptRegistry(tmp_path)
+
+
+def test_registry_loaded_once():
+    """Templates are shared across agents instead of re-read per construction"""
+    assert get_prompt('evaluator_prompt') is get_prompt('evaluator_prompt')
@@ -0,0 +1,92 @@
+"""
+Tests for report rendering
+"""
+
+import io
+import json
+import pytest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from reporting.renderers import MarkdownRenderer, build_report, get_renderer
+
+
+@pytest.fixture
+def report():
+    insights = [
+        {'hypothesis': 'ROAS fell on <Instagram>', 'confidence': 0.8125, 'evidence': 'ROAS 4.1 -> 3.2',
+         'recommendation': 'Shift budget'},
+        {'hypothesis': 'CTR fatigue', 'confidence': 0.7, 'evidence': 'CTR down 20%'}
+    ]
+    creatives = [
+        {'campaign': 'Men Bold Colors Drop', 'current_ctr': 0.011, 'issue': 'Low CTR',
+         'recommended_messages': ['Bold colors, all-day comfort'], 'rationale': 'Mirrors top performers'}
+    ]
+    return build_report('Why did ROAS drop?', insights, creatives, generated=datetime(2025, 3, 1, 9, 30))
+
+
+class RecordingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+    
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_markdown_sections(report):
+    text = MarkdownRenderer().render_to_string(report)
+    
+    assert text.startswith('# Facebook Ads Performance Analysis\n\n**Query:** Why did ROAS drop?\n\n')
+    assert '**Generated:** 2025-03-01 09:30:00' in text
+    assert '### 1. ROAS fell on <Instagram>\n\n**Confidence:** 81.25%' in text
+    assert '**Recommendation:**\nSee creative recommendations below' in text
+    assert '**Target Campaign:** Men Bold Colors Drop  \n' in text
+    assert '- Bold colors, all-day comfort\n' in text
+    assert text.endswith('*Generated by Kasparro Agentic FB Analyst*\n')
+
+
+def test_markdown_skips_empty_creatives(report):
+    text = MarkdownRenderer().render_to_string({**report, 'creatives': []})
+    
+    assert '## Creative Recommendations' not in text
+    assert '0 creative recommendations' in text
+
+
+@pytest.mark.parametrize('fmt', ['markdown', 'json', 'html'])
+def test_sections_stream_to_handle_and_render_in_parallel(report, fmt):
+    renderer = get_renderer(fmt)
+    stream = RecordingStream()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        renderer.render(report, stream, executor)
+    
+    assert stream.writes > len(renderer.sections)
+    assert stream.getvalue() == renderer.render_to_string(report)
+
+
+def test_json_report_is_valid(report):
+    data = json.loads(get_renderer('json').render_to_string(report))
+    
+    assert data['query'] == 'Why did ROAS drop?'
+    assert data['insight_count'] == 2 and data['creative_count'] == 1
+    assert data['insights'][0]['confidence'] == 0.8125
+    assert len(data['next_steps']) == 4
+
+
+def test_html_escapes_content(report):
+    text = get_renderer('html').render_to_string(report)
+    
+    assert text.startswith('<!DOCTYPE html>') and text.endswith('</html>\n')
+    assert 'ROAS fell on &lt;Instagram&gt;' in text
+    assert '<Instagram>' not in text
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError, match='Unknown report format'):
+        get_renderer('pdf')
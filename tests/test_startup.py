@@ -0,0 +1,60 @@
+"""
+Cold-start import budget tests for the CLI
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = {'pandas', 'numpy', 'openai', 'structlog', 'yaml'}
+
+# Total self+cumulative import time allowed for `run.py --help` (microseconds)
+IMPORT_BUDGET_US = 300_000
+
+
+def _import_profile(*args) -> dict:
+    """Run python -X importtime and return {module: cumulative_us} for top-level imports"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports are indented by exactly one space
+        modules[name.strip()] = (int(cumulative), name.startswith(' ') and not name.startswith('  '))
+    return modules
+
+
+def test_help_skips_heavy_imports():
+    """--help never imports pandas, numpy, openai or logging/config libraries"""
+    modules = _import_profile('src/run.py', '--help')
+    imported_roots = {name.split('.')[0] for name in modules}
+    assert not HEAVY_MODULES & imported_roots
+
+
+def test_help_within_import_budget():
+    """Cold-start import time for --help stays under budget"""
+    modules = _import_profile('src/run.py', '--help')
+    total = sum(cumulative for cumulative, top_level in modules.values() if top_level)
+    assert total < IMPORT_BUDGET_US, f"{total}us spent importing for --help"
+
+
+def test_orchestrator_constructs_agents_lazily():
+    """Creating the orchestrator does not import any agent or its dependencies"""
+    modules = _import_profile(
+        '-c',
+        "import sys; sys.path.insert(0, 'src'); "
+        "from orchestrator.agent_orchestrator import AgentOrchestrator; "
+        "AgentOrchestrator({}, None)"
+    )
+    imported_roots = {name.split('.')[0] for name in modules}
+    assert not HEAVY_MODULES & imported_roots
+    assert 'agents' not in imported_roots